@@ -1,14 +1,39 @@
-from urllib3 import disable_warnings
-from urllib3.exceptions import InsecureRequestWarning
-disable_warnings(InsecureRequestWarning)
-from loguru import logger
-logger.disable('pybeamer')
+from typing import TYPE_CHECKING
 
 version = '0.1.0'
 
-from .client import Codebeamer
-from .projects import Project
+# Public name -> the module it lives in. Modules are only imported when a name is first used,
+# so `import pybeamer` doesn't pull in requests, urllib3, or loguru
+_EXPORTS = {
+	'Codebeamer': 'client',
+	'Project': 'projects',
+	'ItemIndex': 'query',
+	'ItemTable': 'columnar',
+	'Projection': 'records',
+	'ItemTree': 'tree',
+	'RequestBudgetExceeded': 'budget',
+	'StaleItemError': 'tracker_item',
+}
 
-__all__ = [
-	'Codebeamer',
-]
\ No newline at end of file
+if TYPE_CHECKING:
+	from .client import Codebeamer
+	from .projects import Project
+	from .query import ItemIndex
+	from .columnar import ItemTable
+	from .records import Projection
+	from .tree import ItemTree
+	from .budget import RequestBudgetExceeded
+	from .tracker_item import StaleItemError
+
+def __getattr__(name: str):
+	if name not in _EXPORTS:
+		raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+	from importlib import import_module
+	value = getattr(import_module(f'.{_EXPORTS[name]}', __name__), name)
+	globals()[name] = value
+	return value
+
+def __dir__() -> list[str]:
+	return sorted({*globals(), *_EXPORTS})
+
+__all__ = list(_EXPORTS)
@@ -0,0 +1,283 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, BinaryIO, Iterable
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from mimetypes import guess_type
+from pathlib import Path
+from threading import Lock
+from time import monotonic, perf_counter, sleep
+
+from .bulk import BulkReport
+from .tracker_item import TrackerItem
+from .transport import MultipartStream
+from .utils import logger
+
+if TYPE_CHECKING:
+	from .rest_client import RestClient
+
+class ByteRateLimiter:
+	"""Caps the combined byte rate of every transfer sharing it. Each chunk is paid for as
+	it's moved and the transfer sleeps once it's ahead of the rate, so many concurrent
+	transfers split the rate between them.
+
+	Params:
+	bytes_per_second — The most bytes moved per second. — int
+	burst — The most bytes moved at once after being idle. If None one second's worth. — int(None)"""
+
+	def __init__(self, bytes_per_second: int, burst: int | None = None):
+		if bytes_per_second <= 0:
+			raise ValueError('bytes_per_second must be positive')
+		self.bytes_per_second: int = bytes_per_second
+		self.burst: int = burst or bytes_per_second
+		self._allowance: float = float(self.burst)
+		self._last: float = monotonic()
+		self._lock: Lock = Lock()
+
+	def consume(self, size: int):
+		"""Pays for `size` bytes, sleeping until the rate allows them.
+
+		Params:
+		size — The number of bytes moved. — int"""
+		with self._lock:
+			now = monotonic()
+			self._allowance = min(self.burst, self._allowance + (now - self._last) * self.bytes_per_second)
+			self._last = now
+			self._allowance -= size
+			wait = -self._allowance / self.bytes_per_second if self._allowance < 0 else 0.0
+		if wait:
+			sleep(wait)
+
+	def __repr__(self) -> str:
+		return f'ByteRateLimiter(bytes_per_second={self.bytes_per_second})'
+
+class TransferReport(BulkReport):
+	"""The outcome of concurrent attachment transfers, with the bytes moved. Downloads are
+	keyed by attachment ID, uploads by `(item ID, file name)`.
+
+	Params:
+	operation — 'download' or 'upload'. — str"""
+
+	def __init__(self, operation: str):
+		super().__init__(operation)
+		self.bytes: int = 0
+
+	def _record_transfer(self, key: Any, size: int = 0, error: BaseException | None = None) -> int:
+		with self._lock:
+			self.bytes += size
+		return self._record([key], error)
+
+	@property
+	def bytes_per_second(self) -> float:
+		"""Bytes moved per second."""
+		return self.bytes / self.elapsed if self.elapsed else 0.0
+
+	def __repr__(self) -> str:
+		return (
+			f'TransferReport(operation={self.operation}, succeeded={len(self.succeeded)}, failed={len(self.failed)}, '
+			f'bytes={self.bytes}, rate={self.bytes_per_second / 1024:.1f}KiB/s)'
+		)
+
+def attachment_id(attachment: int | dict[str, Any]) -> int:
+	"""The ID of an attachment JSON, or the ID itself."""
+	return int(attachment['id'] if isinstance(attachment, dict) else attachment)
+
+def _range_start(content_range: str | None) -> int | None:
+	# 'bytes 100-199/200' -> 100
+	if not content_range or not content_range.startswith('bytes ') or content_range[6] == '*':
+		return None
+	return int(content_range[6:].split('-', 1)[0])
+
+def _range_total(content_range: str | None) -> int | None:
+	# 'bytes */200' -> 200
+	if not content_range or '/' not in content_range:
+		return None
+	total = content_range.rsplit('/', 1)[1]
+	return int(total) if total.isdigit() else None
+
+def download_attachment(
+	client: RestClient,
+	attachment: int | dict[str, Any],
+	destination: str | os.PathLike,
+	resume: bool = True,
+	chunk_size: int = 1 << 20,
+	limiter: ByteRateLimiter | None = None
+) -> Path:
+	"""Streams an attachment to disk in chunks, so only a chunk is ever in memory. The
+	content is written to `<destination>.part` and renamed once complete; with `resume` a
+	`.part` left by an interrupted download is continued with a Range request, falling back to
+	starting over when the server sends the whole content instead.
+
+	Params:
+	client — The client to download with. — `RestClient`
+	attachment — The attachment JSON or its ID. — int | dict[str, Any]
+	destination — The file to write, or a directory to write it into under the attachment's name. — str | PathLike
+	resume — Continue a partial download. — bool(True)
+	chunk_size — The most bytes read at once. — int(1048576)
+	limiter — Caps the byte rate, shared with other transfers. — `ByteRateLimiter`(None)
+
+	Raises:
+	HTTPError — The attachment couldn't be downloaded.
+
+	Returns:
+	Path — The downloaded file."""
+	# GET attachments/{attachmentId}/content
+	destination = Path(destination)
+	if destination.is_dir():
+		name = attachment.get('name') if isinstance(attachment, dict) else None
+		if name is None:
+			name = client.request('GET', f'attachments/{attachment_id(attachment)}', raise_for_status=True)['name']
+		destination = destination / Path(name).name
+	part = destination.with_name(f'{destination.name}.part')
+	offset = part.stat().st_size if resume and part.exists() else 0
+	headers = {'Range': f'bytes={offset}-'} if offset else {}
+	path = f'attachments/{attachment_id(attachment)}/content'
+	response = client.stream(path, headers=headers, chunk_size=chunk_size, raise_for_status=False)
+	with response:
+		if response.status_code == 416 and offset:
+			if _range_total(response.headers.get('Content-Range')) == offset:
+				# The part file already holds the whole attachment
+				part.replace(destination)
+				return destination
+			part.unlink()
+			return download_attachment(client, attachment, destination, resume=False, chunk_size=chunk_size, limiter=limiter)
+		if response.status_code >= 400:
+			response.read()
+			response.raise_for_status()
+		append = offset and response.status_code == 206 and _range_start(response.headers.get('Content-Range')) == offset
+		with open(part, 'ab' if append else 'wb') as file:
+			for chunk in response.iter_bytes():
+				file.write(chunk)
+				if limiter is not None:
+					limiter.consume(len(chunk))
+	part.replace(destination)
+	return destination
+
+def upload_attachment(
+	client: RestClient,
+	item: int | TrackerItem,
+	file: str | os.PathLike | BinaryIO,
+	name: str | None = None,
+	content_type: str | None = None,
+	chunk_size: int = 1 << 20,
+	limiter: ByteRateLimiter | None = None
+) -> dict[str, Any]:
+	"""Uploads a file as an attachment of an item, streaming it from disk as a multipart body
+	with a Content-Length, so only a chunk is ever in memory.
+
+	Params:
+	client — The client to upload with. — `RestClient`
+	item — The item or its ID. — int | `TrackerItem`
+	file — The path of the file, or a seekable file opened in binary mode. — str | PathLike | BinaryIO
+	name — The attachment name. If None the file's name. — str(None)
+	content_type — The MIME type. If None it's guessed from the name. — str(None)
+	chunk_size — The most bytes read at once. — int(1048576)
+	limiter — Caps the byte rate, shared with other transfers. — `ByteRateLimiter`(None)
+
+	Raises:
+	HTTPError — The upload was rejected.
+
+	Returns:
+	dict[str, Any] — The attachment JSON."""
+	# POST items/{itemId}/attachments
+	item_id = item.id if isinstance(item, TrackerItem) else int(item)
+	opened = isinstance(file, (str, os.PathLike))
+	handle = open(file, 'rb') if opened else file
+	try:
+		name = name or Path(getattr(handle, 'name', 'attachment')).name
+		content_type = content_type or guess_type(name)[0] or 'application/octet-stream'
+		body = MultipartStream(
+			[('attachments', (name, handle, content_type))],
+			chunk_size=chunk_size,
+			on_read=limiter.consume if limiter is not None else None
+		)
+		headers = {'Content-Type': body.content_type, 'Content-Length': str(len(body))}
+		response = client.request('POST', f'items/{item_id}/attachments', data=body, headers=headers, raise_for_status=True)
+	finally:
+		if opened:
+			handle.close()
+	return response[0] if isinstance(response, list) and response else response
+
+def _file_size(file: str | os.PathLike | BinaryIO) -> int:
+	if isinstance(file, (str, os.PathLike)):
+		return os.path.getsize(file)
+	return os.fstat(file.fileno()).st_size
+
+def download_attachments(
+	client: RestClient,
+	attachments: Iterable[tuple[int | dict[str, Any], str | os.PathLike]],
+	workers: int = 4,
+	resume: bool = True,
+	max_bytes_per_second: int | None = None,
+	chunk_size: int = 1 << 20
+) -> TransferReport:
+	"""Downloads many attachments concurrently, each streamed to disk. A download that fails,
+	for whatever reason, is recorded in the report and the others carry on.
+
+	Params:
+	client — The client to download with. — `RestClient`
+	attachments — The attachment (JSON or ID) and where to write it. — Iterable[tuple]
+	workers — The most downloads at once. — int(4)
+	resume — Continue partial downloads. — bool(True)
+	max_bytes_per_second — Caps the combined rate of the downloads. — int(None)
+	chunk_size — The most bytes read at once. — int(1048576)
+
+	Returns:
+	`TransferReport` — Keyed by attachment ID."""
+	report = TransferReport('download')
+	limiter = ByteRateLimiter(max_bytes_per_second) if max_bytes_per_second else None
+
+	def download(job: tuple[int | dict[str, Any], str | os.PathLike]):
+		attachment, destination = job
+		try:
+			path = download_attachment(client, attachment, destination, resume=resume, chunk_size=chunk_size, limiter=limiter)
+			report._record_transfer(attachment_id(attachment), path.stat().st_size)
+		except Exception as e:
+			logger.debug(f'Downloading attachment {attachment_id(attachment)} failed: {e}')
+			report._record_transfer(attachment_id(attachment), error=e)
+
+	start = perf_counter()
+	with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+		list(executor.map(download, attachments))
+	report.elapsed = perf_counter() - start
+	logger.debug(repr(report))
+	return report
+
+def upload_attachments(
+	client: RestClient,
+	uploads: Iterable[tuple[int | TrackerItem, str | os.PathLike | BinaryIO]],
+	workers: int = 4,
+	max_bytes_per_second: int | None = None,
+	chunk_size: int = 1 << 20
+) -> TransferReport:
+	"""Uploads many files as attachments concurrently, each streamed from disk. An upload that
+	fails, for whatever reason, is recorded in the report and the others carry on.
+
+	Params:
+	client — The client to upload with. — `RestClient`
+	uploads — The item (or ID) and the file to attach to it. — Iterable[tuple]
+	workers — The most uploads at once. — int(4)
+	max_bytes_per_second — Caps the combined rate of the uploads. — int(None)
+	chunk_size — The most bytes read at once. — int(1048576)
+
+	Returns:
+	`TransferReport` — Keyed by `(item ID, file name)`."""
+	report = TransferReport('upload')
+	limiter = ByteRateLimiter(max_bytes_per_second) if max_bytes_per_second else None
+
+	def upload(job: tuple[int | TrackerItem, str | os.PathLike | BinaryIO]):
+		item, file = job
+		key = (item.id if isinstance(item, TrackerItem) else int(item), Path(getattr(file, 'name', file)).name)
+		try:
+			upload_attachment(client, item, file, chunk_size=chunk_size, limiter=limiter)
+			report._record_transfer(key, _file_size(file))
+		except Exception as e:
+			logger.debug(f'Uploading {key[1]} to item {key[0]} failed: {e}')
+			report._record_transfer(key, error=e)
+
+	start = perf_counter()
+	with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+		list(executor.map(upload, uploads))
+	report.elapsed = perf_counter() - start
+	logger.debug(repr(report))
+	return report
@@ -0,0 +1,13 @@
+"""Benchmarks for pybeamer against an in-process stand-in for codeBeamer. Run them with 
+`python -m pybeamer.benchmarks`."""
+from .mock_server import MockCodebeamer, MockServer
+from .cases import BENCHMARKS, BenchmarkResult, measure, run_benchmarks
+
+__all__ = [
+	'MockCodebeamer',
+	'MockServer',
+	'BENCHMARKS',
+	'BenchmarkResult',
+	'measure',
+	'run_benchmarks',
+]
@@ -0,0 +1,53 @@
+from argparse import ArgumentParser
+import json
+from loguru import logger
+
+from .cases import BENCHMARKS, run_benchmarks
+
+COLUMNS = ['name', 'transport', 'ops', 'requests', 'requests_per_op', 'wall_seconds', 'ops_per_second', 'peak_memory_kib', 'retained_memory_kib', 'rate_limited', 'connections']
+
+def main():
+	parser = ArgumentParser(description='Benchmark pybeamer against a local mock codeBeamer server.')
+	parser.add_argument('benchmarks', nargs='*', help=f'The benchmarks to run, all of them by default. One of: {", ".join(BENCHMARKS)}.')
+	parser.add_argument('--size', type=int, default=100, help='Operations for benchmarks that do not cover a whole tracker.')
+	parser.add_argument('--items', type=int, default=200, help='Items in each tracker.')
+	parser.add_argument('--custom-fields', type=int, default=5, help='Extra custom fields on every item.')
+	parser.add_argument('--description-size', type=int, default=200, help='Characters in every item description.')
+	parser.add_argument('--latency', type=float, default=0.0, help='Seconds the server waits before each response.')
+	parser.add_argument('--rate-limit-every', type=int, default=0, help='Answer every Nth request with a 429.')
+	parser.add_argument(
+		'--transport',
+		action='append',
+		choices=['requests', 'urllib3', 'httpx', 'http2', 'inprocess'],
+		help='How the client talks to the mock. Repeat to compare transports, requests by default.'
+	)
+	parser.add_argument('--json', action='store_true', help='Print the results as JSON lines.')
+	args = parser.parse_args()
+	unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+	if unknown:
+		parser.error(f'unknown benchmarks: {", ".join(unknown)} (choose from {", ".join(BENCHMARKS)})')
+	logger.disable(__package__.split('.')[0])
+	results = []
+	for transport in args.transport or ['requests']:
+		results.extend(run_benchmarks(
+			names=args.benchmarks or None,
+			size=args.size,
+			transport=transport,
+			items_per_tracker=args.items,
+			custom_fields=args.custom_fields,
+			description_size=args.description_size,
+			latency=args.latency,
+			rate_limit_every=args.rate_limit_every,
+		))
+	if args.json:
+		for result in results:
+			print(json.dumps(result.as_dict()))
+		return
+	rows = [[str(v) for v in result.as_dict().values()] for result in results]
+	widths = [max(len(c), *(len(r[i]) for r in rows)) for i, c in enumerate(COLUMNS)]
+	print('  '.join(c.ljust(w) for c, w in zip(COLUMNS, widths)))
+	for row in rows:
+		print('  '.join(v.ljust(w) for v, w in zip(row, widths)))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,407 @@
+from __future__ import annotations
+from typing import Any, Callable
+
+import gc
+import os
+import shutil
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+
+from ..client import Codebeamer
+from ..tracker_item import TrackerItem
+from ..transport import Http2Transport, InProcessTransport
+from .mock_server import MockCodebeamer
+
+class BenchmarkResult:
+	"""The measurements of a single benchmark run."""
+
+	def __init__(
+		self,
+		name: str,
+		ops: int,
+		requests: int,
+		wall: float,
+		peak_memory: int,
+		rate_limited: int = 0,
+		connections: int = 0,
+		transport: str = 'requests',
+		retained_memory: int = 0
+	):
+		self.name: str = name
+		self.transport: str = transport
+		self.ops: int = ops
+		self.requests: int = requests
+		self.wall: float = wall
+		self.peak_memory: int = peak_memory
+		self.rate_limited: int = rate_limited
+		self.connections: int = connections
+		self.retained_memory: int = retained_memory
+
+	@property
+	def requests_per_op(self) -> float:
+		"""The number of requests the server received per operation."""
+		return self.requests / self.ops if self.ops else 0.0
+
+	@property
+	def ops_per_second(self) -> float:
+		"""The number of operations completed per second of wall time."""
+		return self.ops / self.wall if self.wall else 0.0
+
+	def as_dict(self) -> dict[str, Any]:
+		return {
+			'name': self.name,
+			'transport': self.transport,
+			'ops': self.ops,
+			'requests': self.requests,
+			'requests_per_op': round(self.requests_per_op, 3),
+			'wall_seconds': round(self.wall, 4),
+			'ops_per_second': round(self.ops_per_second, 1),
+			'peak_memory_kib': round(self.peak_memory / 1024, 1),
+			'retained_memory_kib': round(self.retained_memory / 1024, 1),
+			'rate_limited': self.rate_limited,
+			'connections': self.connections,
+		}
+
+	def __repr__(self) -> str:
+		return f'BenchmarkResult(name={self.name}, ops={self.ops}, requests={self.requests}, wall={self.wall:.3f})'
+
+def measure(name: str, app: MockCodebeamer, run: Callable[[], Any], ops: int, transport: str = 'requests') -> BenchmarkResult:
+	"""Runs a benchmark once, counting the requests and new connections the mock received and 
+	tracing memory. The mock runs in the same process, so its short lived allocations are 
+	included in the peak. Retained memory is what is still allocated, after a collection, 
+	while the value `run` returned is alive."""
+	gc.collect()
+	app.reset_counts()
+	tracemalloc.start()
+	start = perf_counter()
+	value = run()
+	wall = perf_counter() - start
+	_, peak = tracemalloc.get_traced_memory()
+	gc.collect()
+	retained, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	del value
+	return BenchmarkResult(
+		name, ops, app.request_count, wall, peak, app.rate_limited_count, app.connection_count, transport, retained
+	)
+
+def _tracker_id(app: MockCodebeamer) -> int:
+	return next(iter(app.trackers))
+
+def _tracker_item_ids(app: MockCodebeamer, tracker_id: int) -> list[int]:
+	return [i for i, item in app.items.items() if item['tracker']['id'] == tracker_id]
+
+# Each benchmark takes the client, the mock, and a size and returns (ops, run)
+
+def bench_pagination(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Lists every item reference in a tracker 25 at a time."""
+	tracker = cb.get_tracker(_tracker_id(app))
+	ops = len(_tracker_item_ids(app, tracker.id))
+	return ops, lambda: tracker.get_tracker_items(page_size=25)
+
+def bench_pagination_raw(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Lists every item reference in a tracker as raw records, 500 at a time."""
+	tracker = cb.get_tracker(_tracker_id(app))
+	ops = len(_tracker_item_ids(app, tracker.id))
+	return ops, lambda: tracker.get_tracker_items(page_size=500, raw=True)
+
+def bench_hydration(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Builds full `TrackerItem`s for a tracker from a cbQL query and reads a few properties."""
+	tracker_id = _tracker_id(app)
+	ops = len(_tracker_item_ids(app, tracker_id))
+
+	def run():
+		for item in cb.search_tracker_items(f'tracker.id IN ({tracker_id})', page_size=500):
+			item.name, item.status, item.modified_by, item.custom_fields
+
+	return ops, run
+
+def bench_tracker_load(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Loads every item of a tracker as `TrackerItem`s and keeps them, so the retained memory is
+	what a loaded tracker costs."""
+	tracker_id = _tracker_id(app)
+	ops = len(_tracker_item_ids(app, tracker_id))
+	return ops, lambda: cb.search_tracker_items(f'tracker.id IN ({tracker_id})', page_size=500)
+
+def bench_hydration_table(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Collects the same query as `hydration` straight into an `ItemTable`."""
+	tracker_id = _tracker_id(app)
+	ops = len(_tracker_item_ids(app, tracker_id))
+	return ops, lambda: cb.search_items_table(f'tracker.id IN ({tracker_id})', custom_fields=True)
+
+def bench_bulk_creation(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Creates items one after the other."""
+	tracker = cb.get_tracker(_tracker_id(app))
+
+	def run():
+		for i in range(size):
+			tracker.create_tracker_item(name=f'Created {i}', description='Created by the benchmark')
+
+	return size, run
+
+def bench_field_updates(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Sets a text field on already loaded items."""
+	ids = _tracker_item_ids(app, _tracker_id(app))[:size]
+	items = [cb.get_item(i) for i in ids]
+
+	def run():
+		for n, item in enumerate(items):
+			item.update_field('Custom 0', f'Updated {n}')
+
+	return len(items), run
+
+def bench_write_behind(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Sets two text fields on already loaded items through the write-behind queue and flushes.
+	The two updates to each item are sent as one request."""
+	ids = _tracker_item_ids(app, _tracker_id(app))[:size]
+	items = [cb.get_item(i) for i in ids]
+
+	def run():
+		cb.enable_write_behind(workers=8)
+		for n, item in enumerate(items):
+			item.update_field('Custom 0', f'Updated {n}')
+			item.update_field('Custom 1', f'Updated {n}')
+		cb.disable_write_behind().raise_for_errors()
+
+	return len(items) * 2, run
+
+def bench_idempotent_sync(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Re-runs a sync that sets two fields on items that already have those values. Unchanged
+	fields aren't sent, so the second run makes no requests."""
+	ids = _tracker_item_ids(app, _tracker_id(app))[:size]
+	items = [cb.get_item(i) for i in ids]
+
+	def sync():
+		for item in items:
+			item.set_field('Custom 0', f'Synced {item.id}')
+			item.set_field('Custom 1', 'Synced')
+			item.update()
+
+	sync()
+	return len(items), sync
+
+def bench_bulk_reparent(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Moves items under five new parents with `Codebeamer.reparent_items`, one request per
+	parent instead of one per item."""
+	ids = _tracker_item_ids(app, _tracker_id(app))
+	parents, moved = ids[:5], ids[-size:]
+	return len(moved), lambda: cb.reparent_items({i: parents[n % 5] for n, i in enumerate(moved)}).raise_for_errors()
+
+def bench_bulk_delete(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Deletes items of the last tracker with `Codebeamer.delete_items`, 16 at a time. The
+	last tracker is used so the other benchmarks keep their items."""
+	ids = _tracker_item_ids(app, list(app.trackers)[-1])[-size:]
+	return len(ids), lambda: cb.delete_items(ids).raise_for_errors()
+
+def bench_relation_graph(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Fetches the relations of items of the first tracker into a `RelationGraph`, 8 at a time,
+	and walks the downstream traces."""
+	ids = _tracker_item_ids(app, _tracker_id(app))[:size]
+
+	def run():
+		graph = cb.get_relation_graph(ids)
+		for item_id in ids:
+			graph.reachable(graph.index_of(item_id), kinds='downstream')
+		return graph
+
+	return len(ids), run
+
+def bench_item_history(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Fetches the history of items of the first tracker into a `HistoryTable`, 8 at a time,
+	and finds the items whose status changed."""
+	ids = _tracker_item_ids(app, _tracker_id(app))[:size]
+
+	def run():
+		table = cb.get_history(ids)
+		table.changed('Status')
+		return table
+
+	return len(ids), run
+
+def bench_bulk_import(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Imports rows into the first tracker with `Tracker.import_items`, 8 at a time, with a
+	checkpoint file. Every tenth row is the parent of the nine after it."""
+	tracker = cb.get_tracker(_tracker_id(app))
+	rows = [
+		{'id': f'R{n}', 'Summary': f'Imported {n}', 'Status': 'New', 'Custom 0': f'row {n}', 'parent': f'R{n - n % 10}' if n % 10 else ''}
+		for n in range(size)
+	]
+	directory = Path(tempfile.mkdtemp(prefix='pybeamer-bench-'))
+
+	def run():
+		try:
+			report = tracker.import_items(rows, key='id', parent='parent', checkpoint=directory / 'import.jsonl')
+			report.raise_for_errors()
+		finally:
+			shutil.rmtree(directory, ignore_errors=True)
+
+	return len(rows), run
+
+def bench_bulk_export(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Exports every item of the first tracker to a JSON Lines file with `Tracker.export_items`,
+	hydrating the item references 4 chunks at a time, then the same items to CSV from a cbQL
+	query."""
+	tracker_id = _tracker_id(app)
+	tracker = cb.get_tracker(tracker_id)
+	ops = len(_tracker_item_ids(app, tracker_id))
+	columns = ['id', 'name', 'status', 'modified_at', 'assigned_to', 'Custom 0']
+	directory = Path(tempfile.mkdtemp(prefix='pybeamer-bench-'))
+
+	def run():
+		try:
+			tracker.export_items(directory / 'items.jsonl', columns=columns, chunk_size=250)
+			cb.export_items(f'tracker.id IN ({tracker_id})', directory / 'items.csv', columns=columns)
+		finally:
+			shutil.rmtree(directory, ignore_errors=True)
+
+	return ops * 2, run
+
+def bench_bulk_comments(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Comments on items of the first tracker with `Codebeamer.add_comments`, then streams
+	every comment of those items back with `Codebeamer.iter_comments`, 8 items at a time."""
+	ids = _tracker_item_ids(app, _tracker_id(app))[:size]
+
+	def run():
+		cb.add_comments([(item_id, f'Reviewed {item_id}') for item_id in ids]).raise_for_errors()
+		for _ in cb.iter_comments(ids):
+			pass
+
+	return len(ids) * 2, run
+
+def bench_attachment_transfers(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Uploads a 256 KiB file to each of `size / 10` items and downloads them again, 4 at a
+	time, streaming both ways between disk and the connection."""
+	ids = _tracker_item_ids(app, _tracker_id(app))[:max(1, size // 10)]
+	directory = Path(tempfile.mkdtemp(prefix='pybeamer-bench-'))
+	source = directory / 'attachment.bin'
+	source.write_bytes(os.urandom(256 * 1024))
+
+	def run():
+		try:
+			cb.upload_attachments([(item_id, source) for item_id in ids]).raise_for_errors()
+			attachments = {a['id']: directory / f'{a["id"]}.bin' for a, _ in app.attachments.values() if a['itemId'] in ids}
+			cb.download_attachments(attachments).raise_for_errors()
+		finally:
+			shutil.rmtree(directory, ignore_errors=True)
+
+	return len(ids) * 2, run
+
+def bench_choice_lookups(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Looks up a status choice by name on many already loaded items of one tracker."""
+	ids = _tracker_item_ids(app, _tracker_id(app))[:size]
+	items = [cb.get_item(i) for i in ids]
+
+	def run():
+		for item in items:
+			item.get_field('Status').get_choice('Closed')
+
+	return len(items), run
+
+def bench_name_lookups(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Looks up projects, trackers, users, and fields by name."""
+	project = next(iter(app.projects.values()))['name']
+	tracker_data = next(iter(app.trackers.values()))
+	user = next(iter(app.users.values()))['name']
+	tracker = cb.get_tracker(tracker_data['id'])
+	lookups = max(1, size // 4)
+
+	def run():
+		for _ in range(lookups):
+			cb.get_project(project)
+			cb.get_tracker(tracker_data['name'])
+			cb.get_user(user)
+			tracker.get_field('Status')
+
+	return lookups * 4, run
+
+def bench_shared_lazy_loads(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Reads lazily loaded properties of the same objects from many threads at once. Shared
+	objects should only ever be loaded once."""
+	tracker_id = _tracker_id(app)
+	ids = _tracker_item_ids(app, tracker_id)[:25]
+
+	def run():
+		items = [TrackerItem(id=i, name='', type='TrackerItemReference', client=cb._client) for i in ids]
+		tracker = cb.get_tracker(tracker_id)
+		tracker._loaded = False
+		work = [items[n % len(items)] for n in range(size)]
+		with ThreadPoolExecutor(max_workers=16) as executor:
+			list(executor.map(lambda item: (item.description, tracker.key_name, tracker.created_by), work))
+
+	return size, run
+
+def bench_concurrent_reads(cb: Codebeamer, app: MockCodebeamer, size: int):
+	"""Fetches items by ID from 16 threads at once, the fan-out pattern that opens a connection
+	per thread over HTTP/1.1 but shares one over HTTP/2."""
+	ids = _tracker_item_ids(app, _tracker_id(app))
+	work = [ids[n % len(ids)] for n in range(size)]
+
+	def run():
+		with ThreadPoolExecutor(max_workers=16) as executor:
+			list(executor.map(cb.get_item, work))
+
+	return size, run
+
+BENCHMARKS: dict[str, Callable] = {
+	'pagination': bench_pagination,
+	'pagination_raw': bench_pagination_raw,
+	'hydration': bench_hydration,
+	'tracker_load': bench_tracker_load,
+	'hydration_table': bench_hydration_table,
+	'bulk_creation': bench_bulk_creation,
+	'field_updates': bench_field_updates,
+	'write_behind': bench_write_behind,
+	'idempotent_sync': bench_idempotent_sync,
+	'bulk_reparent': bench_bulk_reparent,
+	'bulk_delete': bench_bulk_delete,
+	'relation_graph': bench_relation_graph,
+	'item_history': bench_item_history,
+	'attachment_transfers': bench_attachment_transfers,
+	'bulk_comments': bench_bulk_comments,
+	'bulk_import': bench_bulk_import,
+	'bulk_export': bench_bulk_export,
+	'choice_lookups': bench_choice_lookups,
+	'name_lookups': bench_name_lookups,
+	'shared_lazy_loads': bench_shared_lazy_loads,
+	'concurrent_reads': bench_concurrent_reads,
+}
+
+def run_benchmarks(
+	names: list[str] | None = None,
+	size: int = 100,
+	app: MockCodebeamer | None = None,
+	transport: str = 'requests',
+	**mock_kwargs
+) -> list[BenchmarkResult]:
+	"""Runs benchmarks against a mock codeBeamer served over HTTP, or called directly with the
+	in-process transport to measure the client without any network overhead.
+
+	Params:
+	names — The benchmarks to run. If None then all of them are run. — list[str](None)
+	size — The number of operations for benchmarks that don't work on a whole tracker. — int(100)
+	app — The mock to benchmark against. If None one is created from `mock_kwargs`. — `MockCodebeamer`(None)
+	transport — The transport to use: 'requests', 'urllib3', 'httpx', 'http2', or 'inprocess'. 'http2' serves the mock over cleartext HTTP/2. — str('requests')
+
+	Returns:
+	list[`BenchmarkResult`] — The results in the order they were run."""
+	from .mock_server import MockServer
+	results: list[BenchmarkResult] = []
+	if transport == 'inprocess':
+		app = app or MockCodebeamer(**mock_kwargs)
+		for name in names or list(BENCHMARKS):
+			cb = Codebeamer('http://inprocess', 'bench', 'bench', transport=InProcessTransport(app.handle))
+			ops, run = BENCHMARKS[name](cb, app, size)
+			results.append(measure(name, app, run, ops, transport))
+		return results
+	http2 = transport == 'http2'
+	with MockServer(app=app, http2=http2, **mock_kwargs) as server:
+		for name in names or list(BENCHMARKS):
+			client_transport = Http2Transport(prior_knowledge=True) if http2 else transport
+			cb = Codebeamer(server.url, 'bench', 'bench', transport=client_transport)
+			ops, run = BENCHMARKS[name](cb, server.app, size)
+			results.append(measure(name, server.app, run, ops, transport))
+			cb._client.transport.close()
+	return results
@@ -0,0 +1,327 @@
+"""Checks that error responses from the mock codeBeamer surface as errors instead of being
+returned as data, both for a lone request and for GETs coalesced with one in flight on another
+thread, and that item writes are neither lost nor sent over someone else's changes. Run it with `python -m pybeamer.benchmarks.errors`, it exits with 1 if a check fails."""
+from __future__ import annotations
+from typing import Any, Callable
+
+import shutil
+import sys
+import tempfile
+from argparse import ArgumentParser
+from io import StringIO
+from pathlib import Path
+from threading import Event, Thread
+from time import sleep
+
+from ..client import Codebeamer
+from ..rest_client import RestClient
+from ..tracker_item import StaleItemError, TrackerItem
+from ..transport import HTTPError, InProcessTransport
+from .mock_server import MockCodebeamer
+from .stress import CountingHandler
+
+MISSING_ID = 999999
+
+class GatedHandler(CountingHandler):
+	"""Holds every request until `release` is called, so other threads can join it first."""
+
+	def __init__(self, app: MockCodebeamer):
+		super().__init__(app)
+		self.entered: Event = Event()
+		self.released: Event = Event()
+
+	def __call__(self, method: str, url: str, body: bytes | None = None, headers: dict[str, str] | None = None):
+		self.entered.set()
+		self.released.wait(5)
+		return super().__call__(method, url, body, headers)
+
+	def release(self):
+		self.released.set()
+
+class RejectingHandler(CountingHandler):
+	"""Answers every PUT with a 400 while `rejecting` is set."""
+
+	def __init__(self, app: MockCodebeamer):
+		super().__init__(app)
+		self.rejecting: bool = True
+
+	def __call__(self, method: str, url: str, body: bytes | None = None, headers: dict[str, str] | None = None):
+		if method == 'PUT' and self.rejecting:
+			return 400, {'Content-Type': 'application/json'}, b'{"message": "Rejected"}'
+		return super().__call__(method, url, body, headers)
+
+def _outcome(call: Callable[[], Any]) -> Any:
+	"""The result of a call, or the status code of the HTTPError it raised."""
+	try:
+		return call()
+	except HTTPError as e:
+		return e.response.status_code if e.response is not None else e
+
+def _status(error: Any) -> Any:
+	return error.response.status_code if isinstance(error, HTTPError) and error.response is not None else error
+
+def _check_direct(app: MockCodebeamer, coalesce: bool) -> list[str]:
+	client = RestClient('http://inprocess', 'errors', 'errors', transport=InProcessTransport(app.handle), coalesce=coalesce)
+	path = f'items/{MISSING_ID}/comments'
+	problems = []
+	raised = _outcome(lambda: client.request('GET', path, raise_for_status=True))
+	if raised != 404:
+		problems.append(f'GET {path} with raise_for_status and coalesce={coalesce} gave {raised!r}, expected HTTPError 404')
+	returned = _outcome(lambda: client.request('GET', path))
+	if not isinstance(returned, dict):
+		problems.append(f'GET {path} without raise_for_status and coalesce={coalesce} gave {returned!r}, expected the error body')
+	return problems
+
+def _check_shared(app: MockCodebeamer, leader_raises: bool) -> list[str]:
+	# The leader is held in the handler until the waiter has joined its request
+	handler = GatedHandler(app)
+	client = RestClient('http://inprocess', 'errors', 'errors', transport=InProcessTransport(handler), coalesce=True)
+	path = f'items/{MISSING_ID}/comments'
+	outcomes: dict[str, Any] = {}
+
+	def call(name: str, raise_for_status: bool):
+		outcomes[name] = _outcome(lambda: client.request('GET', path, raise_for_status=raise_for_status))
+
+	leader = Thread(target=call, args=('leader', leader_raises))
+	waiter = Thread(target=call, args=('waiter', not leader_raises))
+	leader.start()
+	handler.entered.wait(5)
+	waiter.start()
+	sleep(0.05)
+	handler.release()
+	leader.join()
+	waiter.join()
+	problems = []
+	sent = handler.count('GET', path)
+	if sent != 1:
+		problems.append(f'{sent} requests were sent for two coalesced GETs of {path}, expected one')
+	raising, returning = ('leader', 'waiter') if leader_raises else ('waiter', 'leader')
+	if outcomes.get(raising) != 404:
+		problems.append(f'the coalesced {raising} with raise_for_status gave {outcomes.get(raising)!r}, expected HTTPError 404')
+	if not isinstance(outcomes.get(returning), dict):
+		problems.append(f'the coalesced {returning} without raise_for_status gave {outcomes.get(returning)!r}, expected the error body')
+	return problems
+
+def _codebeamer(app: MockCodebeamer) -> Codebeamer:
+	return Codebeamer('http://inprocess', 'errors', 'errors', transport=InProcessTransport(app.handle))
+
+def _item_ids(app: MockCodebeamer, count: int) -> list[int]:
+	return sorted(app.items)[:count]
+
+def _check_comments(app: MockCodebeamer) -> list[str]:
+	cb = _codebeamer(app)
+	first, last = _item_ids(app, 2)
+	items = [first, MISSING_ID, last]
+	problems = []
+	seen: list[int] = []
+
+	def stream() -> list[int]:
+		for comment in cb.iter_comments(items, workers=2):
+			seen.append(comment.item_id)
+		return seen
+
+	raised = _outcome(stream)
+	if raised != 404:
+		problems.append(f'iter_comments over a missing item gave {raised!r}, expected HTTPError 404')
+	elif MISSING_ID in seen or last in seen:
+		problems.append(f'iter_comments yielded comments of items {sorted(set(seen))} before raising for item {MISSING_ID}')
+	skipped = _outcome(lambda: {c.item_id for c in cb.iter_comments(items, workers=2, skip_errors=True)})
+	if not isinstance(skipped, set) or MISSING_ID in skipped:
+		problems.append(f'iter_comments with skip_errors over a missing item gave {skipped!r}, expected the other items')
+	return problems
+
+def _check_downloads(app: MockCodebeamer) -> list[str]:
+	cb = _codebeamer(app)
+	item_id = _item_ids(app, 1)[0]
+	directory = Path(tempfile.mkdtemp(prefix='pybeamer-errors-'))
+	try:
+		source = directory / 'attachment.bin'
+		source.write_bytes(b'attachment')
+		cb.upload_attachments([(item_id, source)]).raise_for_errors()
+		uploaded = max(app.attachments)
+		# Into a directory, so the missing attachment's name has to be fetched first
+		output = directory / 'downloads'
+		output.mkdir()
+		report = _outcome(lambda: cb.download_attachments({uploaded: output, MISSING_ID: output}))
+	finally:
+		shutil.rmtree(directory, ignore_errors=True)
+	if not hasattr(report, 'failed'):
+		return [f'download_attachments with a missing attachment gave {report!r}, expected a report']
+	problems = []
+	error = report.failed.get(MISSING_ID)
+	if _status(error) != 404:
+		problems.append(f'download_attachments recorded {error!r} for a missing attachment, expected HTTPError 404')
+	if report.succeeded != [uploaded]:
+		problems.append(f'download_attachments succeeded for {report.succeeded}, expected [{uploaded}]')
+	return problems
+
+def _check_rejected_writes(app: MockCodebeamer, write_behind: bool) -> list[str]:
+	handler = RejectingHandler(app)
+	cb = Codebeamer('http://inprocess', 'errors', 'errors', transport=InProcessTransport(handler))
+	item = cb.get_item(_item_ids(app, 1)[0])
+	mode = 'queued' if write_behind else 'direct'
+	problems = []
+	for attempt, rejecting in enumerate([True, False]):
+		handler.rejecting = rejecting
+		if write_behind:
+			cb.enable_write_behind(workers=2)
+		item.set_field('Custom 0', f'{mode} update')
+		raised = _outcome(item.update)
+		if write_behind:
+			failed = len(cb.disable_write_behind().failed)
+			raised = 400 if failed else raised
+		field = item.get_field('Custom 0')
+		if rejecting and (raised != 400 or not field.dirty):
+			problems.append(f'a rejected {mode} update gave {raised!r} and left the field dirty={field.dirty}, expected a 400 and a dirty field')
+		if not rejecting and (raised is not True or field.dirty):
+			problems.append(f're-sending a rejected {mode} update gave {raised!r} and left the field dirty={field.dirty}, expected it sent and clean')
+	handler.rejecting = True
+	field = item.get_field('Custom 1')
+	if write_behind:
+		cb.enable_write_behind(workers=2)
+	raised = _outcome(lambda: setattr(field, 'value', f'{mode} value'))
+	if write_behind:
+		raised = 400 if cb.disable_write_behind().failed else raised
+	if raised != 400 or not field.dirty:
+		problems.append(f'a rejected {mode} Field.value gave {raised!r} and left the field dirty={field.dirty}, expected a 400 and a dirty field')
+	return problems
+
+def _check_staged_writes(app: MockCodebeamer) -> list[str]:
+	# Staged through the fields built from the item's payload rather than `set_field`
+	handler = CountingHandler(app)
+	cb = Codebeamer('http://inprocess', 'errors', 'errors', transport=InProcessTransport(handler))
+	item = cb.get_item(_item_ids(app, 1)[0])
+	custom, status = item.custom_fields[0], item.status
+	custom.stage(f'staged {app.items[item.id]["version"]}')
+	status.stage(next(c for c in status.get_choices() if c != status.value))
+	sent = item.update()
+	problems = []
+	puts = handler.count('PUT', f'items/{item.id}/fields')
+	if sent is not True or puts != 1:
+		problems.append(f'an update of fields staged through custom_fields and status gave {sent!r} with {puts} PUTs, expected one PUT')
+	if custom.dirty or status.dirty:
+		problems.append(f'fields staged through custom_fields and status were left dirty={custom.dirty, status.dirty} after the update')
+	return problems
+
+def _check_stale_update(app: MockCodebeamer, reference: bool) -> list[str]:
+	handler = CountingHandler(app)
+	cb = Codebeamer('http://inprocess', 'errors', 'errors', transport=InProcessTransport(handler))
+	item_id = _item_ids(app, 2)[1]
+	if reference:
+		item = TrackerItem(id=item_id, name='', type='TrackerItemReference', client=cb._client)
+	else:
+		item = cb.get_item(item_id)
+	kind = 'reference' if reference else 'loaded'
+	item.set_field('Custom 0', f'stale {kind} update')
+	# Someone else changes the item after it was read
+	_codebeamer(app).get_item(item_id).update_field('Custom 1', f'other {kind} update')
+	problems = []
+	try:
+		item.update()
+		problems.append(f'updating a {kind} item changed since it was read didn\'t raise StaleItemError')
+	except StaleItemError:
+		pass
+	puts = handler.count('PUT', f'items/{item_id}/fields')
+	if puts or not item.get_field('Custom 0').dirty:
+		problems.append(f'a stale update of a {kind} item sent {puts} PUTs, expected none and the field left dirty')
+	return problems
+
+def _check_tree(app: MockCodebeamer) -> list[str]:
+	cb = _codebeamer(app)
+	missing = TrackerItem(id=MISSING_ID, name='', type='TrackerItemReference', client=cb._client)
+	raised = _outcome(lambda: cb.walk_tree(missing))
+	if raised != 404:
+		return [f'walk_tree from a missing item gave {raised!r}, expected HTTPError 404']
+	return []
+
+def _check_export(app: MockCodebeamer) -> list[str]:
+	def failing_queries(method: str, url: str, body: bytes | None = None, headers: dict[str, str] | None = None):
+		if method == 'POST' and 'items/query' in url:
+			return 500, {'Content-Type': 'application/json'}, b'{"message": "Failed"}'
+		return app.handle(method, url, body, headers)
+
+	cb = Codebeamer('http://inprocess', 'errors', 'errors', transport=InProcessTransport(failing_queries))
+	tracker = cb.get_tracker(next(iter(app.trackers)))
+	raised = _outcome(lambda: tracker.export_items(StringIO(), format='jsonl', hydrate=True))
+	if raised != 500:
+		return [f'exporting a tracker whose items can\'t be fetched gave {raised!r}, expected HTTPError 500']
+	return []
+
+def _check_import_columns(app: MockCodebeamer) -> list[str]:
+	# Like JSON Lines with optional keys, the second row has a column the first doesn't
+	cb = _codebeamer(app)
+	tracker = cb.get_tracker(next(iter(app.trackers)))
+	report = tracker.import_items([{'name': 'first'}, {'name': 'second', 'Custom 0': 'optional'}], workers=1)
+	item_id = report.created.get('2')
+	values = [c['value'] for c in app.items[item_id]['customFields'] if c['name'] == 'Custom 0'] if item_id else []
+	if values != ['optional']:
+		return [f'importing a column only the second row has gave Custom 0 {values!r} with {report!r}, expected [\'optional\']']
+	return []
+
+def _check_history(app: MockCodebeamer) -> list[str]:
+	cb = _codebeamer(app)
+	item_id = _item_ids(app, 1)[0]
+	problems = []
+	table = cb.get_history([item_id, MISSING_ID], workers=2)
+	if _status(table.failed.get(MISSING_ID)) != 404 or item_id in table.failed:
+		problems.append(f'get_history over a missing item recorded {table.failed!r}, expected only item {MISSING_ID} with HTTPError 404')
+	missing = TrackerItem(id=MISSING_ID, name='', type='TrackerItemReference', client=cb._client)
+	raised = _outcome(missing.get_history)
+	if raised != 404:
+		problems.append(f'TrackerItem.get_history of a missing item gave {raised!r}, expected HTTPError 404')
+	return problems
+
+def _check_relations(app: MockCodebeamer) -> list[str]:
+	cb = _codebeamer(app)
+	item_id = next(i for i in sorted(app.items) if app.upstream.get(i) or app.downstream.get(i))
+	problems = []
+	graph = cb.get_relation_graph([item_id, MISSING_ID], workers=2)
+	if _status(graph.failed.get(MISSING_ID)) != 404 or item_id in graph.failed:
+		problems.append(f'get_relation_graph over a missing item recorded {graph.failed!r}, expected only item {MISSING_ID} with HTTPError 404')
+	if MISSING_ID not in graph or graph.fetched[graph.index_of(MISSING_ID)]:
+		problems.append(f'get_relation_graph marked the missing item {MISSING_ID} as fetched')
+	if not graph.edge_count:
+		problems.append(f'get_relation_graph lost the edges of item {item_id}')
+	missing = TrackerItem(id=MISSING_ID, name='', type='TrackerItemReference', client=cb._client)
+	raised = _outcome(missing.get_relations)
+	if raised != 404:
+		problems.append(f'TrackerItem.get_relations of a missing item gave {raised!r}, expected HTTPError 404')
+	return problems
+
+def check() -> list[str]:
+	"""Runs every error check against a small mock.
+
+	Returns:
+	list[str] — The problems found, empty if the checks passed."""
+	app = MockCodebeamer(projects=1, trackers_per_project=2, items_per_tracker=10)
+	return [
+		*_check_direct(app, coalesce=False),
+		*_check_direct(app, coalesce=True),
+		*_check_shared(app, leader_raises=True),
+		*_check_shared(app, leader_raises=False),
+		*_check_comments(app),
+		*_check_downloads(app),
+		*_check_rejected_writes(app, write_behind=False),
+		*_check_rejected_writes(app, write_behind=True),
+		*_check_staged_writes(app),
+		*_check_stale_update(app, reference=False),
+		*_check_stale_update(app, reference=True),
+		*_check_tree(app),
+		*_check_export(app),
+		*_check_import_columns(app),
+		*_check_history(app),
+		*_check_relations(app),
+	]
+
+def main():
+	parser = ArgumentParser(description='Check that error responses surface as errors.')
+	parser.parse_args()
+	problems = check()
+	for problem in problems:
+		print(f'FAIL: {problem}')
+	if not problems:
+		print('OK: every error check passed')
+	sys.exit(1 if problems else 0)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,88 @@
+"""Measures what `import pybeamer` costs with `python -X importtime` and checks that none of
+the heavy dependencies are imported until they're needed. Run it with
+`python -m pybeamer.benchmarks.importtime`, it exits with 1 if the check fails."""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+PACKAGE = __package__.split('.')[0]
+# Modules that must not be imported by `import pybeamer` alone
+HEAVY_MODULES = ('requests', 'urllib3', 'loguru', 'httpx', 'h2', 'numpy', 'pyarrow', 'concurrent.futures')
+
+class ImportTime:
+	"""One line of `-X importtime` output. Times are in microseconds."""
+
+	def __init__(self, name: str, self_us: int, cumulative_us: int, depth: int):
+		self.name: str = name
+		self.self_us: int = self_us
+		self.cumulative_us: int = cumulative_us
+		self.depth: int = depth
+
+	def __repr__(self) -> str:
+		return f'ImportTime(name={self.name}, cumulative_us={self.cumulative_us})'
+
+def import_times(statement: str = f'import {PACKAGE}') -> list[ImportTime]:
+	"""Runs a statement in a fresh interpreter with `-X importtime`.
+
+	Params:
+	statement — The code to time. — str('import pybeamer')
+
+	Returns:
+	list[`ImportTime`] — Every module the statement imported, in the order their imports finished. Modules imported during interpreter startup are left out."""
+	env = {**os.environ, 'PYTHONPATH': os.pathsep.join(p for p in sys.path if p)}
+	result = subprocess.run(
+		[sys.executable, '-X', 'importtime', '-c', statement],
+		capture_output=True,
+		text=True,
+		env=env,
+		check=True,
+	)
+	times: list[ImportTime] = []
+	for line in result.stderr.splitlines():
+		if not line.startswith('import time:') or 'self [us]' in line:
+			continue
+		self_us, cumulative_us, name = line[len('import time:'):].split('|')
+		times.append(ImportTime(name.strip(), int(self_us), int(cumulative_us), (len(name) - len(name.lstrip()) - 1) // 2))
+	# Everything up to `site` is imported by the interpreter before the statement runs
+	startup = next((i for i, t in enumerate(times) if t.name == 'site' and t.depth == 0), -1)
+	return times[startup + 1:]
+
+def check(statement: str = f'import {PACKAGE}', budget_ms: float | None = None, forbidden: tuple[str, ...] = HEAVY_MODULES) -> list[str]:
+	"""Checks that a statement doesn't import any forbidden module and, optionally, that the
+	package imports within a time budget.
+
+	Params:
+	statement — The code to time. — str('import pybeamer')
+	budget_ms — The most milliseconds the package import may take. If None time isn't checked. — float(None)
+	forbidden — Modules that must not be imported. — tuple[str](HEAVY_MODULES)
+
+	Returns:
+	list[str] — The problems found, empty if the check passed."""
+	times = import_times(statement)
+	names = {t.name for t in times}
+	problems = [f'{name} is imported by `{statement}`' for name in forbidden if name in names]
+	if budget_ms is not None:
+		package = next((t for t in times if t.name == PACKAGE), None)
+		if package is not None and package.cumulative_us / 1000 > budget_ms:
+			problems.append(f'{PACKAGE} took {package.cumulative_us / 1000:.1f}ms to import, the budget is {budget_ms}ms')
+	return problems
+
+def main():
+	parser = ArgumentParser(description=f'Check the import time of {PACKAGE}.')
+	parser.add_argument('--statement', default=f'import {PACKAGE}', help='The code to time.')
+	parser.add_argument('--budget-ms', type=float, default=None, help='Fail if the package import takes longer.')
+	parser.add_argument('--top', type=int, default=10, help='How many of the slowest imports to show.')
+	args = parser.parse_args()
+	times = import_times(args.statement)
+	for t in sorted(times, key=lambda t: -t.cumulative_us)[:args.top]:
+		print(f'{t.cumulative_us / 1000:>8.1f}ms  {t.name}')
+	problems = check(args.statement, args.budget_ms)
+	for problem in problems:
+		print(f'FAIL: {problem}')
+	sys.exit(1 if problems else 0)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,870 @@
+from __future__ import annotations
+from typing import Any, Callable
+
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+from threading import Condition, Lock, Thread
+from time import sleep
+from urllib.parse import parse_qs, urlsplit
+
+API_ROOT = '/cb/api/v3'
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+def _timestamp(offset: int = 0) -> str:
+	return (datetime(2024, 1, 1) + timedelta(minutes=offset)).strftime(DATE_FORMAT)[:-3]
+
+def _multipart_parts(body: bytes) -> list[tuple[bytes, bytes]]:
+	"""Splits a multipart body into the headers and content of each part."""
+	# The boundary is the first line of a multipart body
+	boundary = body[:body.index(b'\r\n')]
+	parts = []
+	for part in body.split(boundary)[1:-1]:
+		head, _, content = part[2:].partition(b'\r\n\r\n')
+		# Each part ends with the CRLF before the next boundary
+		parts.append((head, content[:-2]))
+	return parts
+
+def _ref(id: int, name: str, type: str, **kwargs) -> dict[str, Any]:
+	return {'id': id, 'name': name, 'type': type, **kwargs}
+
+class MockCodebeamer:
+	"""An in-memory stand-in for the parts of the codeBeamer v3 API pybeamer uses. It holds
+	generated projects, trackers, items, and users and answers requests through
+	`MockCodebeamer.handle`, so it can sit behind an HTTP server or be called directly.
+
+	Params:
+	projects — The number of projects. — int(2)
+	trackers_per_project — The number of trackers in each project. — int(2)
+	items_per_tracker — The number of items in each tracker. — int(200)
+	users — The number of users. — int(50)
+	custom_fields — The number of extra text custom fields on every item, to grow payloads. — int(5)
+	description_size — The length of every item description in characters. — int(200)
+	fanout — The number of children of each item in a tracker's hierarchy. — int(5)
+	roots — The number of top level items in each tracker. — int(10)
+	latency — Seconds to wait before answering each request. — float(0)
+	rate_limit_every — Answer every Nth request with a 429 and `Retry-After: 0`. 0 disables it. The same request is never rate limited twice, so the client's single retry always gets through. — int(0)
+	history_versions — The number of past versions every generated item has in its history. — int(3)
+	comments_per_item — The number of comments every generated item starts with. — int(2)"""
+
+	def __init__(
+		self,
+		projects: int = 2,
+		trackers_per_project: int = 2,
+		items_per_tracker: int = 200,
+		users: int = 50,
+		custom_fields: int = 5,
+		description_size: int = 200,
+		fanout: int = 5,
+		roots: int = 10,
+		latency: float = 0,
+		rate_limit_every: int = 0,
+		history_versions: int = 3,
+		comments_per_item: int = 2,
+	):
+		self.latency: float = latency
+		self.rate_limit_every: int = rate_limit_every
+		self.history_versions: int = history_versions
+		# item ID -> the history entries of writes made through the mock
+		self.history: dict[int, list[dict[str, Any]]] = {}
+		self.custom_field_count: int = custom_fields
+		self.description_size: int = description_size
+		self.request_count: int = 0
+		self.rate_limited_count: int = 0
+		self.connection_count: int = 0
+		self.requests_by_route: dict[str, int] = {}
+		# The requests that were answered with a 429, so their retry isn't
+		self._rate_limited: set[tuple] = set()
+		self._lock: Lock = Lock()
+		self._next_item_id: int = 1000
+		self.statuses = [_ref(i, n, 'ChoiceOptionReference') for i, n in enumerate(['New', 'In Progress', 'Resolved', 'Closed'], 1)]
+		self.priorities = [_ref(i, n, 'ChoiceOptionReference') for i, n in enumerate(['Unset', 'Low', 'Normal', 'High'])]
+		self.users: dict[int, dict[str, Any]] = {}
+		for i in range(1, users + 1):
+			self.users[i] = {
+				'id': i, 'name': f'user{i}', 'email': f'user{i}@example.com', 'firstName': 'User', 'lastName': str(i),
+				'registryDate': _timestamp(), 'lastLoginDate': _timestamp(i), 'status': 'ACTIVATED',
+			}
+		self.projects: dict[int, dict[str, Any]] = {}
+		self.trackers: dict[int, dict[str, Any]] = {}
+		self.items: dict[int, dict[str, Any]] = {}
+		self.children: dict[int, list[int]] = {}
+		self.tracker_roots: dict[int, list[int]] = {}
+		# item ID -> the IDs of the items it references (its upstream references)
+		self.upstream: dict[int, list[int]] = {}
+		self.downstream: dict[int, list[int]] = {}
+		self.associations: dict[int, dict[str, Any]] = {}
+		self._next_association_id: int = 1
+		# attachment ID -> (attachment JSON, content)
+		self.attachments: dict[int, tuple[dict[str, Any], bytes]] = {}
+		self._next_attachment_id: int = 1
+		self.comments_per_item: int = comments_per_item
+		# item ID -> its comments, made the first time they're asked for
+		self.comments: dict[int, list[dict[str, Any]]] = {}
+		self._next_comment_id: int = 1
+		self.association_types = [_ref(i, n, 'AssociationTypeReference') for i, n in enumerate(['depends', 'parent', 'child', 'related', 'derived', 'violates'], 1)]
+		for p in range(1, projects + 1):
+			self.projects[p] = {
+				'id': p, 'name': f'Project {p}', 'keyName': f'P{p}', 'description': '', 'descriptionFormat': 'PlainText',
+				'version': 1, 'category': None, 'closed': False, 'deleted': False, 'template': False,
+				'createdAt': _timestamp(), 'createdBy': self._user_ref(1), 'modifiedAt': _timestamp(), 'modifiedBy': self._user_ref(1),
+			}
+			for t in range(1, trackers_per_project + 1):
+				tracker_id = p * 100 + t
+				self.trackers[tracker_id] = {
+					'id': tracker_id, 'name': f'Tracker {tracker_id}', 'keyName': f'T{tracker_id}', 'description': '',
+					'descriptionFormat': 'PlainText', 'version': 1, 'createdAt': _timestamp(), 'createdBy': self._user_ref(1),
+					'modifiedAt': _timestamp(), 'modifiedBy': self._user_ref(1), 'type': {'id': 5, 'name': 'Requirement'},
+					'deleted': False, 'hidden': False, 'project': _ref(p, f'Project {p}', 'ProjectReference'),
+				}
+				self.tracker_roots[tracker_id] = []
+				tracker_items: list[int] = []
+				for k in range(items_per_tracker):
+					parent = tracker_items[(k - roots) // fanout] if k >= roots else None
+					item = self._new_item(tracker_id, f'Item {k}', parent_id=parent)
+					tracker_items.append(item['id'])
+				# Items of every later tracker in a project trace up to the same position in the first
+				if t == 1:
+					first_tracker_items = tracker_items
+				else:
+					for item_id, upstream_id in zip(tracker_items, first_tracker_items):
+						self.upstream.setdefault(item_id, []).append(upstream_id)
+						self.downstream.setdefault(upstream_id, []).append(item_id)
+		self._routes: list[tuple[str, re.Pattern, Callable]] = [
+			('GET', re.compile(r'projects'), self._get_projects),
+			('POST', re.compile(r'projects/search'), self._search_projects),
+			('GET', re.compile(r'projects/(\d+)'), self._get_project),
+			('GET', re.compile(r'projects/(\d+)/trackers'), self._get_project_trackers),
+			('GET', re.compile(r'trackers/(\d+)'), self._get_tracker),
+			('GET', re.compile(r'trackers/(\d+)/fields'), self._get_tracker_fields),
+			('GET', re.compile(r'trackers/(\d+)/fields/(\d+)'), self._get_tracker_field),
+			('GET', re.compile(r'trackers/(\d+)/items'), self._get_tracker_items),
+			('POST', re.compile(r'trackers/(\d+)/items'), self._create_item),
+			('GET', re.compile(r'trackers/(\d+)/children'), self._get_tracker_children),
+			('POST', re.compile(r'items/query'), self._query_items),
+			('GET', re.compile(r'items/(\d+)'), self._get_item),
+			('DELETE', re.compile(r'items/(\d+)'), self._delete_item),
+			('GET', re.compile(r'items/(\d+)/children'), self._get_item_children),
+			('PATCH', re.compile(r'items/(\d+)/children'), self._patch_item_children),
+			('POST', re.compile(r'items/(\d+)/children'), self._add_item_child),
+			('PATCH', re.compile(r'trackers/(\d+)/children'), self._patch_tracker_children),
+			('GET', re.compile(r'items/(\d+)/fields'), self._get_item_fields),
+			('PUT', re.compile(r'items/(\d+)/fields'), self._put_item_fields),
+			('GET', re.compile(r'items/(\d+)/fields/(\d+)/options'), self._get_field_options),
+			('GET', re.compile(r'items/(\d+)/relations'), self._get_item_relations),
+			('GET', re.compile(r'items/(\d+)/history'), self._get_item_history),
+			('POST', re.compile(r'associations'), self._create_association),
+			('GET', re.compile(r'associations/types'), self._get_association_types),
+			('GET', re.compile(r'associations/(\d+)'), self._get_association),
+			('DELETE', re.compile(r'associations/(\d+)'), self._delete_association),
+			('GET', re.compile(r'items/(\d+)/attachments'), self._get_item_attachments),
+			('POST', re.compile(r'items/(\d+)/attachments'), self._upload_attachments),
+			('GET', re.compile(r'items/(\d+)/comments'), self._get_item_comments),
+			('POST', re.compile(r'items/(\d+)/comments'), self._post_comment),
+			('POST', re.compile(r'items/(\d+)/comments/(\d+)'), self._post_comment),
+			('GET', re.compile(r'attachments/(\d+)'), self._get_attachment),
+			('GET', re.compile(r'attachments/(\d+)/content'), self._get_attachment_content),
+			('GET', re.compile(r'users'), self._get_users),
+			('GET', re.compile(r'users/findByName'), self._find_user_by_name),
+			('GET', re.compile(r'users/findByEmail'), self._find_user_by_email),
+			('GET', re.compile(r'users/(\d+)'), self._get_user),
+		]
+
+	# Data helpers
+
+	def _user_ref(self, id: int) -> dict[str, Any]:
+		return _ref(id, f'user{id}', 'UserReference', email=f'user{id}@example.com')
+
+	def _new_item(self, tracker_id: int, name: str, parent_id: int | None = None, **kwargs) -> dict[str, Any]:
+		with self._lock:
+			item_id = self._next_item_id
+			self._next_item_id += 1
+		tracker = self.trackers[tracker_id]
+		item = {
+			'id': item_id,
+			'name': name,
+			'description': kwargs.get('description') or ('x' * self.description_size),
+			'descriptionFormat': kwargs.get('descriptionFormat', 'PlainText'),
+			'createdAt': _timestamp(item_id % 10000),
+			'createdBy': self._user_ref(1 + item_id % len(self.users)),
+			'modifiedAt': _timestamp(item_id % 10000 + 1),
+			'modifiedBy': self._user_ref(1 + item_id % len(self.users)),
+			'version': 1 + self.history_versions,
+			'assignedTo': [self._user_ref(1 + item_id % len(self.users))],
+			'tracker': _ref(tracker_id, tracker['name'], 'TrackerReference'),
+			'priority': self.priorities[item_id % len(self.priorities)],
+			'status': self.statuses[item_id % len(self.statuses)],
+			'typeName': 'Requirement',
+			'ordinal': 0,
+			'customFields': [
+				{'fieldId': 10000 + f, 'name': f'Custom {f}', 'type': 'TextFieldValue', 'value': f'value {f} of {item_id}'}
+				for f in range(self.custom_field_count)
+			],
+			'children': [],
+			'comments': [],
+			'tags': [],
+		}
+		if parent_id is not None:
+			parent = self.items[parent_id]
+			item['parent'] = _ref(parent_id, parent['name'], 'TrackerItemReference')
+			self.children[parent_id].append(item_id)
+			item['ordinal'] = len(self.children[parent_id]) - 1
+		else:
+			self.tracker_roots[tracker_id].append(item_id)
+			item['ordinal'] = len(self.tracker_roots[tracker_id]) - 1
+		self.items[item_id] = item
+		self.children[item_id] = []
+		return item
+
+	def _item_ref(self, item_id: int) -> dict[str, Any]:
+		return _ref(item_id, self.items[item_id]['name'], 'TrackerItemReference')
+
+	def _full_item(self, item_id: int) -> dict[str, Any]:
+		item = dict(self.items[item_id])
+		item['children'] = [self._item_ref(c) for c in self.children[item_id][:25]]
+		return item
+
+	def _item_fields(self, item_id: int) -> dict[str, Any]:
+		item = self.items[item_id]
+		return {
+			'itemId': item_id,
+			'editableFields': [
+				{'fieldId': 3, 'name': 'Summary', 'type': 'TextFieldValue', 'value': item['name']},
+				{'fieldId': 7, 'name': 'Status', 'type': 'ChoiceFieldValue', 'values': [item['status']]},
+				{'fieldId': 2, 'name': 'Priority', 'type': 'ChoiceFieldValue', 'values': [item['priority']]},
+				*[dict(f) for f in item['customFields']],
+			],
+			'readOnlyFields': [
+				{'fieldId': 0, 'name': 'ID', 'type': 'IntegerFieldValue', 'value': item_id},
+			],
+		}
+
+	@staticmethod
+	def _page(params: dict[str, Any], records: list[Any], key: str) -> dict[str, Any]:
+		page = int(params.get('page', 1))
+		page_size = int(params.get('pageSize', 25))
+		start = (page - 1) * page_size
+		return {'page': page, 'pageSize': page_size, 'total': len(records), key: records[start:start + page_size]}
+
+	# Route handlers
+
+	def _get_projects(self, params, body):
+		return [_ref(p['id'], p['name'], 'ProjectReference') for p in self.projects.values()]
+
+	def _search_projects(self, params, body):
+		found = [p for p in self.projects.values() if p['keyName'] == body.get('keyName')]
+		return {'total': len(found), 'projects': found}
+
+	def _get_project(self, params, body, project_id):
+		return self.projects.get(int(project_id))
+
+	def _get_project_trackers(self, params, body, project_id):
+		return [
+			_ref(t['id'], t['name'], 'TrackerReference')
+			for t in self.trackers.values() if t['project']['id'] == int(project_id)
+		]
+
+	def _get_tracker(self, params, body, tracker_id):
+		return self.trackers.get(int(tracker_id))
+
+	def _get_tracker_fields(self, params, body, tracker_id):
+		fields = [(3, 'Summary'), (7, 'Status'), (2, 'Priority')]
+		fields += [(10000 + f, f'Custom {f}') for f in range(self.custom_field_count)]
+		return [{'id': i, 'name': n, 'type': 'FieldReference', 'trackerId': int(tracker_id)} for i, n in fields]
+
+	def _get_tracker_field(self, params, body, tracker_id, field_id):
+		field_id = int(field_id)
+		field = {'id': field_id, 'trackerId': int(tracker_id), 'hidden': False, 'multipleValues': False, 'sharedFields': []}
+		if field_id == 7:
+			return {
+				**field, 'name': 'Status', 'type': 'OptionChoiceField', 'valueModel': 'ChoiceFieldValue<ChoiceOptionReference>',
+				'options': self.statuses, 'trackerItemField': 'status',
+			}
+		if field_id == 2:
+			return {
+				**field, 'name': 'Priority', 'type': 'OptionChoiceField', 'valueModel': 'ChoiceFieldValue<ChoiceOptionReference>',
+				'options': self.priorities, 'trackerItemField': 'priority',
+			}
+		if field_id == 3:
+			return {**field, 'name': 'Summary', 'type': 'TextField', 'valueModel': 'TextFieldValue', 'trackerItemField': 'name'}
+		return {**field, 'name': f'Custom {field_id - 10000}', 'type': 'TextField', 'valueModel': 'TextFieldValue'}
+
+	def _get_tracker_items(self, params, body, tracker_id):
+		tracker_id = int(tracker_id)
+		refs = [self._item_ref(i) for i, item in self.items.items() if item['tracker']['id'] == tracker_id]
+		return self._page(params, refs, 'itemRefs')
+
+	def _get_tracker_children(self, params, body, tracker_id):
+		return self._page(params, [self._item_ref(i) for i in self.tracker_roots[int(tracker_id)]], 'itemRefs')
+
+	def _create_item(self, params, body, tracker_id):
+		if not body.get('name'):
+			return 400, {'message': 'name is required'}
+		parent = params.get('parentItemId')
+		if parent and int(parent) not in self.items:
+			return 404, {'message': 'Parent not found'}
+		item = self._new_item(
+			int(tracker_id),
+			body.get('name'),
+			parent_id=int(parent) if parent else None,
+			description=body.get('description'),
+			descriptionFormat=body.get('descriptionFormat', 'PlainText'),
+		)
+		for key in ('status', 'priority'):
+			if body.get(key):
+				item[key] = body[key]
+		values = {f.get('fieldId'): f for f in body.get('customFields') or []}
+		for custom in item['customFields']:
+			if custom['fieldId'] in values:
+				custom['value'] = values[custom['fieldId']].get('value')
+		return self._full_item(item['id'])
+
+	def _query_items(self, params, body):
+		query = body.get('queryString', '')
+		ids = list(self.items)
+		match = re.search(r'tracker\.id IN \(([\d, ]+)\)', query)
+		if match:
+			trackers = {int(t) for t in match.group(1).split(',')}
+			ids = [i for i in ids if self.items[i]['tracker']['id'] in trackers]
+		match = re.search(r'item\.id IN \(([\d, ]+)\)', query)
+		if match:
+			wanted = [int(i) for i in match.group(1).split(',')]
+			ids = [i for i in wanted if i in self.items]
+		page = self._page(body, ids, 'items')
+		page['items'] = [self._full_item(i) for i in page['items']]
+		return page
+
+	def _get_item(self, params, body, item_id):
+		item_id = int(item_id)
+		return self._full_item(item_id) if item_id in self.items else (404, {'message': 'Not found'})
+
+	def _delete_item(self, params, body, item_id):
+		item_id = int(item_id)
+		item = self.items.pop(item_id, None)
+		if item is None:
+			return 404, {'message': 'Not found'}
+		parent = item.get('parent')
+		siblings = self.children[parent['id']] if parent else self.tracker_roots[item['tracker']['id']]
+		if item_id in siblings:
+			siblings.remove(item_id)
+		return None
+
+	def _get_item_children(self, params, body, item_id):
+		if int(item_id) not in self.items:
+			return 404, {'message': 'Not found'}
+		return self._page(params, [self._item_ref(i) for i in self.children[int(item_id)]], 'itemRefs')
+
+	def _siblings(self, item_id: int) -> list[int]:
+		parent = self.items[item_id].get('parent')
+		return self.children[parent['id']] if parent else self.tracker_roots[self.items[item_id]['tracker']['id']]
+
+	def _move_item(self, item_id: int, parent_id: int | None, index: int | None = None):
+		with self._lock:
+			item = self.items[item_id]
+			self._siblings(item_id).remove(item_id)
+			if parent_id is None:
+				item.pop('parent', None)
+			else:
+				item['parent'] = self._item_ref(parent_id)
+			siblings = self._siblings(item_id)
+			siblings.insert(len(siblings) if index is None else index, item_id)
+			for ordinal, sibling in enumerate(siblings):
+				self.items[sibling]['ordinal'] = ordinal
+
+	def _update_children(self, body, parent_id: int | None, current: list[int]):
+		ids = [ref['id'] for ref in body.get('children', [])]
+		missing = [i for i in ids if i not in self.items]
+		if missing:
+			return 404, {'message': f'Items not found: {missing}'}
+		match body.get('mode', 'INSERT'):
+			case 'INSERT':
+				for item_id in ids:
+					self._move_item(item_id, parent_id)
+			case 'REPLACE':
+				for item_id in [i for i in current if i not in ids]:
+					self._move_item(item_id, None)
+				for index, item_id in enumerate(ids):
+					self._move_item(item_id, parent_id, index)
+			case 'REMOVE':
+				for item_id in ids:
+					if item_id in current:
+						self._move_item(item_id, None)
+			case mode:
+				return 400, {'message': f'Unknown mode {mode}'}
+		return {'children': [self._item_ref(i) for i in current[:25]]}
+
+	def _patch_item_children(self, params, body, item_id):
+		item_id = int(item_id)
+		if item_id not in self.items:
+			return 404, {'message': 'Not found'}
+		return self._update_children(body, item_id, self.children[item_id])
+
+	def _patch_tracker_children(self, params, body, tracker_id):
+		return self._update_children(body, None, self.tracker_roots[int(tracker_id)])
+
+	def _add_item_child(self, params, body, item_id):
+		item_id = int(item_id)
+		child_id = body.get('itemReference', {}).get('id')
+		if item_id not in self.items or child_id not in self.items:
+			return 404, {'message': 'Not found'}
+		self._move_item(child_id, item_id, body.get('childIndex'))
+		return self._item_ref(child_id)
+
+	def _get_item_fields(self, params, body, item_id):
+		return self._item_fields(int(item_id))
+
+	def _put_item_fields(self, params, body, item_id):
+		item = self.items[int(item_id)]
+		changes = []
+		for value in body.get('fieldValues', []):
+			field_id = value.get('fieldId')
+			if field_id == 3:
+				changes.append(('Summary', item['name'], value.get('value')))
+				item['name'] = value.get('value')
+			elif field_id == 7:
+				changes.append(('Status', item['status']['name'], value['values'][0]['name']))
+				item['status'] = value['values'][0]
+			elif field_id == 2:
+				changes.append(('Priority', item['priority']['name'], value['values'][0]['name']))
+				item['priority'] = value['values'][0]
+			else:
+				for custom in item['customFields']:
+					if custom['fieldId'] == field_id:
+						changes.append((custom['name'], custom['value'], value.get('value')))
+						custom['value'] = value.get('value')
+		item['version'] += 1
+		item['modifiedAt'] = _timestamp(item['id'] % 10000 + item['version'])
+		self.history.setdefault(item['id'], []).append(self._history_entry(item['id'], item['version'], item['modifiedAt'], changes))
+		return self._full_item(int(item_id))
+
+	def _history_entry(self, item_id: int, version: int, modified_at: str, changes: list[tuple[str, Any, Any]]) -> dict[str, Any]:
+		return {
+			'version': version,
+			'modifiedAt': modified_at,
+			'modifiedBy': self._user_ref(1 + (item_id + version) % len(self.users)),
+			'changes': [{'fieldName': name, 'oldValue': old, 'newValue': new} for name, old, new in changes],
+		}
+
+	def _get_item_history(self, params, body, item_id):
+		item_id = int(item_id)
+		if item_id not in self.items:
+			return 404, {'message': 'Not found'}
+		# The generated past versions each move the status along and rewrite a custom field
+		statuses = [s['name'] for s in self.statuses]
+		versions = [
+			self._history_entry(item_id, version, _timestamp(item_id % 10000 + version), [
+				('Status', statuses[(item_id + version - 2) % len(statuses)], statuses[(item_id + version - 1) % len(statuses)]),
+				('Custom 0', f'draft {version - 1} of {item_id}', f'draft {version} of {item_id}'),
+			])
+			for version in range(2, 2 + self.history_versions)
+		]
+		return {'versions': versions + self.history.get(item_id, [])}
+
+	def _get_field_options(self, params, body, item_id, field_id):
+		options = {7: self.statuses, 2: self.priorities}.get(int(field_id), [])
+		return self._page(params, options, 'references')
+
+	def _get_users(self, params, body):
+		return self._page(params, [_ref(u['id'], u['name'], 'UserReference', email=u['email']) for u in self.users.values()], 'users')
+
+	def _find_user_by_name(self, params, body):
+		found = [u for u in self.users.values() if u['name'] == params.get('name')]
+		return found[0] if found else (404, {'message': 'Not found'})
+
+	def _find_user_by_email(self, params, body):
+		found = [u for u in self.users.values() if u['email'] == params.get('email')]
+		return found[0] if found else (404, {'message': 'Not found'})
+
+	def _get_user(self, params, body, user_id):
+		return self.users.get(int(user_id)) or (404, {'message': 'Not found'})
+
+	def _revision(self, item_id: int, type: str, id: int) -> dict[str, Any]:
+		return {'id': id, 'itemRevision': {'id': item_id, 'version': self.items[item_id]['version']}, 'type': type}
+
+	def _get_item_relations(self, params, body, item_id):
+		item_id = int(item_id)
+		if item_id not in self.items:
+			return 404, {'message': 'Not found'}
+		# Reference IDs are made up from the two item IDs, the mock doesn't keep them
+		return {
+			'itemId': self._item_ref(item_id),
+			'downstreamReferences': [
+				self._revision(i, 'DownstreamTrackerItemReference', i * 100000 + item_id) for i in self.downstream.get(item_id, []) if i in self.items
+			],
+			'upstreamReferences': [
+				self._revision(i, 'UpstreamTrackerItemReference', item_id * 100000 + i) for i in self.upstream.get(item_id, []) if i in self.items
+			],
+			'outgoingAssociations': [
+				self._revision(a['to']['id'], 'OutgoingTrackerItemAssociation', a['id'])
+				for a in list(self.associations.values()) if a['from']['id'] == item_id and a['to']['id'] in self.items
+			],
+			'incomingAssociations': [
+				self._revision(a['from']['id'], 'IncomingTrackerItemAssociation', a['id'])
+				for a in list(self.associations.values()) if a['to']['id'] == item_id and a['from']['id'] in self.items
+			],
+		}
+
+	def _create_association(self, params, body):
+		source, target = body.get('from', {}).get('id'), body.get('to', {}).get('id')
+		if source not in self.items or target not in self.items:
+			return 404, {'message': 'Not found'}
+		with self._lock:
+			association_id = self._next_association_id
+			self._next_association_id += 1
+			self.associations[association_id] = {
+				'id': association_id,
+				'from': self._item_ref(source),
+				'to': self._item_ref(target),
+				'type': body.get('type'),
+				'description': body.get('description', ''),
+				'propagatingSuspects': body.get('propagatingSuspects', False),
+			}
+		return self.associations[association_id]
+
+	def _get_association_types(self, params, body):
+		return self.association_types
+
+	def _get_association(self, params, body, association_id):
+		return self.associations.get(int(association_id)) or (404, {'message': 'Not found'})
+
+	def _delete_association(self, params, body, association_id):
+		if self.associations.pop(int(association_id), None) is None:
+			return 404, {'message': 'Not found'}
+		return None
+
+	def _get_item_attachments(self, params, body, item_id):
+		item_id = int(item_id)
+		if item_id not in self.items:
+			return 404, {'message': 'Not found'}
+		return [a for a, _ in self.attachments.values() if a['itemId'] == item_id]
+
+	def _upload_attachments(self, params, body, item_id):
+		item_id = int(item_id)
+		if item_id not in self.items:
+			return 404, {'message': 'Not found'}
+		if not isinstance(body, bytes):
+			return 400, {'message': 'Expected a multipart body'}
+		created = []
+		for head, content in _multipart_parts(body):
+			name = re.search(rb'filename="([^"]*)"', head)
+			if name is None:
+				continue
+			content_type = re.search(rb'Content-Type: (\S+)', head)
+			with self._lock:
+				attachment_id = self._next_attachment_id
+				self._next_attachment_id += 1
+			attachment = {
+				'id': attachment_id,
+				'name': name.group(1).decode(),
+				'type': 'Attachment',
+				'itemId': item_id,
+				'mimeType': content_type.group(1).decode() if content_type else 'application/octet-stream',
+				'size': len(content),
+				'createdAt': _timestamp(),
+			}
+			self.attachments[attachment_id] = (attachment, content)
+			created.append(attachment)
+		return created
+
+	def _new_comment(self, item_id: int, text: str, format: str = 'PlainText', user_id: int = 1, parent_id: int | None = None) -> dict[str, Any]:
+		with self._lock:
+			comment_id = self._next_comment_id
+			self._next_comment_id += 1
+		comment = {
+			'id': comment_id,
+			'comment': text,
+			'commentFormat': format,
+			'createdAt': _timestamp(comment_id % 10000),
+			'createdBy': self._user_ref(user_id),
+			'type': 'Comment',
+		}
+		if parent_id is not None:
+			comment['parentComment'] = _ref(parent_id, '', 'CommentReference')
+		return comment
+
+	def _item_comments(self, item_id: int) -> list[dict[str, Any]]:
+		comments = self.comments.get(item_id)
+		if comments is None:
+			comments = [
+				self._new_comment(item_id, f'Review note {n} on item {item_id}', user_id=1 + (item_id + n) % len(self.users))
+				for n in range(self.comments_per_item)
+			]
+			comments = self.comments.setdefault(item_id, comments)
+		return comments
+
+	def _get_item_comments(self, params, body, item_id):
+		item_id = int(item_id)
+		if item_id not in self.items:
+			return 404, {'message': 'Not found'}
+		return self._page(params, self._item_comments(item_id), 'comments')
+
+	def _post_comment(self, params, body, item_id, parent_id=None):
+		item_id = int(item_id)
+		if item_id not in self.items:
+			return 404, {'message': 'Not found'}
+		if not isinstance(body, bytes):
+			return 400, {'message': 'Expected a multipart body'}
+		form = {re.search(rb'name="([^"]*)"', head).group(1).decode(): content.decode() for head, content in _multipart_parts(body)}
+		if not form.get('comment'):
+			return 400, {'message': 'comment is required'}
+		comments = self._item_comments(item_id)
+		comment = self._new_comment(
+			item_id, form['comment'], form.get('commentFormat', 'PlainText'), parent_id=int(parent_id) if parent_id else None
+		)
+		comments.append(comment)
+		return comment
+
+	def _get_attachment(self, params, body, attachment_id):
+		attachment = self.attachments.get(int(attachment_id))
+		return attachment[0] if attachment else (404, {'message': 'Not found'})
+
+	def _get_attachment_content(self, params, body, attachment_id):
+		attachment = self.attachments.get(int(attachment_id))
+		return attachment[1] if attachment else (404, {'message': 'Not found'})
+
+	# Dispatching
+
+	def reset_counts(self):
+		"""Resets the request counters."""
+		with self._lock:
+			self.request_count = 0
+			self.rate_limited_count = 0
+			self._rate_limited = set()
+			self.connection_count = 0
+			self.requests_by_route = {}
+
+	def count_connection(self):
+		"""Counts a new client connection. Called by the servers."""
+		with self._lock:
+			self.connection_count += 1
+
+	def handle(
+		self,
+		method: str,
+		url: str,
+		body: bytes | None = None,
+		headers: dict[str, str] | None = None
+	) -> tuple[int, dict[str, str], bytes]:
+		"""Answers a request. Binary content, like attachments, honours a `Range: bytes=N-` 
+		header.
+
+		Params:
+		method — The HTTP method. — str
+		url — The request path with its query string, e.g. `/cb/api/v3/items/1?x=y`. — str
+		body — The raw request body. — bytes(None)
+		headers — The request headers. — dict[str, str](None)
+
+		Returns:
+		tuple[int, dict[str, str], bytes] — The status code, headers, and body of the response."""
+		with self._lock:
+			self.request_count += 1
+			# Requests are told apart by what's sent, as a retry is sent exactly as the first attempt
+			key = (method, url, body)
+			limited = bool(self.rate_limit_every) and self.request_count % self.rate_limit_every == 0 and key not in self._rate_limited
+			if limited:
+				self._rate_limited.add(key)
+				self.rate_limited_count += 1
+		if self.latency:
+			sleep(self.latency)
+		if limited:
+			return 429, {'Retry-After': '0', 'Content-Type': 'application/json'}, b'{"message": "Too many requests"}'
+		parts = urlsplit(url)
+		path = parts.path
+		if path.startswith(API_ROOT):
+			path = path[len(API_ROOT):]
+		path = path.strip('/')
+		params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+		try:
+			payload = json.loads(body) if body else {}
+		except ValueError:
+			# Multipart uploads are handed over raw
+			payload = body
+		for route_method, pattern, handler in self._routes:
+			if route_method != method:
+				continue
+			match = pattern.fullmatch(path)
+			if match is None:
+				continue
+			with self._lock:
+				route = f'{method} {pattern.pattern}'
+				self.requests_by_route[route] = self.requests_by_route.get(route, 0) + 1
+			result = handler(params, payload, *match.groups())
+			status = 200
+			if isinstance(result, tuple):
+				status, result = result
+			if result is None and status == 200:
+				return 204 if method == 'DELETE' else 404, {}, b''
+			if isinstance(result, bytes):
+				return self._content_response(result, headers)
+			return status, {'Content-Type': 'application/json'}, json.dumps(result).encode()
+		return 404, {'Content-Type': 'application/json'}, b'{"message": "Unknown endpoint"}'
+
+	def _content_response(self, content: bytes, headers: dict[str, str] | None) -> tuple[int, dict[str, str], bytes]:
+		requested = {k.lower(): v for k, v in (headers or {}).items()}.get('range', '')
+		match = re.fullmatch(r'bytes=(\d+)-', requested)
+		if match is None:
+			return 200, {'Content-Type': 'application/octet-stream', 'Accept-Ranges': 'bytes'}, content
+		start = int(match.group(1))
+		if start >= len(content):
+			return 416, {'Content-Range': f'bytes */{len(content)}'}, b''
+		return 206, {
+			'Content-Type': 'application/octet-stream',
+			'Content-Range': f'bytes {start}-{len(content) - 1}/{len(content)}',
+		}, content[start:]
+
+class _Handler(BaseHTTPRequestHandler):
+	protocol_version = 'HTTP/1.1'
+	# Headers and body are written separately, so Nagle's algorithm would stall every response
+	disable_nagle_algorithm = True
+
+	def setup(self):
+		super().setup()
+		self.server.app.count_connection()
+
+	def _dispatch(self):
+		length = int(self.headers.get('Content-Length') or 0)
+		body = self.rfile.read(length) if length else None
+		status, headers, content = self.server.app.handle(self.command, self.path, body, dict(self.headers))
+		self.send_response(status)
+		for key, value in headers.items():
+			self.send_header(key, value)
+		self.send_header('Content-Length', str(len(content)))
+		self.end_headers()
+		self.wfile.write(content)
+
+	do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+	def log_message(self, format: str, *args):
+		pass
+
+class _Http2Handler(StreamRequestHandler):
+	"""Speaks cleartext HTTP/2 with prior knowledge (h2c). Each request is answered on its own
+	thread, so concurrent streams really are multiplexed over the one connection."""
+	disable_nagle_algorithm = True
+
+	def handle(self):
+		from h2.config import H2Configuration
+		from h2.connection import H2Connection
+		from h2.events import ConnectionTerminated, DataReceived, RemoteSettingsChanged, RequestReceived, StreamEnded, StreamReset, WindowUpdated
+		self.server.app.count_connection()
+		self._conn = H2Connection(config=H2Configuration(client_side=False, header_encoding='utf-8'))
+		self._window = Condition()
+		self._closed = False
+		streams: dict[int, tuple[dict[str, str], list[bytes]]] = {}
+		with self._window:
+			self._conn.initiate_connection()
+			self._flush()
+		with ThreadPoolExecutor(max_workers=32) as executor:
+			try:
+				while not self._closed:
+					data = self.request.recv(65536)
+					if not data:
+						break
+					with self._window:
+						events = self._conn.receive_data(data)
+						self._flush()
+					for event in events:
+						if isinstance(event, RequestReceived):
+							streams[event.stream_id] = (dict(event.headers), [])
+						elif isinstance(event, DataReceived):
+							streams[event.stream_id][1].append(event.data)
+							with self._window:
+								self._conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+								self._flush()
+						elif isinstance(event, StreamEnded):
+							headers, chunks = streams.pop(event.stream_id)
+							executor.submit(self._respond, event.stream_id, headers, b''.join(chunks) or None)
+						elif isinstance(event, (WindowUpdated, RemoteSettingsChanged)):
+							with self._window:
+								self._window.notify_all()
+						elif isinstance(event, StreamReset):
+							streams.pop(event.stream_id, None)
+						elif isinstance(event, ConnectionTerminated):
+							self._closed = True
+			except OSError:
+				pass
+			finally:
+				with self._window:
+					self._closed = True
+					self._window.notify_all()
+
+	def _flush(self):
+		data = self._conn.data_to_send()
+		if data:
+			self.request.sendall(data)
+
+	def _respond(self, stream_id: int, headers: dict[str, str], body: bytes | None):
+		from h2.exceptions import StreamClosedError
+		status, response_headers, content = self.server.app.handle(headers[':method'], headers[':path'], body, headers)
+		try:
+			with self._window:
+				self._conn.send_headers(stream_id, [
+					(':status', str(status)),
+					('content-length', str(len(content))),
+					*((k.lower(), v) for k, v in response_headers.items())
+				], end_stream=not content)
+				self._flush()
+				view = memoryview(content)
+				while view and not self._closed:
+					size = min(self._conn.local_flow_control_window(stream_id), self._conn.max_outbound_frame_size, len(view))
+					if size <= 0:
+						# Wait for the client to open the flow control window again
+						self._window.wait(1)
+						continue
+					self._conn.send_data(stream_id, view[:size].tobytes(), end_stream=size == len(view))
+					self._flush()
+					view = view[size:]
+		except (StreamClosedError, OSError):
+			pass
+
+class _ThreadingTCPServer(ThreadingTCPServer):
+	allow_reuse_address = True
+	daemon_threads = True
+
+class MockServer:
+	"""Serves a `MockCodebeamer` over HTTP on a background thread. Use as a context manager or
+	call `start` and `stop`.
+
+	Params:
+	app — The mock to serve. If None one is created from the keyword arguments. — `MockCodebeamer`(None)
+	host — The interface to listen on. — str('127.0.0.1')
+	port — The port to listen on. 0 picks a free port. — int(0)
+	http2 — Speak cleartext HTTP/2 with prior knowledge instead of HTTP/1.1. Requires h2. — bool(False)"""
+
+	def __init__(self, app: MockCodebeamer | None = None, host: str = '127.0.0.1', port: int = 0, http2: bool = False, **kwargs):
+		self.app: MockCodebeamer = app or MockCodebeamer(**kwargs)
+		if http2:
+			try:
+				import h2
+			except ImportError as e:
+				raise ImportError('h2 is required to serve HTTP/2, install it with `pip install h2`') from e
+			self._server = _ThreadingTCPServer((host, port), _Http2Handler)
+		else:
+			self._server = ThreadingHTTPServer((host, port), _Handler)
+		self._server.daemon_threads = True
+		self._server.app = self.app
+		self._thread: Thread | None = None
+
+	@property
+	def url(self) -> str:
+		"""The base URL of the server, to pass to `Codebeamer`."""
+		host, port = self._server.server_address[:2]
+		return f'http://{host}:{port}'
+
+	def start(self) -> MockServer:
+		self._thread = Thread(target=self._server.serve_forever, daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		self._server.shutdown()
+		self._server.server_close()
+
+	def __enter__(self) -> MockServer:
+		return self.start()
+
+	def __exit__(self, *args):
+		self.stop()
@@ -0,0 +1,114 @@
+"""Hammers shared lazily loaded objects from many threads at once against the mock codeBeamer
+and checks that every object is fetched exactly once and that every thread sees the same
+data. Run it with `python -m pybeamer.benchmarks.stress`, it exits with 1 if the check fails."""
+from __future__ import annotations
+from typing import Any, Callable
+
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier, Lock
+from urllib.parse import urlsplit
+
+from ..client import Codebeamer
+from ..projects import Project
+from ..tracker import Tracker
+from ..tracker_item import TrackerItem
+from ..transport import InProcessTransport
+from .mock_server import API_ROOT, MockCodebeamer
+
+class CountingHandler:
+	"""Wraps the mock's handler and counts the requests for every method and path."""
+
+	def __init__(self, app: MockCodebeamer):
+		self.app: MockCodebeamer = app
+		self.counts: dict[tuple[str, str], int] = {}
+		self._lock: Lock = Lock()
+
+	def __call__(self, method: str, url: str, body: bytes | None = None, headers: dict[str, str] | None = None):
+		path = urlsplit(url).path
+		if path.startswith(API_ROOT):
+			path = path[len(API_ROOT):]
+		with self._lock:
+			key = (method, path.strip('/'))
+			self.counts[key] = self.counts.get(key, 0) + 1
+		return self.app.handle(method, url, body, headers)
+
+	def count(self, method: str, path: str) -> int:
+		"""The number of requests made for a method and path, e.g. `('GET', 'items/1000')`."""
+		return self.counts.get((method, path), 0)
+
+def _name(value: Any) -> Any:
+	return getattr(value, 'name', value)
+
+def _read_item(item: TrackerItem) -> tuple:
+	return (item.description, item.version, _name(item.status), _name(item.modified_by), item.modified_at, len(item.custom_fields or []))
+
+def _read_tracker(tracker: Tracker) -> tuple:
+	return (tracker.description, tracker.key_name, _name(tracker.created_by), tracker.created_at, tracker.version)
+
+def _read_project(project: Project) -> tuple:
+	return (project.description, project.key_name, _name(project.created_by), project.created_at, project.version)
+
+def _hammer(obj: Any, read: Callable[[Any], tuple], threads: int) -> list[tuple]:
+	# Every thread waits at the barrier so the first reads really race each other
+	barrier = Barrier(threads)
+
+	def work(_: int) -> tuple:
+		barrier.wait()
+		return read(obj)
+
+	with ThreadPoolExecutor(max_workers=threads) as executor:
+		return list(executor.map(work, range(threads)))
+
+def check(threads: int = 32, rounds: int = 20, latency: float = 0.002) -> list[str]:
+	"""Reads the lazily loaded properties of one item, tracker, and project from many threads
+	at once, with coalescing of identical GETs turned off so only the objects' own locking can
+	keep them from being loaded twice.
+
+	Params:
+	threads — The number of threads reading each object. — int(32)
+	rounds — How many times to repeat with fresh objects. — int(20)
+	latency — Seconds the mock waits before answering, to widen any race. — float(0.002)
+
+	Returns:
+	list[str] — The problems found, empty if the check passed."""
+	app = MockCodebeamer(projects=1, trackers_per_project=1, items_per_tracker=rounds, latency=latency)
+	handler = CountingHandler(app)
+	cb = Codebeamer('http://inprocess', 'stress', 'stress', transport=InProcessTransport(handler), coalesce=False)
+	client = cb._client
+	project_id = next(iter(app.projects))
+	tracker_id = next(iter(app.trackers))
+	item_ids = sorted(i for i, item in app.items.items() if item['tracker']['id'] == tracker_id)[:rounds]
+	problems: list[str] = []
+	for item_id in item_ids:
+		handler.counts.clear()
+		shared = [
+			('items', item_id, TrackerItem(id=item_id, name='', type='TrackerItemReference', client=client), _read_item),
+			('trackers', tracker_id, Tracker(id=tracker_id, name='', type='TrackerReference', client=client), _read_tracker),
+			('projects', project_id, Project(id=project_id, name='', type='ProjectReference', client=client), _read_project),
+		]
+		for kind, id, obj, read in shared:
+			seen = _hammer(obj, read, threads)
+			fetched = handler.count('GET', f'{kind}/{id}')
+			if fetched != 1:
+				problems.append(f'GET {kind}/{id} was sent {fetched} times by {threads} threads, expected once')
+			if any(values != seen[0] for values in seen):
+				problems.append(f'threads saw different data for {kind}/{id}: {sorted(set(seen), key=repr)}')
+	return problems
+
+def main():
+	parser = ArgumentParser(description='Check that objects shared between threads are loaded once.')
+	parser.add_argument('--threads', type=int, default=32, help='The number of threads reading each object.')
+	parser.add_argument('--rounds', type=int, default=20, help='How many times to repeat with fresh objects.')
+	parser.add_argument('--latency', type=float, default=0.002, help='Seconds the mock waits before answering.')
+	args = parser.parse_args()
+	problems = check(args.threads, args.rounds, args.latency)
+	for problem in problems:
+		print(f'FAIL: {problem}')
+	if not problems:
+		print(f'OK: {args.rounds} rounds of {args.threads} threads, every object loaded once')
+	sys.exit(1 if problems else 0)
+
+if __name__ == '__main__':
+	main()
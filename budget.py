@@ -0,0 +1,198 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any
+
+import os
+import re
+import sys
+from collections import defaultdict
+from threading import Lock
+
+from .utils import logger
+
+if TYPE_CHECKING:
+	from .rest_client import RestClient
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Frames in these files are plumbing, the interesting call site is above them
+_PLUMBING = {os.path.join(_PACKAGE_DIR, f) for f in ('rest_client.py', 'transport.py', 'budget.py', 'utils.py')}
+_STDLIB_DIR = os.path.dirname(os.path.abspath(os.__file__))
+_ID_SEGMENT = re.compile(r'(?<=/)\d+(?=/|$)')
+
+def endpoint_template(path: str) -> str:
+	"""Replaces the numeric segments of a path with `{id}`, so requests for different items
+	fall under the same endpoint, e.g. `items/12/fields` -> `items/{id}/fields`.
+
+	Params:
+	path — The request path without its query string. — str
+
+	Returns:
+	str — The endpoint template."""
+	return _ID_SEGMENT.sub('{id}', '/' + path.strip('/'))[1:]
+
+def _call_sites() -> tuple[str | None, str | None]:
+	"""Finds the pybeamer function that issued the current request and the first frame of
+	the code that called into pybeamer, as `file:line in function` strings."""
+	library = caller = None
+	frame = sys._getframe(2)
+	while frame is not None:
+		filename = os.path.abspath(frame.f_code.co_filename)
+		if filename.startswith(_PACKAGE_DIR):
+			if library is None and filename not in _PLUMBING:
+				library = f'{os.path.basename(filename)}:{frame.f_lineno} in {frame.f_code.co_name}'
+		elif library is not None and not filename.startswith(_STDLIB_DIR):
+			caller = f'{filename}:{frame.f_lineno} in {frame.f_code.co_name}'
+			break
+		frame = frame.f_back
+	return library, caller
+
+class RecordedRequest:
+	"""A request made while a `RequestRecorder` was active."""
+	__slots__ = ('method', 'path', 'template', 'status', 'elapsed', 'library_site', 'call_site')
+
+	def __init__(self, method: str, path: str, status: int, elapsed: float, library_site: str | None, call_site: str | None):
+		self.method: str = method
+		self.path: str = path
+		self.template: str = endpoint_template(path)
+		self.status: int = status
+		self.elapsed: float = elapsed
+		self.library_site: str | None = library_site
+		self.call_site: str | None = call_site
+
+	def __repr__(self) -> str:
+		return f'RecordedRequest(method={self.method}, path={self.path}, status={self.status})'
+
+class NPlusOne:
+	"""The same endpoint requested over and over with different IDs."""
+
+	def __init__(self, method: str, template: str, requests: list[RecordedRequest]):
+		self.method: str = method
+		self.template: str = template
+		self.requests: list[RecordedRequest] = requests
+
+	@property
+	def count(self) -> int:
+		"""The number of requests to the endpoint."""
+		return len(self.requests)
+
+	@property
+	def call_sites(self) -> dict[str, int]:
+		"""The number of requests from each call site, library function first."""
+		sites: dict[str, int] = defaultdict(int)
+		for request in self.requests:
+			sites[' <- '.join(s for s in (request.library_site, request.call_site) if s)] += 1
+		return dict(sorted(sites.items(), key=lambda s: -s[1]))
+
+	def __repr__(self) -> str:
+		return f'NPlusOne(method={self.method}, template={self.template}, count={self.count})'
+
+class RequestBudgetExceeded(AssertionError):
+	"""Raised when more requests were made inside a `RequestRecorder` than its budget allows."""
+
+	def __init__(self, message: str, recorder: RequestRecorder):
+		super().__init__(message)
+		self.recorder: RequestRecorder = recorder
+
+class RequestRecorder:
+	"""Records every request a client sends while it's active, from any thread. Use it through
+	`Codebeamer.record_requests` as a context manager. On exit it logs any N+1 patterns it saw
+	and raises `RequestBudgetExceeded` if more requests were sent than the budget. Requests
+	answered by a coalesced in-flight GET aren't sent, so they aren't counted.
+
+	Params:
+	client — The client to record. — `RestClient`
+	budget — The most requests allowed. If None there is no limit. — int(None)
+	threshold — How many different IDs requested from one endpoint count as an N+1. — int(5)
+	call_sites — Record where each request came from. Walking the stack costs a little per request. — bool(True)"""
+
+	def __init__(self, client: RestClient, budget: int | None = None, threshold: int = 5, call_sites: bool = True):
+		self._client: RestClient = client
+		self.budget: int | None = budget
+		self.threshold: int = threshold
+		self.call_sites: bool = call_sites
+		self.requests: list[RecordedRequest] = []
+		self._lock: Lock = Lock()
+
+	def _observe(self, method: str, path: str, status: int, elapsed: float):
+		library_site, call_site = _call_sites() if self.call_sites else (None, None)
+		if self._client.api_root and path.startswith(self._client.api_root):
+			path = path[len(self._client.api_root):]
+		request = RecordedRequest(method, path.strip('/'), status, elapsed, library_site, call_site)
+		with self._lock:
+			self.requests.append(request)
+
+	@property
+	def count(self) -> int:
+		"""The number of requests recorded."""
+		return len(self.requests)
+
+	@property
+	def elapsed(self) -> float:
+		"""The total time spent waiting on requests, in seconds."""
+		return sum(r.elapsed for r in self.requests)
+
+	def by_endpoint(self) -> dict[tuple[str, str], int]:
+		"""The number of requests to each method and endpoint template, most requested first."""
+		counts: dict[tuple[str, str], int] = defaultdict(int)
+		for request in self.requests:
+			counts[(request.method, request.template)] += 1
+		return dict(sorted(counts.items(), key=lambda c: -c[1]))
+
+	def n_plus_one(self, threshold: int | None = None) -> list[NPlusOne]:
+		"""Finds endpoints that were requested for many different IDs, such as fetching the
+		fields of every item one at a time.
+
+		Params:
+		threshold — How many different IDs count as an N+1. If None the recorder's threshold is used. — int(None)
+
+		Returns:
+		list[`NPlusOne`] — The patterns found, most requests first."""
+		threshold = self.threshold if threshold is None else threshold
+		groups: dict[tuple[str, str], list[RecordedRequest]] = defaultdict(list)
+		for request in self.requests:
+			if request.template != request.path:
+				groups[(request.method, request.template)].append(request)
+		patterns = [
+			NPlusOne(method, template, requests)
+			for (method, template), requests in groups.items()
+			if len({r.path for r in requests}) >= threshold
+		]
+		return sorted(patterns, key=lambda p: -p.count)
+
+	def report(self) -> str:
+		"""A readable summary of the requests and any N+1 patterns."""
+		lines = [f'{self.count} requests' + (f' (budget {self.budget})' if self.budget is not None else '')]
+		for (method, template), count in self.by_endpoint().items():
+			lines.append(f'  {count:>6} {method} {template}')
+		for pattern in self.n_plus_one():
+			lines.append(f'N+1: {pattern.count} x {pattern.method} {pattern.template}')
+			for site, count in pattern.call_sites.items():
+				lines.append(f'  {count:>6} from {site}')
+		return '\n'.join(lines)
+
+	def start(self) -> RequestRecorder:
+		self._client.add_observer(self._observe)
+		return self
+
+	def stop(self):
+		self._client.remove_observer(self._observe)
+
+	def check(self):
+		"""Raises if the budget was exceeded.
+
+		Raises:
+		RequestBudgetExceeded — More requests were made than the budget."""
+		if self.budget is not None and self.count > self.budget:
+			raise RequestBudgetExceeded(f'{self.count} requests made, the budget is {self.budget}\n{self.report()}', self)
+
+	def __enter__(self) -> RequestRecorder:
+		return self.start()
+
+	def __exit__(self, exc_type: Any, *args):
+		self.stop()
+		for pattern in self.n_plus_one():
+			logger.warning(f'N+1 requests: {pattern.count} x {pattern.method} {pattern.template} from {next(iter(pattern.call_sites))}')
+		if exc_type is None:
+			self.check()
+
+	def __repr__(self) -> str:
+		return f'RequestRecorder(count={self.count}, budget={self.budget})'
@@ -0,0 +1,223 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Callable, Hashable, Iterable, Mapping
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from time import perf_counter
+
+from .tracker_item import TrackerItem, children_json
+from .transport import HTTPError
+from .utils import logger
+
+if TYPE_CHECKING:
+	from .rest_client import RestClient
+	from .tracker import Tracker
+
+class BulkReport:
+	"""The outcome of a bulk operation on many items. Results are keyed by item ID, or by 
+	whatever identifies one unit of work, e.g. `(from ID, to ID)` for associations.
+
+	Params:
+	operation — What was done, e.g. 'reparent'. — str"""
+
+	def __init__(self, operation: str):
+		self.operation: str = operation
+		self.succeeded: list[Hashable] = []
+		self.failed: dict[Hashable, BaseException] = {}
+		self.requests: int = 0
+		self.elapsed: float = 0.0
+		self._lock: Lock = Lock()
+
+	def _record(self, ids: list[Hashable], error: BaseException | None = None) -> int:
+		with self._lock:
+			self.requests += 1
+			if error is None:
+				self.succeeded.extend(ids)
+			else:
+				self.failed.update((i, error) for i in ids)
+			return len(self.succeeded) + len(self.failed)
+
+	@property
+	def total(self) -> int:
+		"""The number of items handled so far."""
+		return len(self.succeeded) + len(self.failed)
+
+	@property
+	def rate(self) -> float:
+		"""Items handled per second."""
+		return self.total / self.elapsed if self.elapsed else 0.0
+
+	def raise_for_errors(self):
+		"""Raises the first error if any item failed.
+
+		Raises:
+		Exception — The error of the first failed item."""
+		for error in self.failed.values():
+			raise error
+
+	def __repr__(self) -> str:
+		return (
+			f'BulkReport(operation={self.operation}, succeeded={len(self.succeeded)}, failed={len(self.failed)}, '
+			f'requests={self.requests}, rate={self.rate:.1f}/s)'
+		)
+
+class ReparentPlan:
+	"""The requests a bulk reparent makes: one `PATCH .../children` for every `batch_size`
+	items moved under the same parent. Build it with `plan_reparent` to see what a restructure
+	costs before running it.
+
+	Params:
+	calls — The path of each request and the IDs it moves, in order. — list[tuple[str, list[int]]]"""
+
+	def __init__(self, calls: list[tuple[str, list[int]]]):
+		self.calls: list[tuple[str, list[int]]] = calls
+
+	@property
+	def request_count(self) -> int:
+		"""The number of requests the plan makes."""
+		return len(self.calls)
+
+	@property
+	def item_count(self) -> int:
+		"""The number of items the plan moves."""
+		return sum(len(ids) for _, ids in self.calls)
+
+	@property
+	def parents(self) -> list[str]:
+		"""The children paths of the new parents, each once."""
+		return list(dict.fromkeys(path for path, _ in self.calls))
+
+	def report(self) -> str:
+		"""A readable summary of the requests."""
+		lines = [f'{self.item_count} items under {len(self.parents)} parents in {self.request_count} requests']
+		for path, ids in self.calls:
+			lines.append(f'  PATCH {path} ({len(ids)} items)')
+		return '\n'.join(lines)
+
+	def __len__(self) -> int:
+		return self.request_count
+
+	def __repr__(self) -> str:
+		return f'ReparentPlan(items={self.item_count}, parents={len(self.parents)}, requests={self.request_count})'
+
+def _children_path(parent: int | TrackerItem | Tracker) -> str:
+	from .tracker import Tracker
+	if isinstance(parent, Tracker):
+		return f'trackers/{parent.id}/children'
+	return f'items/{parent.id if isinstance(parent, TrackerItem) else int(parent)}/children'
+
+def plan_reparent(
+	moves: Mapping[int | TrackerItem, int | TrackerItem | Tracker] | Iterable[tuple[int | TrackerItem, int | TrackerItem | Tracker]],
+	batch_size: int = 500
+) -> ReparentPlan:
+	"""Plans moving items under new parents. Items going under the same parent are moved
+	together, in the order given, up to `batch_size` per request. An item moved twice only
+	goes to its last parent.
+
+	Params:
+	moves — The item (or ID) to move and its new parent: an item, an item ID, or a `Tracker` to make it a top level item. — Mapping | Iterable[tuple]
+	batch_size — The most items moved in one request. — int(500)
+
+	Returns:
+	`ReparentPlan` — The requests to make."""
+	pairs = moves.items() if isinstance(moves, Mapping) else moves
+	targets: dict[int, str] = {}
+	for item, parent in pairs:
+		item_id = item.id if isinstance(item, TrackerItem) else int(item)
+		# Re-inserting keeps the order of the last move
+		targets.pop(item_id, None)
+		targets[item_id] = _children_path(parent)
+	by_parent: dict[str, list[int]] = {}
+	for item_id, path in targets.items():
+		by_parent.setdefault(path, []).append(item_id)
+	batch_size = max(1, batch_size)
+	calls = [
+		(path, ids[start:start + batch_size])
+		for path, ids in by_parent.items()
+		for start in range(0, len(ids), batch_size)
+	]
+	return ReparentPlan(calls)
+
+def reparent(client: RestClient, plan: ReparentPlan, workers: int = 8) -> BulkReport:
+	"""Runs a reparent plan. Requests for different parents run concurrently, the requests
+	for one parent run in order so the children end up in the planned order.
+
+	Params:
+	client — The client to send with. — `RestClient`
+	plan — The plan from `plan_reparent`. — `ReparentPlan`
+	workers — The most parents handled at once. — int(8)
+
+	Returns:
+	`BulkReport` — The items moved and the items whose request failed."""
+	report = BulkReport('reparent')
+	by_parent: dict[str, list[list[int]]] = {}
+	for path, ids in plan.calls:
+		by_parent.setdefault(path, []).append(ids)
+
+	def move(path: str):
+		for ids in by_parent[path]:
+			try:
+				client.request('PATCH', path, json_=children_json(ids, 'INSERT'), raise_for_status=True)
+				report._record(ids)
+			except Exception as e:
+				logger.debug(f'Moving {len(ids)} items under {path} failed: {e}')
+				report._record(ids, e)
+
+	start = perf_counter()
+	with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+		list(executor.map(move, by_parent))
+	report.elapsed = perf_counter() - start
+	return report
+
+def delete_items(
+	client: RestClient,
+	items: Iterable[int | TrackerItem],
+	workers: int = 16,
+	missing_ok: bool = True,
+	progress: Callable[[BulkReport], None] | None = None,
+	progress_every: int = 500
+) -> BulkReport:
+	"""Deletes items concurrently. The items are read from `items` as they're needed, so it 
+	can be a generator streaming IDs from a query, and only a couple of deletes per worker 
+	wait at any time.
+
+	Params:
+	client — The client to send with. — `RestClient`
+	items — The items or their IDs. — Iterable[int | `TrackerItem`]
+	workers — The most deletes sent at once. — int(16)
+	missing_ok — Count items that are already gone (404) as deleted. — bool(True)
+	progress — Called with the report every `progress_every` items. — Callable[[`BulkReport`], None](None)
+	progress_every — How many items between progress calls. — int(500)
+
+	Returns:
+	`BulkReport` — The items deleted and the items that failed, with their errors."""
+	report = BulkReport('delete')
+	workers = max(1, workers)
+	# Bounds the queued deletes so a long stream of IDs isn't all submitted at once
+	slots = BoundedSemaphore(workers * 2)
+	start = perf_counter()
+
+	def delete(item_id: int):
+		try:
+			client.request('DELETE', f'items/{item_id}', raise_for_status=True)
+			total = report._record([item_id])
+		except HTTPError as e:
+			if missing_ok and e.response is not None and e.response.status_code == 404:
+				total = report._record([item_id])
+			else:
+				total = report._record([item_id], e)
+		except Exception as e:
+			total = report._record([item_id], e)
+		finally:
+			slots.release()
+		if progress is not None and total % progress_every == 0:
+			report.elapsed = perf_counter() - start
+			progress(report)
+
+	with ThreadPoolExecutor(max_workers=workers) as executor:
+		for item in items:
+			slots.acquire()
+			executor.submit(delete, item.id if isinstance(item, TrackerItem) else int(item))
+	report.elapsed = perf_counter() - start
+	logger.debug(repr(report))
+	return report
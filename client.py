@@ -1,14 +1,28 @@
 from __future__ import annotations
-from typing import Any
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Mapping, TextIO
 
-from loguru import logger
+from datetime import datetime
+from os import PathLike
 
 from .rest_client import RestClient
 from .projects import Project
 from .user import User
 from .tracker import Tracker
 from .tracker_item import TrackerItem
-from .utils import clamp, pages
+from .query import ItemIndex
+from .columnar import ItemTable
+from .records import Projection
+from .tree import ItemTree, walk_tree
+from .budget import RequestRecorder
+from .writer import WriteBehindQueue, WriteReport
+from .bulk import BulkReport, ReparentPlan, plan_reparent, reparent, delete_items
+from .relations import RelationGraph, fetch_relations, create_associations, remove_associations
+from .history import HistoryTable, fetch_history
+from .attachments import TransferReport, download_attachments, upload_attachments
+from .comments import Comment, iter_comments, post_comments
+from .exporter import ExportReport, export_items
+from .fields import choice_options_cache
+from .utils import clamp, pages, iter_pages, logger
 
 class Codebeamer:
 	"""The Codebeamer API client"""
@@ -178,16 +192,33 @@ class Codebeamer:
 		"""Alias for `Codebeamer.get_tracker_item`."""
 		return self.get_tracker_item(id)
 	
-	def search_tracker_items(self, query: str, page: int = 0, page_size: int = 25) -> list[TrackerItem]:
+	def search_tracker_items(
+		self,
+		query: str,
+		page: int = 0,
+		page_size: int = 25,
+		raw: bool = False,
+		fields: list[str] | None = None,
+		as_tuple: bool = False
+	) -> list[TrackerItem] | list[dict[str, Any]] | list[tuple]:
 		"""Search for items using a cbQL query string.
 		
 		Params:
 		query — The query string to search with. — str
 		page — The page number to fetch if you want a specific page of users. If 0 then all users are fetched. — int(0)
 		page_size — The number of results per page of users. Must be between 1 and 500. — int(25)
+		raw — Return lightweight records taken straight from the response instead of `TrackerItem`s. — bool(False)
+		fields — The fields to include in the raw records, see `Projection`. Implies `raw`. Defaults to id and name. — list[str](None)
+		as_tuple — Return the raw records as tuples in `fields` order instead of dicts. Implies `raw`. — bool(False)
 		
 		Returns:
-		list[`TrackerItem`] — A list of items that match the query."""
+		list[`TrackerItem`] | list[dict[str, Any]] | list[tuple] — A list of items that match the query."""
+		if raw or fields or as_tuple:
+			projection = Projection(fields)
+			records = []
+			for item_data in self.iter_item_pages(query, page=page, page_size=page_size):
+				records.extend(projection.project(item_data, as_tuple=as_tuple))
+			return records
 		fetch_all = page == 0
 		if fetch_all:
 			page = 1
@@ -204,6 +235,397 @@ class Codebeamer:
 				items.extend([TrackerItem(**ti, client=self._client) for ti in item_data['items']])
 		return items
 
-	def search_items(self, query: str, page: int = 0, page_size: int = 25) -> list[TrackerItem]:
+	def search_items(
+		self,
+		query: str,
+		page: int = 0,
+		page_size: int = 25,
+		raw: bool = False,
+		fields: list[str] | None = None,
+		as_tuple: bool = False
+	) -> list[TrackerItem] | list[dict[str, Any]] | list[tuple]:
 		"""Alias for `Codebeamer.search_tracker_items`"""
-		return self.search_tracker_items(query=query, page=page, page_size=page_size)
\ No newline at end of file
+		return self.search_tracker_items(query=query, page=page, page_size=page_size, raw=raw, fields=fields, as_tuple=as_tuple)
+
+	def iter_item_pages(self, query: str, page: int = 0, page_size: int = 500, reverse: bool = False) -> Iterator[list[dict[str, Any]]]:
+		"""Yields the raw item JSON of each page of a cbQL query without building any 
+		`TrackerItem` objects.
+		
+		Params:
+		query — The query string to search with. — str
+		page — The page number to fetch if you want a specific page of items. If 0 then all items are fetched. — int(0)
+		page_size — The number of results per page. Must be between 1 and 500. — int(500)
+		reverse — Yield the last page first, see `iter_pages`. — bool(False)
+		
+		Returns:
+		Iterator[list[dict[str, Any]]] — The raw items of each page."""
+		fetch = lambda p, s: self._client.post('items/query', json_={'page': p, 'pageSize': s, 'queryString': query})
+		return iter_pages(fetch, 'items', page=page, page_size=page_size, reverse=reverse)
+
+	def search_items_table(
+		self,
+		query: str,
+		columns: list[str] | None = None,
+		custom_fields: list[str] | bool | None = None,
+		page_size: int = 500
+	) -> ItemTable:
+		"""Search for items using a cbQL query string and collect them into a columnar `ItemTable` 
+		straight from the raw pages, without building any `TrackerItem` objects.
+		
+		Params:
+		query — The query string to search with. — str
+		columns — The system columns to include, e.g. `['id', 'status', 'modified_at']`. — list[str](None)
+		custom_fields — The names of custom fields to include as columns, or True for all of them. — list[str] | bool(None)
+		page_size — The number of results per page. Must be between 1 and 500. — int(500)
+		
+		Returns:
+		`ItemTable` — The matching items as columns."""
+		table = ItemTable(columns=columns, custom_fields=custom_fields)
+		for records in self.iter_item_pages(query, page_size=page_size):
+			table.extend(records)
+		return table
+
+	def export_items(
+		self,
+		query: str,
+		destination: str | PathLike | TextIO,
+		columns: list[str] | None = None,
+		format: str | None = None,
+		page_size: int = 500,
+		progress: Callable[[ExportReport], None] | None = None,
+		progress_every: int = 5000
+	) -> ExportReport:
+		"""Streams the items matching a cbQL query to a JSON Lines or CSV file page by page, in 
+		constant memory, without building any `TrackerItem` objects. Each page is written 
+		before the next is fetched.
+
+		Params:
+		query — The query string to search with. — str
+		destination — The file path, or a file opened in text mode. — str | PathLike | TextIO
+		columns — The fields to write, see `Projection`. Custom fields are named by their field name. — list[str](None)
+		format — 'jsonl' or 'csv'. If None it's picked by the destination's suffix. — str(None)
+		page_size — The number of results per page. Must be between 1 and 500. — int(500)
+		progress — Called with the report every `progress_every` items. — Callable[[`ExportReport`], None](None)
+		progress_every — How many items between progress calls. — int(5000)
+
+		Raises:
+		ValueError — The format isn't known.
+
+		Returns:
+		`ExportReport` — The number of items written and the rate."""
+		item_pages = self.iter_item_pages(query, page_size=page_size)
+		return export_items(item_pages, destination, columns=columns, format=format, progress=progress, progress_every=progress_every)
+
+	def index_items(self, query: str, custom_fields: list[str] | None = None, page_size: int = 500) -> ItemIndex:
+		"""Fetches every item matching a cbQL query once and builds a local `ItemIndex` over them 
+		so repeated filters, sorts, and groupings don't need to go back to codeBeamer.
+		
+		Params:
+		query — The query string to search with. — str
+		custom_fields — The names of custom fields to index as well. — list[str](None)
+		page_size — The number of results per page. Must be between 1 and 500. — int(500)
+		
+		Returns:
+		`ItemIndex` — An index over the matching items."""
+		return ItemIndex(self.search_tracker_items(query, page_size=page_size), custom_fields=custom_fields)
+
+	def walk_tree(self, root: Tracker | TrackerItem, max_depth: int | None = None, workers: int = 8) -> ItemTree:
+		"""Fetches the hierarchy below a tracker or item breadth-first, fetching the children of 
+		every item on a level concurrently.
+		
+		Params:
+		root — The tracker or item to start from. — `Tracker` | `TrackerItem`
+		max_depth — How many levels below the root to fetch. If None the whole tree is fetched. — int(None)
+		workers — The number of concurrent requests. — int(8)
+		
+		Raises:
+		HTTPError — The children of an item couldn't be fetched.
+		
+		Returns:
+		`ItemTree` — A compact tree of the item IDs, names, and parent indexes."""
+		return walk_tree(self._client, root, max_depth=max_depth, workers=workers)
+
+	def record_requests(self, budget: int | None = None, threshold: int = 5, call_sites: bool = True) -> RequestRecorder:
+		"""Records every request made while the returned context manager is active, from any 
+		thread. N+1 patterns (one endpoint requested for many different IDs) are logged with 
+		the call sites responsible, and exceeding the budget raises on exit.
+		
+		Params:
+		budget — The most requests allowed. If None there is no limit. — int(None)
+		threshold — How many different IDs requested from one endpoint count as an N+1. — int(5)
+		call_sites — Record where each request came from. — bool(True)
+		
+		Raises:
+		RequestBudgetExceeded — More requests were made than the budget, raised on exit.
+		
+		Returns:
+		`RequestRecorder` — The recorder, with the requests and a `report()`."""
+		return RequestRecorder(self._client, budget=budget, threshold=threshold, call_sites=call_sites)
+
+	def clear_choice_options(self, tracker_id: int | None = None, field_id: int | None = None):
+		"""Drops cached choice options so they're fetched again, e.g. after options were added 
+		to a field. With no arguments every cached option is dropped.
+		
+		Params:
+		tracker_id — Only drop the options of this tracker. — int(None)
+		field_id — Only drop the options of this field. — int(None)"""
+		choice_options_cache(self._client).invalidate(tracker_id=tracker_id, field_id=field_id)
+
+	def enable_write_behind(self, workers: int = 4, batch_size: int = 50, max_pending: int = 10000) -> WriteBehindQueue:
+		"""Sends item writes from background threads instead of waiting on each one. Afterwards 
+		setting `Field.value`, `TrackerItem.delete`, and `Tracker.queue_tracker_item` queue 
+		their request and return straight away. Queued updates to the same item are merged into 
+		one request. Call `flush_writes` to wait for them and see what failed.
+		
+		Params:
+		workers — The number of background threads. — int(4)
+		batch_size — The most writes a worker takes at once. — int(50)
+		max_pending — The most writes waiting before queueing blocks. — int(10000)
+		
+		Returns:
+		`WriteBehindQueue` — The queue, which is returned as is if write-behind is already enabled."""
+		if self._client.write_queue is None:
+			self._client.write_queue = WriteBehindQueue(self._client, workers=workers, batch_size=batch_size, max_pending=max_pending)
+		return self._client.write_queue
+
+	def flush_writes(self, timeout: float | None = None) -> WriteReport:
+		"""Waits until every queued write has been sent.
+		
+		Params:
+		timeout — The most seconds to wait. If None waits forever. — float(None)
+		
+		Raises:
+		TimeoutError — Writes were still waiting when the timeout ran out.
+		
+		Returns:
+		`WriteReport` — The results of the writes completed since the last flush."""
+		if self._client.write_queue is None:
+			return WriteReport([])
+		return self._client.write_queue.flush(timeout)
+
+	def disable_write_behind(self, timeout: float | None = None) -> WriteReport:
+		"""Flushes the write-behind queue and goes back to sending writes directly.
+		
+		Params:
+		timeout — The most seconds to wait for the flush. If None waits forever. — float(None)
+		
+		Returns:
+		`WriteReport` — The results of the writes completed since the last flush."""
+		if self._client.write_queue is None:
+			return WriteReport([])
+		return self._client.write_queue.close(timeout)
+
+	def reparent_items(
+		self,
+		moves: Mapping[int | TrackerItem, int | TrackerItem | Tracker] | Iterable[tuple[int | TrackerItem, int | TrackerItem | Tracker]],
+		workers: int = 8,
+		batch_size: int = 500,
+		dry_run: bool = False
+	) -> BulkReport | ReparentPlan:
+		"""Moves many items under new parents. Items going under the same parent are moved in 
+		one request per `batch_size` items, and different parents are handled concurrently.
+		
+		Params:
+		moves — The item (or ID) to move and its new parent: an item, an item ID, or a `Tracker` to make it a top level item. — Mapping | Iterable[tuple]
+		workers — The most parents handled at once. — int(8)
+		batch_size — The most items moved in one request. — int(500)
+		dry_run — Only plan the requests and return the plan. — bool(False)
+		
+		Returns:
+		`BulkReport` | `ReparentPlan` — The items moved and any failures, or the plan for a dry run."""
+		plan = plan_reparent(moves, batch_size=batch_size)
+		if dry_run:
+			return plan
+		logger.debug(repr(plan))
+		return reparent(self._client, plan, workers=workers)
+
+	def delete_items(
+		self,
+		items: Iterable[int | TrackerItem] | str,
+		workers: int = 16,
+		missing_ok: bool = True,
+		progress: Callable[[BulkReport], None] | None = None,
+		progress_every: int = 500
+	) -> BulkReport:
+		"""Deletes many items concurrently. The IDs are read as they're needed, so `items` can 
+		be a generator. A cbQL query string streams the IDs of the matching items page by page, 
+		last page first so deleting doesn't shift the pages left to read.
+		
+		Params:
+		items — The items, their IDs, or a cbQL query. — Iterable[int | `TrackerItem`] | str
+		workers — The most deletes sent at once. — int(16)
+		missing_ok — Count items that are already gone (404) as deleted. — bool(True)
+		progress — Called with the report every `progress_every` items. — Callable[[`BulkReport`], None](None)
+		progress_every — How many items between progress calls. — int(500)
+		
+		Returns:
+		`BulkReport` — The items deleted and the items that failed, with their errors."""
+		if isinstance(items, str):
+			items = (item['id'] for item_page in self.iter_item_pages(items, reverse=True) for item in item_page)
+		return delete_items(
+			self._client, items, workers=workers, missing_ok=missing_ok, progress=progress, progress_every=progress_every
+		)
+
+	def get_relation_graph(
+		self,
+		items: Iterable[int | TrackerItem],
+		depth: int = 1,
+		kinds: Iterable[str] | None = None,
+		workers: int = 8
+	) -> RelationGraph:
+		"""Fetches the references and associations of many items concurrently into a compact 
+		CSR graph for traversal, e.g. to build a traceability matrix. With a depth over 1 the 
+		related items are fetched as well, level by level.
+		
+		Params:
+		items — The items or their IDs to start from. — Iterable[int | `TrackerItem`]
+		depth — How many levels of relations to fetch. — int(1)
+		kinds — The kinds to follow past the first level: 'downstream', 'upstream', 'outgoing', 'incoming'. If None every kind. — Iterable[str](None)
+		workers — The number of concurrent requests. — int(8)
+		
+		Returns:
+		`RelationGraph` — The graph of the relations, and in `failed` the items whose relations couldn't be fetched."""
+		return fetch_relations(self._client, items, depth=depth, kinds=kinds, workers=workers)
+
+	def get_history(
+		self,
+		items: Iterable[int | TrackerItem],
+		since: datetime | None = None,
+		workers: int = 8
+	) -> HistoryTable:
+		"""Fetches the change history of many items concurrently into a compact columnar table 
+		holding only the field changes, e.g. to audit what changed over a release.
+		
+		Params:
+		items — The items or their IDs. — Iterable[int | `TrackerItem`]
+		since — Drop versions modified before this. Naive datetimes are taken as UTC. — datetime(None)
+		workers — The number of concurrent requests. — int(8)
+		
+		Returns:
+		`HistoryTable` — The changes of every item, and in `failed` the items whose history couldn't be fetched."""
+		return fetch_history(self._client, items, since=since, workers=workers)
+
+	def iter_comments(
+		self,
+		items: Iterable[int | TrackerItem] | str,
+		workers: int = 8,
+		page_size: int = 100,
+		skip_errors: bool = False
+	) -> Iterator[Comment]:
+		"""Streams the comments of many items as lightweight `Comment` records, fetching 
+		several items at once and never loading the items themselves. The IDs are read as 
+		they're needed, so `items` can be a generator; a cbQL query string streams the IDs of 
+		the matching items page by page.
+		
+		Params:
+		items — The items, their IDs, or a cbQL query. — Iterable[int | `TrackerItem`] | str
+		workers — The number of concurrent requests. — int(8)
+		page_size — The number of comments per page. — int(100)
+		skip_errors — Skip items whose comments can't be fetched instead of raising. — bool(False)
+		
+		Raises:
+		HTTPError — The comments of an item couldn't be fetched and `skip_errors` isn't set.
+		
+		Returns:
+		Iterator[`Comment`] — The comments in item order."""
+		if isinstance(items, str):
+			items = (item['id'] for item_page in self.iter_item_pages(items) for item in item_page)
+		return iter_comments(self._client, items, workers=workers, page_size=page_size, skip_errors=skip_errors)
+
+	def add_comments(
+		self,
+		comments: Iterable[tuple[int | TrackerItem, str]],
+		format: str = 'PlainText',
+		workers: int = 8
+	) -> BulkReport:
+		"""Posts many comments, commenting on several items at once. The comments for one item 
+		are posted in the order given.
+		
+		Params:
+		comments — The item (or ID) and the comment. — Iterable[tuple]
+		format — 'PlainText', 'Html', or 'Wiki'. — str('PlainText')
+		workers — The most items commented on at once. — int(8)
+		
+		Raises:
+		ValueError — The format isn't known.
+		
+		Returns:
+		`BulkReport` — Keyed by `(item ID, position in comments)`."""
+		return post_comments(self._client, comments, format=format, workers=workers)
+
+	def download_attachments(
+		self,
+		attachments: Mapping[int, str | PathLike] | Iterable[tuple[int | dict[str, Any], str | PathLike]],
+		workers: int = 4,
+		resume: bool = True,
+		max_bytes_per_second: int | None = None
+	) -> TransferReport:
+		"""Downloads many attachments concurrently, each streamed to disk in chunks so memory 
+		stays flat whatever their size. Interrupted downloads are continued with Range requests.
+		
+		Params:
+		attachments — The attachment (JSON or ID) and the file or directory to write it to. — Mapping | Iterable[tuple]
+		workers — The most downloads at once. — int(4)
+		resume — Continue partial downloads. — bool(True)
+		max_bytes_per_second — Caps the combined rate of the downloads. — int(None)
+		
+		Returns:
+		`TransferReport` — Keyed by attachment ID."""
+		pairs = attachments.items() if isinstance(attachments, Mapping) else attachments
+		return download_attachments(
+			self._client, pairs, workers=workers, resume=resume, max_bytes_per_second=max_bytes_per_second
+		)
+
+	def upload_attachments(
+		self,
+		uploads: Iterable[tuple[int | TrackerItem, str | PathLike | BinaryIO]],
+		workers: int = 4,
+		max_bytes_per_second: int | None = None
+	) -> TransferReport:
+		"""Uploads many files as attachments concurrently, each streamed from disk.
+		
+		Params:
+		uploads — The item (or ID) and the file to attach to it. — Iterable[tuple]
+		workers — The most uploads at once. — int(4)
+		max_bytes_per_second — Caps the combined rate of the uploads. — int(None)
+		
+		Returns:
+		`TransferReport` — Keyed by `(item ID, file name)`."""
+		return upload_attachments(self._client, uploads, workers=workers, max_bytes_per_second=max_bytes_per_second)
+
+	def create_associations(
+		self,
+		pairs: Iterable[tuple[int | TrackerItem, int | TrackerItem]],
+		type: str | int = 'related',
+		description: str = '',
+		propagate_suspects: bool = False,
+		workers: int = 8
+	) -> BulkReport:
+		"""Creates associations between many pairs of items concurrently.
+		
+		Params:
+		pairs — The `(from, to)` items or IDs. — Iterable[tuple]
+		type — The association type name or ID. — str | int('related')
+		description — The description of every association. — str('')
+		propagate_suspects — Mark the associations as propagating suspects. — bool(False)
+		workers — The number of concurrent requests. — int(8)
+		
+		Raises:
+		ValueError — The association type doesn't exist.
+		
+		Returns:
+		`BulkReport` — Keyed by `(from ID, to ID)`."""
+		return create_associations(
+			self._client, pairs, type=type, description=description, propagate_suspects=propagate_suspects, workers=workers
+		)
+
+	def remove_associations(self, association_ids: Iterable[int], workers: int = 8) -> BulkReport:
+		"""Deletes many associations concurrently.
+		
+		Params:
+		association_ids — The IDs of the associations, e.g. from `RelationGraph.edges`. — Iterable[int]
+		workers — The number of concurrent requests. — int(8)
+		
+		Returns:
+		`BulkReport` — Keyed by association ID."""
+		return remove_associations(self._client, association_ids, workers=workers)
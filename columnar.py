@@ -0,0 +1,356 @@
+from __future__ import annotations
+from typing import Any, Iterable
+
+from abc import ABC, abstractmethod
+from array import array
+from datetime import datetime, timedelta
+
+from .records import SYSTEM_FIELDS, REFERENCE_FIELDS, custom_field_value
+from .utils import naive_utc
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# Column name -> kind for the system fields of an item payload
+COLUMN_KINDS: dict[str, str] = {
+	'id': 'int',
+	'name': 'str',
+	'description': 'str',
+	'description_format': 'category',
+	'version': 'int',
+	'ordinal': 'int',
+	'story_points': 'int',
+	'type_name': 'category',
+	'status': 'category',
+	'status_id': 'int',
+	'priority': 'category',
+	'priority_id': 'int',
+	'tracker_id': 'int',
+	'parent_id': 'int',
+	'created_at': 'timestamp',
+	'modified_at': 'timestamp',
+	'closed_at': 'timestamp',
+	'start_date': 'timestamp',
+	'end_date': 'timestamp',
+	'created_by': 'category',
+	'modified_by': 'category',
+	'assigned_to': 'category',
+	'owners': 'category',
+	'categories': 'category',
+	'subjects': 'category',
+	'teams': 'category',
+}
+
+DEFAULT_COLUMNS = (
+	'id', 'name', 'version', 'type_name', 'status', 'priority', 'tracker_id', 'parent_id',
+	'created_at', 'created_by', 'modified_at', 'modified_by', 'assigned_to',
+)
+
+# Custom field value type -> column kind
+CUSTOM_FIELD_KINDS = {
+	'IntegerFieldValue': 'int',
+	'DateFieldValue': 'timestamp',
+	'ChoiceFieldValue': 'category',
+}
+
+class Column(ABC):
+	"""Base class for a single typed column of an `ItemTable`. Subclasses implement `append`,
+	`to_list`, and `__len__`."""
+	kind: str = 'object'
+
+	def __init__(self, name: str):
+		self.name: str = name
+
+	@abstractmethod
+	def append(self, value: Any):
+		"""Appends a value, None for a null."""
+
+	def extend_nulls(self, count: int):
+		for _ in range(count):
+			self.append(None)
+
+	@abstractmethod
+	def to_list(self) -> list[Any]:
+		"""Converts the column to a python list."""
+
+	def to_numpy(self):
+		np = _require('numpy')
+		return np.array(self.to_list(), dtype=object)
+
+	def to_arrow(self):
+		pa = _require('pyarrow')
+		return pa.array(self.to_list())
+
+	@abstractmethod
+	def __len__(self) -> int:
+		"""The number of values, nulls included."""
+
+	def __repr__(self) -> str:
+		return f'{self.__class__.__name__}(name={self.name}, length={len(self)})'
+
+class IntColumn(Column):
+	"""An int64 column backed by an `array('q')` and a validity mask."""
+	kind = 'int'
+	arrow_type = 'int64'
+	numpy_type = 'int64'
+
+	def __init__(self, name: str):
+		super().__init__(name)
+		self.values: array = array('q')
+		self.valid: bytearray = bytearray()
+		self.null_count: int = 0
+
+	def append(self, value: Any):
+		if value is None:
+			self.values.append(0)
+			self.valid.append(0)
+			self.null_count += 1
+		else:
+			self.values.append(self._convert(value))
+			self.valid.append(1)
+
+	def _convert(self, value: Any) -> int:
+		return int(value)
+
+	def _to_python(self, value: int) -> Any:
+		return value
+
+	def to_list(self) -> list[Any]:
+		return [self._to_python(v) if ok else None for v, ok in zip(self.values, self.valid)]
+
+	def to_numpy(self):
+		np = _require('numpy')
+		values = np.frombuffer(self.values, dtype=np.int64).astype(self.numpy_type)
+		if self.null_count:
+			return np.ma.masked_array(values, mask=np.frombuffer(bytes(self.valid), dtype=np.uint8) == 0)
+		return values
+
+	def to_arrow(self):
+		pa = _require('pyarrow')
+		arrow_type = getattr(pa, self.arrow_type)() if self.kind == 'int' else pa.timestamp('us')
+		if self.null_count:
+			return pa.array([v if ok else None for v, ok in zip(self.values, self.valid)], type=pa.int64()).cast(arrow_type)
+		# No nulls so the array can be handed over without copying
+		return pa.Array.from_buffers(arrow_type, len(self.values), [None, pa.py_buffer(self.values)])
+
+	def __len__(self) -> int:
+		return len(self.values)
+
+class TimestampColumn(IntColumn):
+	"""A timestamp column stored as int64 microseconds since the epoch in UTC, naive values
+	taken to be UTC already. Converts to `datetime64[us]` for NumPy and `timestamp[us]` for
+	Arrow."""
+	kind = 'timestamp'
+	numpy_type = 'datetime64[us]'
+
+	def _convert(self, value: Any) -> int:
+		if isinstance(value, str):
+			value = datetime.fromisoformat(value)
+		return (naive_utc(value) - EPOCH) // MICROSECOND
+
+	def _to_python(self, value: int) -> Any:
+		return EPOCH + timedelta(microseconds=value)
+
+	def to_numpy(self):
+		np = _require('numpy')
+		values = np.frombuffer(self.values, dtype=np.int64).view('datetime64[us]').copy()
+		if self.null_count:
+			values[np.frombuffer(bytes(self.valid), dtype=np.uint8) == 0] = np.datetime64('NaT')
+		return values
+
+class CategoricalColumn(Column):
+	"""A dictionary encoded column. Each distinct value is stored once in `categories` and
+	rows hold an int32 code into it, with -1 for null."""
+	kind = 'category'
+
+	def __init__(self, name: str):
+		super().__init__(name)
+		self.codes: array = array('i')
+		self.categories: list[Any] = []
+		self._lookup: dict[Any, int] = {}
+
+	def append(self, value: Any):
+		if value is None:
+			self.codes.append(-1)
+			return
+		code = self._lookup.get(value)
+		if code is None:
+			code = len(self.categories)
+			self._lookup[value] = code
+			self.categories.append(value)
+		self.codes.append(code)
+
+	def to_list(self) -> list[Any]:
+		categories = self.categories
+		return [categories[c] if c >= 0 else None for c in self.codes]
+
+	def to_arrow(self):
+		pa = _require('pyarrow')
+		indices = pa.array([c if c >= 0 else None for c in self.codes], type=pa.int32())
+		return pa.DictionaryArray.from_arrays(indices, pa.array([str(c) for c in self.categories], type=pa.string()))
+
+	def __len__(self) -> int:
+		return len(self.codes)
+
+class ObjectColumn(Column):
+	"""A column of plain python values, used for free text."""
+	kind = 'str'
+
+	def __init__(self, name: str):
+		super().__init__(name)
+		self.values: list[Any] = []
+
+	def append(self, value: Any):
+		self.values.append(value)
+
+	def to_list(self) -> list[Any]:
+		return list(self.values)
+
+	def __len__(self) -> int:
+		return len(self.values)
+
+COLUMN_TYPES: dict[str, type[Column]] = {
+	'int': IntColumn,
+	'timestamp': TimestampColumn,
+	'category': CategoricalColumn,
+	'str': ObjectColumn,
+}
+
+class ItemTable:
+	"""A columnar table of tracker items built straight from the raw item payloads, without
+	instantiating any `TrackerItem` objects. System fields are named by their snake_case
+	attribute name (e.g. `modified_at`) and custom fields by their field name."""
+
+	def __init__(
+		self,
+		columns: Iterable[str] | None = None,
+		custom_fields: Iterable[str] | bool | None = None,
+	):
+		self._columns: dict[str, Column] = {}
+		self._extractors: list[tuple[Column, Any]] = []
+		self._custom: dict[str, Column | None] = {}
+		self._discover_custom: bool = custom_fields is True
+		self._rows: int = 0
+		for name in columns or DEFAULT_COLUMNS:
+			if name not in COLUMN_KINDS:
+				raise KeyError(f'unknown column {name!r}')
+			column = COLUMN_TYPES[COLUMN_KINDS[name]](name)
+			self._columns[name] = column
+			self._extractors.append((column, SYSTEM_FIELDS[name]))
+		if custom_fields and custom_fields is not True:
+			for name in custom_fields:
+				# The column type is decided by the first value seen
+				self._custom[name] = None
+
+	@property
+	def columns(self) -> dict[str, Column]:
+		"""The columns of the table by name."""
+		# Requested custom fields that never had a value still get an all null column
+		for name, column in self._custom.items():
+			if column is None:
+				self._add_custom_column(name, {})
+		return self._columns
+
+	@property
+	def column_names(self) -> list[str]:
+		"""The names of the columns in order."""
+		return list(self.columns)
+
+	@property
+	def needs_full_items(self) -> bool:
+		"""Whether any requested column is only present in full item payloads rather than
+		item references."""
+		return bool(self._custom) or self._discover_custom or any(c not in REFERENCE_FIELDS for c in self._columns)
+
+	def append(self, item: dict[str, Any]):
+		"""Appends a raw item payload as a row.
+
+		Params:
+		item — The item JSON as returned by codeBeamer. — dict[str, Any]"""
+		for column, extractor in self._extractors:
+			column.append(extractor(item))
+		if self._custom or self._discover_custom:
+			fields = {f.get('name'): f for f in item.get('customFields') or ()}
+			if self._discover_custom:
+				for name in fields:
+					if name not in self._custom:
+						self._custom[name] = None
+			for name, column in self._custom.items():
+				field = fields.get(name)
+				if column is None:
+					if field is None or custom_field_value(field) is None:
+						continue
+					column = self._add_custom_column(name, field)
+				column.append(custom_field_value(field) if field else None)
+		self._rows += 1
+
+	def extend(self, items: Iterable[dict[str, Any]]):
+		"""Appends many raw item payloads, e.g. a page of `items/query` results.
+
+		Params:
+		items — The item JSONs. — Iterable[dict[str, Any]]"""
+		for item in items:
+			self.append(item)
+
+	def _add_custom_column(self, name: str, field: dict[str, Any]) -> Column:
+		kind = CUSTOM_FIELD_KINDS.get(field.get('type'), 'str')
+		column = COLUMN_TYPES[kind](name)
+		column.extend_nulls(self._rows)
+		self._custom[name] = column
+		self._columns[name] = column
+		return column
+
+	def column(self, name: str) -> Column:
+		"""Gets a column by name.
+
+		Raises:
+		KeyError — The column doesn't exist."""
+		return self.columns[name]
+
+	def to_pydict(self) -> dict[str, list[Any]]:
+		"""Converts the table to a dict of python lists."""
+		return {name: column.to_list() for name, column in self.columns.items()}
+
+	def to_numpy(self) -> dict[str, Any]:
+		"""Converts the table to a dict of NumPy arrays. Integer columns with nulls become masked
+		arrays, timestamps use `datetime64[us]` with NaT for nulls. Requires numpy."""
+		return {name: column.to_numpy() for name, column in self.columns.items()}
+
+	def to_arrow(self):
+		"""Converts the table to a `pyarrow.Table`. Categorical columns become dictionary
+		arrays. Requires pyarrow."""
+		pa = _require('pyarrow')
+		return pa.table({name: column.to_arrow() for name, column in self.columns.items()})
+
+	def write_parquet(self, path: str, **kwargs):
+		"""Writes the table to a Parquet file. Requires pyarrow.
+
+		Params:
+		path — The file to write to. — str"""
+		_require('pyarrow')
+		import pyarrow.parquet as pq
+		pq.write_table(self.to_arrow(), path, **kwargs)
+
+	def write_ipc(self, path: str):
+		"""Writes the table to an Arrow IPC (Feather v2) file. Requires pyarrow.
+
+		Params:
+		path — The file to write to. — str"""
+		pa = _require('pyarrow')
+		table = self.to_arrow()
+		with pa.OSFile(path, 'wb') as sink:
+			with pa.ipc.new_file(sink, table.schema) as writer:
+				writer.write_table(table)
+
+	def __len__(self) -> int:
+		return self._rows
+
+	def __repr__(self) -> str:
+		return f'ItemTable(rows={self._rows}, columns={self.column_names})'
+
+def _require(module: str):
+	"""Imports an optional dependency, raising a helpful error if it isn't installed."""
+	try:
+		return __import__(module)
+	except ImportError as e:
+		raise ImportError(f'{module} is required for this, install it with `pip install {module}`') from e
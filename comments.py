@@ -0,0 +1,203 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import perf_counter
+
+from .bulk import BulkReport
+from .tracker_item import TrackerItem
+from .transport import HTTPError, MultipartStream
+from .utils import intern_string, iter_pages, logger
+
+if TYPE_CHECKING:
+	from .rest_client import RestClient
+
+COMMENT_FORMATS = ('PlainText', 'Html', 'Wiki')
+
+class Comment:
+	"""A comment on an item, reduced to what reviews and exports need. Timestamps are left as
+	the ISO strings codeBeamer returns and repeated values like the author are interned, so
+	millions of them stay small."""
+	__slots__ = ('id', 'item_id', 'text', 'format', 'created_at', 'created_by')
+
+	def __init__(self, id: int, item_id: int, text: str, format: str, created_at: str | None, created_by: str | None):
+		self.id: int = id
+		self.item_id: int = item_id
+		self.text: str = text
+		self.format: str = format
+		self.created_at: str | None = created_at
+		self.created_by: str | None = created_by
+
+	@classmethod
+	def from_json(cls, item_id: int, data: dict[str, Any]) -> Comment:
+		"""Makes a comment from its JSON.
+
+		Params:
+		item_id — The item the comment is on. — int
+		data — The comment JSON. — dict[str, Any]
+
+		Returns:
+		`Comment` — The comment."""
+		created_by = data.get('createdBy')
+		return cls(
+			data.get('id'),
+			item_id,
+			data.get('comment', ''),
+			intern_string(data.get('commentFormat', 'PlainText')),
+			data.get('createdAt'),
+			intern_string(created_by.get('name') if isinstance(created_by, dict) else created_by),
+		)
+
+	def as_dict(self) -> dict[str, Any]:
+		"""The comment as a dict keyed by attribute name."""
+		return {name: getattr(self, name) for name in self.__slots__}
+
+	def __repr__(self) -> str:
+		return f'Comment(id={self.id}, item_id={self.item_id}, created_by={self.created_by})'
+
+def iter_item_comments(client: RestClient, item_id: int, page_size: int = 100) -> Iterator[dict[str, Any]]:
+	"""Yields the comment JSONs of an item, page by page when codeBeamer pages them.
+
+	Params:
+	client — The client to fetch with. — `RestClient`
+	item_id — The item. — int
+	page_size — The number of comments per page. — int(100)
+
+	Raises:
+	HTTPError — The comments couldn't be fetched."""
+	# GET items/{itemId}/comments
+	def fetch(page: int, size: int) -> Any:
+		return client.request('GET', f'items/{item_id}/comments', params={'page': page, 'pageSize': size}, raise_for_status=True)
+
+	first = fetch(1, page_size)
+	if isinstance(first, list):
+		yield from first
+		return
+	for page in iter_pages(lambda page, size: first if page == 1 else fetch(page, size), 'comments', page_size=page_size):
+		yield from page
+
+def iter_comments(
+	client: RestClient,
+	items: Iterable[int | TrackerItem],
+	workers: int = 8,
+	page_size: int = 100,
+	skip_errors: bool = False
+) -> Iterator[Comment]:
+	"""Streams the comments of many items, fetching several items at once. `items` is read as
+	it's needed and only a couple of items per worker are fetched ahead, so this runs in
+	constant memory over any number of items. Comments come out in item order.
+
+	An item whose comments can't be fetched, e.g. one that was deleted or isn't visible, ends
+	the stream with its HTTPError once its turn comes, after the comments of the items before
+	it. With `skip_errors` it's logged and skipped instead.
+
+	Params:
+	client — The client to fetch with. — `RestClient`
+	items — The items or their IDs. — Iterable[int | `TrackerItem`]
+	workers — The number of concurrent requests. — int(8)
+	page_size — The number of comments per page. — int(100)
+	skip_errors — Skip items whose comments can't be fetched instead of raising. — bool(False)
+
+	Raises:
+	HTTPError — The comments of an item couldn't be fetched and `skip_errors` isn't set."""
+	workers = max(1, workers)
+
+	def fetch(item_id: int) -> list[Comment]:
+		try:
+			return [Comment.from_json(item_id, data) for data in iter_item_comments(client, item_id, page_size)]
+		except HTTPError as e:
+			if not skip_errors:
+				raise
+			logger.debug(f'Skipping the comments of item {item_id}: {e}')
+			return []
+
+	with ThreadPoolExecutor(max_workers=workers) as executor:
+		ahead: deque[Future] = deque()
+		try:
+			for item in items:
+				ahead.append(executor.submit(fetch, item.id if isinstance(item, TrackerItem) else int(item)))
+				if len(ahead) >= workers * 2:
+					yield from ahead.popleft().result()
+			while ahead:
+				yield from ahead.popleft().result()
+		finally:
+			# Don't fetch further ahead once the stream has failed or been closed
+			for future in ahead:
+				future.cancel()
+
+def post_comment(
+	client: RestClient,
+	item: int | TrackerItem,
+	text: str,
+	format: str = 'PlainText',
+	reply_to: int | None = None
+) -> Comment:
+	"""Comments on an item, or replies to one of its comments.
+
+	Params:
+	client — The client to post with. — `RestClient`
+	item — The item or its ID. — int | `TrackerItem`
+	text — The comment. — str
+	format — 'PlainText', 'Html', or 'Wiki'. — str('PlainText')
+	reply_to — The ID of the comment to reply to. — int(None)
+
+	Raises:
+	ValueError — The format isn't known.
+	HTTPError — The comment was rejected.
+
+	Returns:
+	`Comment` — The new comment."""
+	# POST items/{itemId}/comments
+	# POST items/{itemId}/comments/{commentId}
+	if format not in COMMENT_FORMATS:
+		raise ValueError(f'format must be one of {COMMENT_FORMATS}')
+	item_id = item.id if isinstance(item, TrackerItem) else int(item)
+	path = f'items/{item_id}/comments' + (f'/{reply_to}' if reply_to is not None else '')
+	body = MultipartStream([], data={'comment': text, 'commentFormat': format})
+	headers = {'Content-Type': body.content_type, 'Content-Length': str(len(body))}
+	data = client.request('POST', path, data=body, headers=headers, raise_for_status=True)
+	return Comment.from_json(item_id, data)
+
+def post_comments(
+	client: RestClient,
+	comments: Iterable[tuple[int | TrackerItem, str]],
+	format: str = 'PlainText',
+	workers: int = 8
+) -> BulkReport:
+	"""Posts many comments. Items are commented on concurrently, the comments for one item are
+	posted in the order given so they read in that order.
+
+	Params:
+	client — The client to post with. — `RestClient`
+	comments — The item (or ID) and the comment. — Iterable[tuple]
+	format — 'PlainText', 'Html', or 'Wiki'. — str('PlainText')
+	workers — The most items commented on at once. — int(8)
+
+	Raises:
+	ValueError — The format isn't known.
+
+	Returns:
+	`BulkReport` — Keyed by `(item ID, position in comments)`."""
+	if format not in COMMENT_FORMATS:
+		raise ValueError(f'format must be one of {COMMENT_FORMATS}')
+	report = BulkReport('comment')
+	by_item: dict[int, list[tuple[int, str]]] = {}
+	for position, (item, text) in enumerate(comments):
+		by_item.setdefault(item.id if isinstance(item, TrackerItem) else int(item), []).append((position, text))
+
+	def post(item_id: int):
+		for position, text in by_item[item_id]:
+			try:
+				post_comment(client, item_id, text, format=format)
+				report._record([(item_id, position)])
+			except Exception as e:
+				logger.debug(f'Commenting on item {item_id} failed: {e}')
+				report._record([(item_id, position)], e)
+
+	start = perf_counter()
+	with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+		list(executor.map(post, by_item))
+	report.elapsed = perf_counter() - start
+	logger.debug(repr(report))
+	return report
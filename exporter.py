@@ -0,0 +1,182 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, TextIO
+
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+
+from .columnar import DEFAULT_COLUMNS
+from .records import Projection
+from .utils import logger
+
+if TYPE_CHECKING:
+	from .rest_client import RestClient
+
+EXPORT_FORMATS = ('jsonl', 'csv')
+
+class ExportReport:
+	"""The outcome of an export. Only counts are kept, never the items, so reporting costs
+	nothing however many items are written."""
+
+	def __init__(self):
+		self.items: int = 0
+		self.pages: int = 0
+		self.elapsed: float = 0.0
+		self._start: float = perf_counter()
+
+	@property
+	def items_per_second(self) -> float:
+		"""Items written per second, so far while the export runs."""
+		elapsed = self.elapsed or perf_counter() - self._start
+		return self.items / elapsed if elapsed else 0.0
+
+	def __repr__(self) -> str:
+		return f'ExportReport(items={self.items}, pages={self.pages}, rate={self.items_per_second:.1f}/s)'
+
+def export_format(destination: str | os.PathLike | TextIO, format: str | None = None) -> str:
+	"""The format to write: `format` if given, else picked by the destination's suffix.
+
+	Params:
+	destination — The file path or file. — str | PathLike | TextIO
+	format — 'jsonl' or 'csv'. — str(None)
+
+	Raises:
+	ValueError — The format isn't 'jsonl' or 'csv', or can't be told from the destination."""
+	if format is None:
+		name = destination if isinstance(destination, (str, os.PathLike)) else getattr(destination, 'name', '')
+		suffix = Path(name if isinstance(name, (str, os.PathLike)) else '').suffix.lower()
+		format = 'jsonl' if suffix in ('.jsonl', '.ndjson') else suffix[1:]
+	if format not in EXPORT_FORMATS:
+		raise ValueError(f'format must be one of {EXPORT_FORMATS}, got {format!r}')
+	return format
+
+def hydrate_pages(
+	client: RestClient,
+	pages: Iterable[list[dict[str, Any]]],
+	chunk_size: int = 500,
+	workers: int = 4
+) -> Iterator[list[dict[str, Any]]]:
+	"""Swaps pages of item references for the full items, fetched with `item.id IN (...)`
+	queries of up to `chunk_size` items, several at once. Only a couple of chunks per worker
+	are fetched ahead of the consumer, and chunks come out in the order of the references.
+
+	Params:
+	client — The client to fetch with. — `RestClient`
+	pages — Pages of item references. — Iterable[list[dict[str, Any]]]
+	chunk_size — The most items per query. Must be between 1 and 500. — int(500)
+	workers — The number of concurrent queries. — int(4)
+
+	Raises:
+	HTTPError — A chunk of items couldn't be fetched.
+
+	Returns:
+	Iterator[list[dict[str, Any]]] — The full items, one list per chunk."""
+	chunk_size = max(1, min(500, chunk_size))
+	workers = max(1, workers)
+
+	def fetch(refs: list[dict[str, Any]]) -> list[dict[str, Any]]:
+		ids = ','.join(str(ref['id']) for ref in refs)
+		query = {'page': 1, 'pageSize': len(refs), 'queryString': f'item.id IN ({ids})'}
+		full = {i['id']: i for i in client.request('POST', 'items/query', json_=query, raise_for_status=True)['items']}
+		# An item deleted since it was listed keeps its reference
+		return [full.get(ref['id'], ref) for ref in refs]
+
+	def chunks() -> Iterator[list[dict[str, Any]]]:
+		chunk: list[dict[str, Any]] = []
+		for page in pages:
+			for ref in page:
+				chunk.append(ref)
+				if len(chunk) == chunk_size:
+					yield chunk
+					chunk = []
+		if chunk:
+			yield chunk
+
+	with ThreadPoolExecutor(max_workers=workers) as executor:
+		ahead: deque[Future] = deque()
+		try:
+			for chunk in chunks():
+				ahead.append(executor.submit(fetch, chunk))
+				if len(ahead) >= workers * 2:
+					yield ahead.popleft().result()
+			while ahead:
+				yield ahead.popleft().result()
+		finally:
+			# Don't fetch further ahead once the export has failed or been abandoned
+			for future in ahead:
+				future.cancel()
+
+def _write_pages(
+	file: TextIO,
+	pages: Iterable[list[dict[str, Any]]],
+	projection: Projection,
+	format: str,
+	report: ExportReport,
+	progress: Callable[[ExportReport], None] | None,
+	progress_every: int
+):
+	if format == 'csv':
+		writer = csv.writer(file)
+		writer.writerow(projection.fields)
+		write = lambda item: writer.writerow(projection.as_tuple(item))
+	else:
+		dumps = json.JSONEncoder(ensure_ascii=False, default=str).encode
+		write = lambda item: file.write(dumps(projection.as_dict(item)) + '\n')
+	next_progress = progress_every
+	for page in pages:
+		for item in page:
+			write(item)
+		report.items += len(page)
+		report.pages += 1
+		if progress is not None and report.items >= next_progress:
+			progress(report)
+			next_progress = report.items + progress_every
+
+def export_items(
+	pages: Iterable[list[dict[str, Any]]],
+	destination: str | os.PathLike | TextIO,
+	columns: Iterable[str] | None = None,
+	format: str | None = None,
+	progress: Callable[[ExportReport], None] | None = None,
+	progress_every: int = 5000
+) -> ExportReport:
+	"""Writes pages of raw item JSON to a JSON Lines or CSV file as they arrive, one line per
+	item projected to `columns`. Nothing but the page being written is held, so any number of
+	items is exported in constant memory. A file path is written to `<destination>.part` and
+	renamed once complete, so an interrupted export never leaves a partial file behind.
+
+	Params:
+	pages — Pages of raw item JSON, e.g. from `Tracker.iter_item_pages`. — Iterable[list[dict[str, Any]]]
+	destination — The file path, or a file opened in text mode. — str | PathLike | TextIO
+	columns — The fields to write, see `Projection`. Custom fields are named by their field name. — Iterable[str](None)
+	format — 'jsonl' or 'csv'. If None it's picked by the destination's suffix. — str(None)
+	progress — Called with the report every `progress_every` items. — Callable[[`ExportReport`], None](None)
+	progress_every — How many items between progress calls. — int(5000)
+
+	Raises:
+	ValueError — The format isn't known.
+
+	Returns:
+	`ExportReport` — The number of items written and the rate."""
+	format = export_format(destination, format)
+	projection = Projection(columns or DEFAULT_COLUMNS)
+	report = ExportReport()
+	if not isinstance(destination, (str, os.PathLike)):
+		_write_pages(destination, pages, projection, format, report, progress, progress_every)
+	else:
+		path = Path(destination)
+		part = path.with_name(f'{path.name}.part')
+		try:
+			with open(part, 'w', newline='' if format == 'csv' else None, encoding='utf-8') as file:
+				_write_pages(file, pages, projection, format, report, progress, progress_every)
+		except BaseException:
+			part.unlink(missing_ok=True)
+			raise
+		part.replace(path)
+	report.elapsed = perf_counter() - report._start
+	logger.debug(repr(report))
+	return report
@@ -1,14 +1,17 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Callable, Hashable, Iterator
 
-from loguru import logger
 from datetime import datetime
+from threading import Lock, RLock
+from weakref import WeakKeyDictionary, WeakValueDictionary
 
 from .rest_client import RestClient
-from .utils import loadable, clamp, pages
+from .utils import loadable, locked, clamp, iter_pages, intern_string, logger
 
 if TYPE_CHECKING:
 	from .tracker import Tracker
+	from .tracker_item import TrackerItem
+	from .writer import WriteResult
 
 # ? Should this be a base class and break into sub classes?
 # ? Or shoud get_options just be implemented and return [] if type != 'ChoiceField'
@@ -38,6 +41,7 @@ class FieldDefinition:
 		prop_defaults = {k: None for k in self.__class__.__annotations__}
 		self.__dict__.update(prop_defaults)
 		self._loaded = False
+		self._lock = RLock()
 
 		self._id: int = id
 		self._name: str = name
@@ -157,6 +161,7 @@ class FieldDefinition:
 		""""""
 		return self._reference_type
 
+	@locked
 	def _load(self, data: dict[str, Any] = None):
 		"""Loads the rest of the field's data. When a field is fetched using 
 		`Tracker.get_fields` only the ID and Name of the field are retrieved. 
@@ -177,7 +182,7 @@ class FieldDefinition:
 		self._mandatory_in_statuses = data.get('mandatoryInStatuses')
 		self._multiple_values = data.get('multipleValues')
 		options = data.get('options')
-		self._options = [ChoiceValue(**o) for o in options] if options else None
+		self._options = [ChoiceValue.from_json(o) for o in options] if options else None
 		self._shared_fields = [FieldDefinition(**f, client=self._client) for f in data.get('sharedFields', [])]
 		self._title = data.get('title')
 		self._tracker_item_field = data.get('trackerItemField')
@@ -219,6 +224,7 @@ class Field:
 	"""Represents a field on an item in codeBeamer."""
 	if TYPE_CHECKING:
 		_value: ChoiceValue | str | int | datetime | None
+		_original: ChoiceValue | str | int | datetime | None
 
 	def __new__(cls, *args, **kwargs):
 		# Return correct subclass based on type param
@@ -244,12 +250,15 @@ class Field:
 
 	def __init__(self, fieldId: int, name: str, *args, **kwargs):
 		self._id: int = fieldId
-		self._name: str = name
-		self._type: str = kwargs.get('type')
+		self._name: str = intern_string(name)
+		self._type: str = intern_string(kwargs.get('type'))
 		self._shared_field_names: list[str] = kwargs.get('sharedFieldNames')
-		self._editable: bool = kwargs.get('editable')
+		# None until known for fields built from an item's own payload, see `Field.editable`
+		self._editable: bool | None = kwargs.get('editable')
+		self._item: TrackerItem | None = kwargs.get('item')
 		self._client: RestClient = kwargs.get('client')
 		self._item_id: int = kwargs.get('item_id')
+		self._tracker_id: int | None = kwargs.get('tracker_id')
 
 	@property
 	def id(self) -> str:
@@ -270,11 +279,89 @@ class Field:
 	def shared_field_names(self) -> str:
 		""""""
 		return self._shared_field_names
+
+	@property
+	def editable(self) -> bool:
+		"""Whether the field can be changed. Fields built from the custom fields in an item's 
+		payload don't say, so the item's field information is fetched the first time it's 
+		needed."""
+		if self._editable is None:
+			field = self._item.get_field(self.id) if self._item is not None else None
+			self._editable = bool(field is not None and field._editable)
+		return self._editable
 	
 	@property
 	def value(self):
 		pass
 
+	@property
+	def dirty(self) -> bool:
+		"""Whether the value was changed since it was loaded or last saved."""
+		return self._value != self._original
+
+	@property
+	def json(self) -> dict[str, Any]:
+		"""The field value JSON as sent to `PUT items/{id}/fields`."""
+		return {'fieldId': self.id, 'name': self.name, 'type': self.type, **self._json_value()}
+
+	def stage(self, v: Any):
+		"""Changes the value without sending it, so `TrackerItem.update` can send it along with 
+		the item's other changed fields in one request.
+
+		Params:
+		v — The new value, checked the same way as setting `Field.value`. — Any
+
+		Raises:
+		Exception — The field isn't editable.
+		TypeError — The value is the wrong type.
+		ValueError — The value isn't allowed, e.g. not an available choice."""
+		if not self.editable:
+			raise Exception('Not editable')
+		self._value = self._coerce(v)
+
+	def save(self) -> bool:
+		"""Sends the value, through the client's write-behind queue if it has one. Nothing is 
+		sent if the value is the same as when it was loaded or last saved. The field stays 
+		`dirty` until the write succeeds, so a rejected value is sent again by the next save.
+
+		Raises:
+		HTTPError — The write was rejected. Queued writes report it on their `WriteResult` instead.
+
+		Returns:
+		bool — Whether the value was sent."""
+		if not self.dirty:
+			logger.trace(f'Field {self.name} of item {self._item_id} is unchanged, not saving')
+			return False
+		queue = self._client.write_queue
+		if queue is not None:
+			self._saved_on_success(queue.update_fields(self._item_id, [self.json]))
+			return True
+		self._client.request(
+			'PUT', f'items/{self._item_id}/fields', json_={'fieldValues': [self.json]}, params={'quietMode': 'true'}, raise_for_status=True
+		)
+		self._original = self._value
+		return True
+
+	def _saved_on_success(self, result: WriteResult):
+		"""Marks the value being queued as saved once the queued write succeeds."""
+		sent = self._value
+
+		def done(result: WriteResult):
+			if result.ok:
+				self._original = sent
+
+		result.add_done_callback(done)
+
+	def reset(self):
+		"""Undoes changes that haven't been saved."""
+		self._value = self._original
+
+	def _coerce(self, v: Any) -> Any:
+		return v
+
+	def _json_value(self) -> dict[str, Any]:
+		return {'value': self._value}
+
 	def __repr__(self) -> str:
 		return f'{self.__class__.__name__}(id={self.id}, name={self.name})'
 	
@@ -293,9 +380,10 @@ class Field:
 class ChoiceField(Field):
 	def __init__(self, fieldId: int, name: str, *args, **kwargs):
 		super().__init__(fieldId, name, *args, **kwargs)
-		self._value: list[ChoiceValue] = [ChoiceValue(**cv) for cv in kwargs.get('values')]
-		# Caching for the choices since they won't change on an item
-		self._choices: list[ChoiceValue] = None
+		self._value: list[ChoiceValue] = [ChoiceValue.from_json(cv) for cv in kwargs.get('values')]
+		self._original: list[ChoiceValue] = self._value
+		# The dependency context the options are looked up under, see `ChoiceField.get_choices`
+		self._context: Hashable = None
 
 	@property
 	def value(self) -> str:
@@ -304,72 +392,207 @@ class ChoiceField(Field):
 
 	@value.setter
 	def value(self, v: ChoiceValue | list[ChoiceValue]):
-		if not self._editable:
-			raise Exception('Not editable')
+		self.stage(v)
+		self.save()
+
+	def _coerce(self, v: ChoiceValue | list[ChoiceValue]) -> list[ChoiceValue]:
 		if isinstance(v, ChoiceValue):
 			v = [v]
+		if v == self._value:
+			return v
+		# Should be cached since the user would need to get choices first, and under the same 
+		# context since the field keeps the last one it was given
+		available_choices = self._choice_options()
 		for _v in v:
 			if not isinstance(_v, ChoiceValue):
 				raise TypeError(f'expected ChoiceValue, got {type(_v)}')
-			# Should be cached since the user would need to get choices first
-			available_choices = self.get_choices()
 			if _v not in available_choices:
 				raise ValueError(f'{_v} is not an available choice')
-		self._value = v
-		data = {
-			'fieldValues': [
-				{
-					'fieldId': self.id,
-					'name': self.name,
-					'type': self.type,
-					'values': [_v.json for _v in v]
-				}
-			]
-		}
-		self._client.put(f'items/{self._item_id}/fields?quietMode=true', json_=data)
-
-	def get_choices(self) -> list[ChoiceValue]:
-		"""Fetches all the available choices for this field on an item."""
+		return v
+
+	def _json_value(self) -> dict[str, Any]:
+		values = self._value if isinstance(self._value, list) else [self._value]
+		return {'values': [_v.json for _v in values]}
+
+	def _choice_options(self, context: Hashable = None) -> ChoiceOptions:
+		"""The available options from the client's shared cache, fetched on first use. Without 
+		a context the one the field was last given is used."""
+		if context is not None:
+			self._context = context
+		context = self._context
+		if self._tracker_id is not None:
+			key = (self._tracker_id, self.id, context)
+		else:
+			# Field IDs are only unique within a tracker, so without one nothing can be shared
+			key = (None, self._item_id, self.id, context)
+		fetch = lambda p, s: self._client.get(f'items/{self._item_id}/fields/{self.id}/options', params={'page': p, 'pageSize': s})
+		load = lambda: [ChoiceValue.from_json(cv) for refs in iter_pages(fetch, 'references', page_size=500) for cv in refs]
+		return choice_options_cache(self._client).get(key, load)
+
+	def get_choices(self, context: Hashable = None) -> list[ChoiceValue]:
+		"""Fetches all the available choices for this field. Choices are cached per tracker 
+		field and shared by every item from the same client, so only the first item to ask 
+		fetches them.
+		
+		Params:
+		context — For fields whose options depend on other fields, something hashable identifying the values they depend on (e.g. the controlling field's choice ID, or the item's ID to not share at all). Items with different contexts don't share options, and without one every item of the tracker does. The field keeps the context for later lookups and for checking staged values, so it only needs giving once. — Hashable(None)
+		
+		Returns:
+		list[`ChoiceValue`] — The available choices."""
 		# ! Decision here is to just get all of them and not allow the user to paginate
-		if not self._choices:
-			page = 1
-			page_size = 500
-			params = {'page': page, 'pageSize': page_size}
-			choices: list[ChoiceValue] = []
-			choice_data = self._client.get(f'items/{self._item_id}/fields/{self.id}/options', params=params)
-			total_pages = pages(choice_data['total'], page_size)
-			choices.extend([ChoiceValue(**cv) for cv in choice_data['references']])
-			while params['page'] < total_pages:
-				params['page'] += 1
-				choice_data = self._client.get(f'items/{self.id}/children', params=params)
-				choices.extend([ChoiceValue(**cv) for cv in choice_data['references']])
-			self._choices = choices
-		return self._choices
+		return self._choice_options(context).options
 	
-	def get_choice(self, choice: str | int) -> ChoiceValue:
+	def get_choice(self, choice: str | int, context: Hashable = None) -> ChoiceValue | None:
 		"""Fetches a specific choice value from the list of available choices on this field.
 		
 		Params:
 		choice — The name or ID of the choice value to fetch. — str | int
+		context — The dependency context, see `get_choices`. Defaults to the one the field was last given. — Hashable(None)
 		
 		Returns:
 		`ChoiceValue` — An available choice if one exists."""
-		choices = self.get_choices()
+		return self._choice_options(context).get(choice)
+
+class ChoiceOptions:
+	"""The available options of a choice field, indexed by ID and by name."""
+
+	def __init__(self, options: list[ChoiceValue]):
+		self.options: list[ChoiceValue] = options
+		self._by_id: dict[int, ChoiceValue] = {}
+		self._by_name: dict[str, ChoiceValue] = {}
+		for option in options:
+			# The first option wins if names are repeated
+			self._by_id.setdefault(option.id, option)
+			self._by_name.setdefault(option.name, option)
+
+	def get(self, choice: str | int) -> ChoiceValue | None:
+		"""Looks up an option by name or ID.
+
+		Params:
+		choice — The name or ID of the option. — str | int
+
+		Raises:
+		TypeError — The choice isn't a str or int.
+
+		Returns:
+		`ChoiceValue` — The option if it exists."""
 		if isinstance(choice, str):
-			choice_dict = {c.name: c for c in choices}
+			return self._by_name.get(choice)
 		elif isinstance(choice, int):
-			choice_dict = {c.id: c for c in choices}
-		else:
-			raise TypeError(f'expected str or int, got {type(choice)}')
-		return choice_dict.get(choice)
+			return self._by_id.get(choice)
+		raise TypeError(f'expected str or int, got {type(choice)}')
+
+	def __contains__(self, o: object) -> bool:
+		return isinstance(o, ChoiceValue) and o.id in self._by_id
+
+	def __iter__(self) -> Iterator[ChoiceValue]:
+		return iter(self.options)
+
+	def __len__(self) -> int:
+		return len(self.options)
+
+	def __repr__(self) -> str:
+		return f'ChoiceOptions(options={len(self)})'
+
+class ChoiceOptionCache:
+	"""Choice options shared by every item of a client, keyed by tracker ID, field ID, and 
+	dependency context. Concurrent requests for the same key wait for the first one to load 
+	instead of all fetching the options."""
+
+	def __init__(self):
+		self._options: dict[tuple, ChoiceOptions] = {}
+		self._loading: dict[tuple, Lock] = {}
+		self._lock: Lock = Lock()
+
+	def get(self, key: tuple, load: Callable[[], list[ChoiceValue]]) -> ChoiceOptions:
+		"""The options for a key, loading them if they aren't cached.
+
+		Params:
+		key — The tracker ID, field ID, and dependency context. — tuple
+		load — Fetches the options. — Callable[[], list[`ChoiceValue`]]
+
+		Returns:
+		`ChoiceOptions` — The options."""
+		with self._lock:
+			options = self._options.get(key)
+			if options is not None:
+				return options
+			loading = self._loading.setdefault(key, Lock())
+		with loading:
+			with self._lock:
+				options = self._options.get(key)
+			if options is None:
+				options = ChoiceOptions(load())
+				with self._lock:
+					self._options[key] = options
+					self._loading.pop(key, None)
+		return options
+
+	def invalidate(self, tracker_id: int | None = None, field_id: int | None = None):
+		"""Drops cached options so they're fetched again. With no arguments everything is dropped.
+
+		Params:
+		tracker_id — Only drop the options of this tracker. — int(None)
+		field_id — Only drop the options of this field. — int(None)"""
+		with self._lock:
+			for key in list(self._options):
+				# Keys without a tracker are (None, item ID, field ID, context)
+				key_field = key[1] if key[0] is not None else key[2]
+				if (tracker_id is None or key[0] == tracker_id) and (field_id is None or key_field == field_id):
+					del self._options[key]
+
+	def __len__(self) -> int:
+		return len(self._options)
+
+_choice_caches: WeakKeyDictionary[RestClient, ChoiceOptionCache] = WeakKeyDictionary()
+_choice_caches_lock = Lock()
+
+def choice_options_cache(client: RestClient) -> ChoiceOptionCache:
+	"""The choice option cache shared by everything using a client."""
+	with _choice_caches_lock:
+		cache = _choice_caches.get(client)
+		if cache is None:
+			cache = _choice_caches[client] = ChoiceOptionCache()
+		return cache
 
 class ChoiceValue:
+	"""A choice option, user, or other reference selected in a field. `ChoiceValue.from_json` 
+	hands out a single shared instance per type and ID for as long as anything holds on to it, 
+	rather than one per item that references it."""
+	__slots__ = ('_id', '_name', '_type', '_email', '__weakref__')
+	_instances: WeakValueDictionary[tuple[str, int], ChoiceValue] = WeakValueDictionary()
+	_instances_lock: Lock = Lock()
+
 	def __init__(self, id: int, name: str, type: str, **kwargs):
 		self._id: int = id
-		self._name: str = name
-		self._type: str = type
+		self._name: str = intern_string(name)
+		self._type: str = intern_string(type)
 		# For UserReference types
-		self._email: str | None = kwargs.get('email')
+		self._email: str | None = intern_string(kwargs.get('email'))
+
+	@classmethod
+	def from_json(cls, data: dict[str, Any]) -> ChoiceValue:
+		"""Gets the shared value for a reference payload, making it if there isn't one yet. A 
+		payload with a new name, or an email the shared value is missing, updates it in place 
+		since references to the same user come both with and without one.
+
+		Params:
+		data — The reference JSON, e.g. `{'id': 1, 'name': 'New', 'type': 'ChoiceOptionReference'}`. — dict[str, Any]
+
+		Returns:
+		`ChoiceValue` — The value."""
+		key = (data.get('type'), data.get('id'))
+		with cls._instances_lock:
+			value = cls._instances.get(key)
+			if value is None:
+				value = cls._instances[key] = cls(**data)
+			else:
+				name, email = data.get('name'), data.get('email')
+				if name is not None and name != value._name:
+					value._name = intern_string(name)
+				if email is not None and email != value._email:
+					value._email = intern_string(email)
+		return value
 
 	@property
 	def id(self) -> int:
@@ -418,6 +641,7 @@ class IntegerField(Field):
 	def __init__(self, fieldId: int, name: str, *args, **kwargs):
 		super().__init__(fieldId, name, *args, **kwargs)
 		self._value: int | None = kwargs.get('value')
+		self._original: int | None = self._value
 
 	@property
 	def value(self) -> int:
@@ -426,27 +650,19 @@ class IntegerField(Field):
 
 	@value.setter
 	def value(self, v: int):
-		if not self._editable:
-			raise Exception('Not editable')
+		self.stage(v)
+		self.save()
+
+	def _coerce(self, v: int) -> int:
 		if not isinstance(v, int):
 			raise TypeError(f'expected int, got {type(v)}')
-		self._value = v
-		data = {
-			'fieldValues': [
-				{
-					'fieldId': self.id,
-					'name': self.name,
-					'type': self.type,
-					'value': v
-				}
-			]
-		}
-		self._client.put(f'items/{self._item_id}/fields?quietMode=true', json_=data)
+		return v
 
 class TextField(Field):
 	def __init__(self, fieldId: int, name: str, *args, **kwargs):
 		super().__init__(fieldId, name, *args, **kwargs)
 		self._value: str | None = kwargs.get('value')
+		self._original: str | None = self._value
 
 	@property
 	def value(self) -> str:
@@ -455,26 +671,17 @@ class TextField(Field):
 
 	@value.setter
 	def value(self, v: str):
-		if not self._editable:
-			raise Exception('Not editable')
-		v = str(v)
-		self._value = v
-		data = {
-			'fieldValues': [
-				{
-					'fieldId': self.id,
-					'name': self.name,
-					'type': self.type,
-					'value': v
-				}
-			]
-		}
-		self._client.put(f'items/{self._item_id}/fields?quietMode=true', json_=data)
+		self.stage(v)
+		self.save()
+
+	def _coerce(self, v: str) -> str:
+		return str(v)
 
 class ColorField(Field):
 	def __init__(self, fieldId: int, name: str, *args, **kwargs):
 		super().__init__(fieldId, name, *args, **kwargs)
 		self._value: str | None = kwargs.get('value')
+		self._original: str | None = self._value
 
 	@property
 	def value(self) -> str:
@@ -483,26 +690,15 @@ class ColorField(Field):
 
 	@value.setter
 	def value(self, v: str):
-		if not self._editable:
-			raise Exception('Not editable')
 		# !LOOKUP value probably needs to be in #RRBBGG format
-		self._value = v
-		data = {
-			'fieldValues': [
-				{
-					'fieldId': self.id,
-					'name': self.name,
-					'type': self.type,
-					'value': v
-				}
-			]
-		}
-		self._client.put(f'items/{self._item_id}/fields?quietMode=true', json_=data)
+		self.stage(v)
+		self.save()
 
 class WikiTextField(Field):
 	def __init__(self, fieldId: int, name: str, *args, **kwargs):
 		super().__init__(fieldId, name, *args, **kwargs)
 		self._value: str | None = kwargs.get('value')
+		self._original: str | None = self._value
 
 	@property
 	def value(self) -> str:
@@ -511,27 +707,18 @@ class WikiTextField(Field):
 
 	@value.setter
 	def value(self, v: str):
-		if not self._editable:
-			raise Exception('Not editable')
-		v = str(v)
-		self._value = v
-		data = {
-			'fieldValues': [
-				{
-					'fieldId': self.id,
-					'name': self.name,
-					'type': self.type,
-					'value': v
-				}
-			]
-		}
-		self._client.put(f'items/{self._item_id}/fields?quietMode=true', json_=data)
+		self.stage(v)
+		self.save()
+
+	def _coerce(self, v: str) -> str:
+		return str(v)
 
 class DateField(Field):
 	def __init__(self, fieldId: int, name: str, *args, **kwargs):
 		super().__init__(fieldId, name, *args, **kwargs)
 		value = kwargs.get('value')
 		self._value: datetime | None = datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f') if value else None
+		self._original: datetime | None = self._value
 
 	@property
 	def value(self) -> datetime:
@@ -540,19 +727,13 @@ class DateField(Field):
 
 	@value.setter
 	def value(self, v: datetime):
-		if not self._editable:
-			raise Exception('Not editable')
+		self.stage(v)
+		self.save()
+
+	def _coerce(self, v: datetime) -> datetime:
 		if not isinstance(v, datetime):
 			raise TypeError(f'expected datetime, got {type(v)}')
-		self._value = v
-		data = {
-			'fieldValues': [
-				{
-					'fieldId': self.id,
-					'name': self.name,
-					'type': self.type,
-					'value': v.strftime('%Y-%m-%dT%H:%M:%S.%f')
-				}
-			]
-		}
-		self._client.put(f'items/{self._item_id}/fields?quietMode=true', json_=data)
+		return v
+
+	def _json_value(self) -> dict[str, Any]:
+		return {'value': self._value.strftime('%Y-%m-%dT%H:%M:%S.%f') if self._value else None}
@@ -0,0 +1,261 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from time import perf_counter
+
+from .columnar import IntColumn, TimestampColumn, CategoricalColumn, ObjectColumn, _require
+from .tracker_item import TrackerItem
+from .utils import intern_string, naive_utc, logger
+
+if TYPE_CHECKING:
+	from .rest_client import RestClient
+
+# Snapshot keys that change with every version and aren't field changes
+_BOOKKEEPING = frozenset(('version', 'modifiedAt', 'modifiedBy', 'children', 'comments', 'versions'))
+
+def _scalar(value: Any) -> Any:
+	"""Reduces a history value to something small and comparable: references become their
+	name, lists become tuples, and strings are interned since the same values repeat across
+	items."""
+	if isinstance(value, dict):
+		value = value.get('name', value.get('id'))
+	elif isinstance(value, list):
+		return tuple(_scalar(v) for v in value)
+	return intern_string(value)
+
+def _snapshot_values(item: dict[str, Any]) -> dict[str, Any]:
+	values = {k: _scalar(v) for k, v in item.items() if k not in _BOOKKEEPING and k != 'customFields'}
+	for field in item.get('customFields') or []:
+		values[field.get('name')] = _scalar(field.get('values', field.get('value')))
+	return values
+
+def history_changes(versions: list[dict[str, Any]], since: datetime | None = None) -> list[tuple]:
+	"""Reduces the history entries of an item to its field changes.
+
+	Params:
+	versions — The entries of `items/{id}/history`, or item snapshots. — list[dict[str, Any]]
+	since — Drop versions modified before this. Naive datetimes are taken as UTC. — datetime(None)
+
+	Returns:
+	list[tuple] — `(version, modified_at, modified_by, field, old value, new value)` in version order."""
+	rows: list[tuple] = []
+	previous: dict[str, Any] | None = None
+	since = naive_utc(since) if since is not None else None
+	for entry in sorted(versions, key=lambda v: v.get('version') or 0):
+		version, modified_at = entry.get('version'), entry.get('modifiedAt')
+		if 'changes' in entry:
+			changes = [(c.get('fieldName'), _scalar(c.get('oldValue')), _scalar(c.get('newValue'))) for c in entry['changes']]
+		else:
+			snapshot = _snapshot_values(entry.get('item', entry))
+			changes = [] if previous is None else [
+				(name, previous.get(name), value) for name, value in snapshot.items() if previous.get(name) != value
+			]
+			previous = snapshot
+		if since is not None and modified_at and naive_utc(datetime.fromisoformat(modified_at)) < since:
+			continue
+		modified_by = _scalar(entry.get('modifiedBy'))
+		rows.extend((version, modified_at, modified_by, intern_string(field), old, new) for field, old, new in changes)
+	return rows
+
+class HistoryTable:
+	"""The change history of many items as a columnar table of field changes: one row per
+	field changed in a version, with `item_id`, `version`, `modified_at`, `modified_by`,
+	`field`, `old_value`, and `new_value` columns. Only the deltas are kept, never whole
+	snapshots, so a release worth of history for tens of thousands of items stays small.
+	Rows of one item are contiguous and in version order. Items whose history couldn't be
+	fetched are in `failed` rather than looking like items that never changed."""
+
+	def __init__(self):
+		self.item_id: IntColumn = IntColumn('item_id')
+		self.version: IntColumn = IntColumn('version')
+		self.modified_at: TimestampColumn = TimestampColumn('modified_at')
+		self.modified_by: CategoricalColumn = CategoricalColumn('modified_by')
+		self.field: CategoricalColumn = CategoricalColumn('field')
+		self.old_value: ObjectColumn = ObjectColumn('old_value')
+		self.new_value: ObjectColumn = ObjectColumn('new_value')
+		# item ID -> (first row, row count)
+		self._spans: dict[int, tuple[int, int]] = {}
+		# item ID -> why its history couldn't be fetched
+		self.failed: dict[int, BaseException] = {}
+		self.elapsed: float = 0.0
+
+	@property
+	def columns(self) -> dict[str, Any]:
+		"""The columns of the table by name."""
+		return {c.name: c for c in (self.item_id, self.version, self.modified_at, self.modified_by, self.field, self.old_value, self.new_value)}
+
+	def append_history(self, item_id: int, versions: list[dict[str, Any]], since: datetime | None = None):
+		"""Appends the history of an item. Entries with a `changes` list are taken as is;
+		entries that are whole item snapshots are diffed against the previous snapshot so only
+		the changed fields are kept.
+
+		Params:
+		item_id — The item the history is for. — int
+		versions — The entries of `items/{id}/history`, or item snapshots. — list[dict[str, Any]]
+		since — Drop versions modified before this. Naive datetimes are taken as UTC. — datetime(None)"""
+		self._extend(item_id, history_changes(versions, since))
+
+	def _extend(self, item_id: int, changes: list[tuple]):
+		start = len(self)
+		for version, modified_at, modified_by, field, old, new in changes:
+			self.item_id.append(item_id)
+			self.version.append(version)
+			self.modified_at.append(modified_at)
+			self.modified_by.append(modified_by)
+			self.field.append(field)
+			self.old_value.append(old)
+			self.new_value.append(new)
+		if len(self) > start:
+			self._spans[item_id] = (start, len(self) - start)
+
+	def raise_for_errors(self):
+		"""Raises the first error if the history of any item couldn't be fetched.
+
+		Raises:
+		Exception — The error of the first failed item."""
+		for error in self.failed.values():
+			raise error
+
+	def item_ids(self) -> list[int]:
+		"""The IDs of the items with at least one change."""
+		return list(self._spans)
+
+	def rows(self, item_id: int | None = None) -> Iterator[dict[str, Any]]:
+		"""Yields the changes as dicts, for one item or every item.
+
+		Params:
+		item_id — Only this item's changes. — int(None)"""
+		if item_id is None:
+			indexes = range(len(self))
+		else:
+			start, count = self._spans.get(item_id, (0, 0))
+			indexes = range(start, start + count)
+		modified_by, field = self.modified_by.categories, self.field.categories
+		for i in indexes:
+			yield {
+				'item_id': self.item_id.values[i],
+				'version': self.version.values[i],
+				'modified_at': self.modified_at._to_python(self.modified_at.values[i]) if self.modified_at.valid[i] else None,
+				'modified_by': modified_by[self.modified_by.codes[i]] if self.modified_by.codes[i] >= 0 else None,
+				'field': field[self.field.codes[i]] if self.field.codes[i] >= 0 else None,
+				'old_value': self.old_value.values[i],
+				'new_value': self.new_value.values[i],
+			}
+
+	def versions(self, item_id: int) -> list[int]:
+		"""The versions of an item that changed any field, oldest first.
+
+		Params:
+		item_id — The item. — int"""
+		start, count = self._spans.get(item_id, (0, 0))
+		return list(dict.fromkeys(self.version.values[start:start + count]))
+
+	def value_at(self, item_id: int, field: str, version: int) -> Any:
+		"""Rebuilds the value a field had at a version from the changes.
+
+		Params:
+		item_id — The item. — int
+		field — The field name. — str
+		version — The version. — int
+
+		Raises:
+		KeyError — The field never changed, so its value isn't in the history.
+
+		Returns:
+		Any — The value, as kept in the table."""
+		start, count = self._spans.get(item_id, (0, 0))
+		code = self.field._lookup.get(field)
+		value, found = None, False
+		for i in range(start, start + count):
+			if self.field.codes[i] != code:
+				continue
+			if self.version.values[i] <= version:
+				value, found = self.new_value.values[i], True
+			elif not found:
+				# The first change after the version still knows what the value was
+				return self.old_value.values[i]
+			else:
+				break
+		if not found:
+			raise KeyError(f'{field} of item {item_id} has no changes in the history')
+		return value
+
+	def changed(self, field: str | None = None, since: datetime | None = None) -> list[int]:
+		"""The IDs of the items with changes, optionally to one field or after a time.
+
+		Params:
+		field — Only changes to this field. — str(None)
+		since — Only changes made after this. Naive datetimes are taken as UTC. — datetime(None)"""
+		code = None if field is None else self.field._lookup.get(field, -2)
+		after = None if since is None else self.modified_at._convert(since)
+		found: dict[int, None] = {}
+		for i in range(len(self)):
+			if code is not None and self.field.codes[i] != code:
+				continue
+			if after is not None and (not self.modified_at.valid[i] or self.modified_at.values[i] < after):
+				continue
+			found[self.item_id.values[i]] = None
+		return list(found)
+
+	def to_pydict(self) -> dict[str, list[Any]]:
+		"""Converts the table to a dict of python lists."""
+		return {name: column.to_list() for name, column in self.columns.items()}
+
+	def to_arrow(self):
+		"""Converts the table to a `pyarrow.Table`. Requires pyarrow."""
+		pa = _require('pyarrow')
+		return pa.table({name: column.to_arrow() for name, column in self.columns.items()})
+
+	def __len__(self) -> int:
+		return len(self.item_id)
+
+	def __repr__(self) -> str:
+		return f'HistoryTable(items={len(self._spans)}, changes={len(self)}, failed={len(self.failed)})'
+
+def fetch_history(
+	client: RestClient,
+	items: Iterable[int | TrackerItem],
+	since: datetime | None = None,
+	workers: int = 8
+) -> HistoryTable:
+	"""Fetches `items/{id}/history` for many items concurrently into a `HistoryTable`. Each
+	response is reduced to its field changes as soon as it arrives, in item order. An item
+	whose history can't be fetched, e.g. one that was deleted or isn't visible, is recorded in
+	`HistoryTable.failed` and the others carry on.
+
+	Params:
+	client — The client to fetch with. — `RestClient`
+	items — The items or their IDs. — Iterable[int | `TrackerItem`]
+	since — Drop versions modified before this. Naive datetimes are taken as UTC. — datetime(None)
+	workers — The number of concurrent requests. — int(8)
+
+	Returns:
+	`HistoryTable` — The changes of every item."""
+	ids = list(dict.fromkeys(i.id if isinstance(i, TrackerItem) else int(i) for i in items))
+	table = HistoryTable()
+
+	def fetch(item_id: int) -> list[tuple] | Exception:
+		try:
+			data = client.request('GET', f'items/{item_id}/history', raise_for_status=True)
+			versions = data.get('versions') if isinstance(data, dict) else data
+			# Reduced on the worker so only the changes wait to be appended, not the payloads
+			return history_changes(versions or [], since=since)
+		except Exception as e:
+			logger.debug(f'Fetching the history of item {item_id} failed: {e}')
+			return e
+
+	start = perf_counter()
+	with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+		# map yields in order, so rows of one item stay together
+		for item_id, changes in zip(ids, executor.map(fetch, ids)):
+			if isinstance(changes, Exception):
+				table.failed[item_id] = changes
+			else:
+				table._extend(item_id, changes)
+	if table.failed:
+		logger.warning(f'The history of {len(table.failed)} of {len(ids)} items couldn\'t be fetched')
+	table.elapsed = perf_counter() - start
+	logger.debug(f'History of {len(ids)} items: {len(table)} changes in {table.elapsed:.2f}s')
+	return table
@@ -0,0 +1,418 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Mapping
+
+import csv
+import json
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from threading import BoundedSemaphore, Lock
+from time import perf_counter
+
+from .bulk import BulkReport
+from .fields import FieldDefinition
+from .utils import logger
+
+if TYPE_CHECKING:
+	from .tracker import Tracker
+
+# Import targets that are plain properties of the item JSON rather than tracker fields
+ITEM_PROPERTIES = ('name', 'description', 'descriptionFormat')
+# Marks a parent as the ID of an existing item rather than the key of a row, e.g. '#1234'
+EXISTING_ITEM_PREFIX = '#'
+
+_TRUE = frozenset(('true', 'yes', 'y', '1'))
+_FALSE = frozenset(('false', 'no', 'n', '0'))
+
+class RowError(ValueError):
+	"""Raised when a row can't be turned into an item, before anything is sent."""
+
+	def __init__(self, key: str, message: str):
+		super().__init__(f'row {key}: {message}')
+		self.key: str = key
+
+def read_rows(source: str | os.PathLike, encoding: str = 'utf-8-sig') -> Iterator[dict[str, Any]]:
+	"""Streams the rows of a CSV or JSON Lines file, one dict per row, picked by the file's
+	suffix: `.csv` or `.jsonl`/`.ndjson`.
+
+	Params:
+	source — The file. — str | PathLike
+	encoding — The text encoding. The default drops a leading byte order mark. — str('utf-8-sig')
+
+	Raises:
+	ValueError — The suffix isn't one of those.
+
+	Returns:
+	Iterator[dict[str, Any]] — The rows."""
+	path = Path(source)
+	suffix = path.suffix.lower()
+	if suffix == '.csv':
+		with open(path, newline='', encoding=encoding) as file:
+			yield from csv.DictReader(file)
+	elif suffix in ('.jsonl', '.ndjson'):
+		with open(path, encoding=encoding) as file:
+			for line in file:
+				if line.strip():
+					yield json.loads(line)
+	else:
+		raise ValueError(f'expected a .csv or .jsonl file, got {path.name}')
+
+class ImportCheckpoint:
+	"""An append-only log of an import, one JSON line per event, so an interrupted import can
+	carry on where it stopped. A row is logged as sent before its item is created and with the
+	new item's ID once it is; a row that was sent but never logged as created may or may not
+	have made an item, and is left for the caller to check.
+
+	Params:
+	path — The log file. It's created if it doesn't exist. — str | PathLike"""
+
+	def __init__(self, path: str | os.PathLike):
+		self.path: Path = Path(path)
+		self.created: dict[str, int] = {}
+		self.uncertain: set[str] = set()
+		self._lock: Lock = Lock()
+		self._file = None
+		if self.path.exists():
+			self._read()
+
+	def _read(self):
+		sent: set[str] = set()
+		with open(self.path, encoding='utf-8') as file:
+			for line in file:
+				try:
+					entry = json.loads(line)
+				except ValueError:
+					# The last line of a killed import can be cut short
+					continue
+				key = str(entry['key'])
+				if 'id' in entry:
+					self.created[key] = entry['id']
+				else:
+					sent.add(key)
+		self.uncertain = sent - self.created.keys()
+
+	def _write(self, entry: dict[str, Any]):
+		with self._lock:
+			if self._file is None:
+				self._file = open(self.path, 'a', encoding='utf-8')
+			self._file.write(json.dumps(entry) + '\n')
+			self._file.flush()
+
+	def mark_sent(self, key: str):
+		"""Logs that a row's item is about to be created."""
+		self._write({'key': key})
+
+	def mark_created(self, key: str, item_id: int):
+		"""Logs the item created for a row."""
+		self._write({'key': key, 'id': item_id})
+		self.created[key] = item_id
+
+	def close(self):
+		with self._lock:
+			if self._file is not None:
+				self._file.close()
+				self._file = None
+
+	def __repr__(self) -> str:
+		return f'ImportCheckpoint(path={self.path}, created={len(self.created)}, uncertain={len(self.uncertain)})'
+
+class ImportReport(BulkReport):
+	"""The outcome of an import, keyed by row key. Rows that failed validation are in
+	`invalid` and were never sent; `failed` holds rows codeBeamer rejected.
+
+	Params:
+	operation — 'import', or 'validate' for a dry run. — str"""
+
+	def __init__(self, operation: str = 'import'):
+		super().__init__(operation)
+		self.created: dict[str, int] = {}
+		self.invalid: dict[str, RowError] = {}
+		self.skipped: list[str] = []
+		self.uncertain: list[str] = []
+
+	def __repr__(self) -> str:
+		return (
+			f'ImportReport(operation={self.operation}, created={len(self.created)}, failed={len(self.failed)}, '
+			f'invalid={len(self.invalid)}, skipped={len(self.skipped)}, uncertain={len(self.uncertain)}, '
+			f'rate={self.rate:.1f}/s)'
+		)
+
+class _Target:
+	"""Where one column goes in the item JSON and how its text is converted."""
+
+	def __init__(self, column: str, name: str, field: FieldDefinition | None = None):
+		self.column: str = column
+		self.name: str = name
+		self.field: FieldDefinition | None = field
+		self.property: str | None = name if field is None else field.tracker_item_field
+		self.value_model: str = '' if field is None else (field.value_model or '')
+		self.multiple: bool = bool(field is not None and field.multiple_values)
+		self.choices: dict[str, Any] = {}
+		if 'ChoiceFieldValue' in self.value_model:
+			if not field.options:
+				raise ValueError(f'{name} has no options to choose from, it can\'t be imported')
+			self.choices = {c.name: c for c in field.options}
+
+	def convert(self, value: Any) -> Any:
+		if 'ChoiceFieldValue' in self.value_model:
+			names = value if isinstance(value, list) else [v.strip() for v in str(value).split(';')] if self.multiple else [str(value).strip()]
+			missing = [n for n in names if n not in self.choices]
+			if missing:
+				raise ValueError(f'{self.name} has no option {", ".join(map(repr, missing))}')
+			return [self.choices[n].json for n in names]
+		if 'IntegerFieldValue' in self.value_model:
+			return int(value)
+		if 'DecimalFieldValue' in self.value_model:
+			return float(value)
+		if 'BoolFieldValue' in self.value_model:
+			text = str(value).strip().lower()
+			if text not in _TRUE | _FALSE:
+				raise ValueError(f'{self.name} expects true or false, got {value!r}')
+			return text in _TRUE
+		if 'DateFieldValue' in self.value_model:
+			date = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).strip())
+			return date.strftime('%Y-%m-%dT%H:%M:%S.%f')
+		return value if isinstance(value, str) else str(value)
+
+class ItemImporter:
+	"""Creates tracker items from a stream of rows, e.g. from `read_rows`. The tracker's field
+	definitions are resolved once up front, each row is checked and converted locally before
+	anything is sent, and items are created `workers` at a time with only a couple of rows
+	per worker read ahead, so memory grows with the row keys rather than the rows.
+
+	With a `checkpoint` file the import can be stopped and run again: rows whose item was
+	already created are skipped, so nothing is created twice. Rows are identified by the `key`
+	column, or by their position when there isn't one, in which case the rows must come in the
+	same order every run.
+
+	A parent is the key of a row read earlier in the same import, or `#` followed by the ID of
+	an item that already exists, e.g. `#1234`. A row whose parent row failed, was left uncertain
+	by an earlier run, or hasn't been read yet fails too, rather than guessing at an item ID.
+
+	Params:
+	tracker — The tracker to create the items in. — `Tracker`
+	columns — Column name -> field name, or 'name', 'description', 'descriptionFormat'. If None each column is named after its field, including columns only some rows have. — Mapping[str, str](None)
+	key — The column that identifies a row, e.g. an external ID. — str(None)
+	parent — The column holding the parent: the key of an earlier row, or `#` and the ID of an existing item. — str(None)
+	workers — The number of concurrent creates. — int(8)
+	checkpoint — The checkpoint file to resume from and log to. — str | PathLike(None)
+
+	Raises:
+	ValueError — A column maps to a field the tracker doesn't have, or to a choice field without options."""
+
+	def __init__(
+		self,
+		tracker: Tracker,
+		columns: Mapping[str, str] | None = None,
+		key: str | None = None,
+		parent: str | None = None,
+		workers: int = 8,
+		checkpoint: str | os.PathLike | None = None
+	):
+		self.tracker: Tracker = tracker
+		self.key: str | None = key
+		self.parent: str | None = parent
+		self.workers: int = max(1, workers)
+		self.checkpoint: ImportCheckpoint | None = ImportCheckpoint(checkpoint) if checkpoint is not None else None
+		self._columns: Mapping[str, str] | None = columns
+		self._targets: list[_Target] | None = None
+		# The columns of the rows seen so far, when they're mapped by name
+		self._resolved: set[str] = set()
+		self._fields: dict[str, FieldDefinition] | None = None
+
+	def _resolve(self, columns: Iterable[str]):
+		# GET trackers/{trackerId}/fields, once
+		if self._fields is None:
+			self._fields = {f.name: f for f in self.tracker.get_fields()}
+		if self._columns is not None:
+			mapping = self._columns
+		else:
+			# Rows needn't have the same keys, e.g. JSON Lines with optional keys, so a column is 
+			# resolved the first time a row has it
+			columns = set(columns)
+			mapping = {c: c for c in columns - self._resolved if c not in (self.key, self.parent)}
+		unknown = [n for n in mapping.values() if n not in ITEM_PROPERTIES and n not in self._fields]
+		if unknown:
+			raise ValueError(f'{self.tracker.name} has no field {", ".join(map(repr, unknown))}')
+		self._targets = (self._targets or []) + [
+			_Target(column, name, None if name in ITEM_PROPERTIES else self._fields[name])
+			for column, name in mapping.items()
+		]
+		if self._columns is None:
+			self._resolved |= columns
+
+	def row_key(self, row: Mapping[str, Any], position: int) -> str:
+		"""The key of a row: its `key` column, or its position counting from 1."""
+		if self.key is None:
+			return str(position)
+		value = row.get(self.key)
+		if value in (None, ''):
+			raise RowError(str(position), f'the key column {self.key!r} is empty')
+		return str(value)
+
+	def item_json(self, row: Mapping[str, Any], key: str = '?') -> dict[str, Any]:
+		"""Checks and converts a row to the JSON to create its item, without sending anything.
+
+		Params:
+		row — The row. — Mapping[str, Any]
+		key — The row's key, for error messages. — str('?')
+
+		Raises:
+		RowError — The row is missing a name or has a value its field doesn't accept.
+		ValueError — A column first seen in this row maps to a field the tracker doesn't have.
+
+		Returns:
+		dict[str, Any] — The item JSON."""
+		if self._targets is None or (self._columns is None and not self._resolved.issuperset(row.keys())):
+			self._resolve(row.keys())
+		data: dict[str, Any] = {'description': '--', 'descriptionFormat': 'PlainText'}
+		custom: list[dict[str, Any]] = []
+		for target in self._targets:
+			value = row.get(target.column)
+			if value is None or value == '':
+				continue
+			try:
+				converted = target.convert(value)
+			except ValueError as e:
+				raise RowError(key, str(e)) from None
+			if target.property:
+				is_list = isinstance(converted, list) and not target.multiple
+				data[target.property] = converted[0] if is_list else converted
+			elif isinstance(converted, list):
+				custom.append({'fieldId': target.field.id, 'name': target.name, 'type': 'ChoiceFieldValue', 'values': converted})
+			else:
+				custom.append({'fieldId': target.field.id, 'name': target.name, 'type': target.value_model, 'value': converted})
+		if not data.get('name'):
+			raise RowError(key, 'the item has no name')
+		if custom:
+			data['customFields'] = custom
+		return data
+
+	def run(
+		self,
+		rows: Iterable[Mapping[str, Any]] | str | os.PathLike,
+		dry_run: bool = False,
+		retry_uncertain: bool = False,
+		progress: Callable[[ImportReport], None] | None = None,
+		progress_every: int = 500
+	) -> ImportReport:
+		"""Imports the rows. Rows that fail validation are reported and skipped, the rest of the
+		import carries on.
+
+		Params:
+		rows — The rows, or a CSV or JSON Lines file to stream them from. — Iterable[Mapping[str, Any]] | str | PathLike
+		dry_run — Only validate the rows, nothing is sent. — bool(False)
+		retry_uncertain — Create the rows the checkpoint can't vouch for instead of skipping them. They may end up twice. — bool(False)
+		progress — Called with the report every `progress_every` rows. — Callable[[`ImportReport`], None](None)
+		progress_every — How many rows between progress calls. — int(500)
+
+		Raises:
+		ValueError — A column maps to a field the tracker doesn't have. Columns only some rows have are checked when they first appear, which can stop an import partway, the checkpoint keeps the rows already created.
+
+		Returns:
+		`ImportReport` — The items created, keyed by row key."""
+		if isinstance(rows, (str, os.PathLike)):
+			rows = read_rows(rows)
+		report = ImportReport('validate' if dry_run else 'import')
+		done: dict[str, int] = dict(self.checkpoint.created) if self.checkpoint else {}
+		uncertain: set[str] = set() if self.checkpoint is None or retry_uncertain else self.checkpoint.uncertain
+		# Rows being created, so their children can wait for them
+		pending: dict[str, Future] = {}
+		slots = BoundedSemaphore(self.workers * 2)
+		start = perf_counter()
+
+		def report_progress(total: int):
+			if progress is not None and total % progress_every == 0:
+				report.elapsed = perf_counter() - start
+				progress(report)
+
+		def create(key: str, data: dict[str, Any], parent: Any) -> int | None:
+			try:
+				params = {}
+				if parent is not None:
+					params['parentItemId'] = self._parent_id(key, parent, done, pending, uncertain, report)
+				if self.checkpoint is not None:
+					self.checkpoint.mark_sent(key)
+				# POST trackers/{trackerId}/items
+				item = self.tracker._client.request(
+					'POST', f'trackers/{self.tracker.id}/items', json_=data, params=params or None, raise_for_status=True
+				)
+				item_id = item['id']
+				if self.checkpoint is not None:
+					self.checkpoint.mark_created(key, item_id)
+				done[key] = item_id
+				with report._lock:
+					report.created[key] = item_id
+				report_progress(report._record([key]))
+				return item_id
+			except Exception as e:
+				logger.debug(f'Importing row {key} failed: {e}')
+				report_progress(report._record([key], e))
+				return None
+			finally:
+				slots.release()
+
+		try:
+			with ThreadPoolExecutor(max_workers=self.workers) as executor:
+				for position, row in enumerate(rows, 1):
+					try:
+						key = self.row_key(row, position)
+						if key in done:
+							report.skipped.append(key)
+							continue
+						if key in uncertain:
+							report.uncertain.append(key)
+							continue
+						data = self.item_json(row, key)
+					except RowError as e:
+						report.invalid[e.key] = e
+						continue
+					if dry_run:
+						report._record([key])
+						continue
+					slots.acquire()
+					parent = row.get(self.parent) if self.parent else None
+					future = pending[key] = executor.submit(create, key, data, parent if parent not in (None, '') else None)
+					future.add_done_callback(lambda _, key=key: pending.pop(key, None))
+		finally:
+			if self.checkpoint is not None:
+				self.checkpoint.close()
+		report.elapsed = perf_counter() - start
+		if report.uncertain:
+			logger.warning(
+				f'{len(report.uncertain)} rows were sent before the import stopped but never confirmed, check them '
+				'in codeBeamer or run again with retry_uncertain=True'
+			)
+		logger.debug(repr(report))
+		return report
+
+	@staticmethod
+	def _parent_id(
+		key: str,
+		parent: Any,
+		done: dict[str, int],
+		pending: dict[str, Future],
+		uncertain: set[str],
+		report: ImportReport
+	) -> int:
+		parent = str(parent)
+		if parent.startswith(EXISTING_ITEM_PREFIX):
+			try:
+				return int(parent[len(EXISTING_ITEM_PREFIX):])
+			except ValueError:
+				raise RowError(key, f'the parent {parent!r} isn\'t an item ID') from None
+		future = pending.get(parent)
+		# Submitted earlier, so it's already running or finished
+		parent_id = future.result() if future is not None else done.get(parent)
+		if parent_id is not None:
+			return parent_id
+		if parent in uncertain:
+			raise RowError(key, f'the parent row {parent!r} was sent by an earlier run but never confirmed')
+		if future is not None or parent in report.failed or parent in report.invalid:
+			raise RowError(key, f'the parent row {parent!r} wasn\'t created')
+		hint = f', use {EXISTING_ITEM_PREFIX}{parent} for an existing item' if parent.isdigit() else ''
+		raise RowError(key, f'no earlier row has the key {parent!r}{hint}')
+
+	def __repr__(self) -> str:
+		return f'ItemImporter(tracker={self.tracker.id}, workers={self.workers})'
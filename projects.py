@@ -1,13 +1,13 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING, Any
 
-from loguru import logger
 from datetime import datetime
+from threading import RLock
 
 from .rest_client import RestClient
 from .user import User
 from .tracker import Tracker
-from .utils import loadable
+from .utils import loadable, locked, logger
 
 class Project:
 	"""Represents a project in codeBeamer."""
@@ -29,6 +29,13 @@ class Project:
 		_loaded: bool
 
 	def __init__(self, id: int, name: str, **kwargs):
+		# Initial setup of the object
+		prop_defaults = {k: None for k in self.__class__.__annotations__}
+		self.__dict__.update(prop_defaults)
+		self._trackers = list()
+		self._loaded = False
+		self._lock = RLock()
+
 		self._id: int = id
 		self._name: str = name
 		self._client: RestClient = kwargs.get('client')
@@ -36,11 +43,6 @@ class Project:
 		if not kwargs.get('type'):
 			# if type is present then no other information is present
 			self._load(kwargs)
-		else:
-			prop_defaults = {k: None for k in self.__class__.__annotations__}
-			self.__dict__.update(prop_defaults)
-			self._trackers = list()
-			self._loaded = False
 
 	@property
 	def id(self) -> int:
@@ -124,6 +126,7 @@ class Project:
 		"""The user that last modified the project."""
 		return self._modified_by
 
+	@locked
 	def _load(self, data: dict[str, Any] = None):
 		"""Loads the rest of the project's data. When a project is fetched using 
 		`Codebeamer.get_projects` only the ID and Name of the project are retrieved. 
@@ -169,8 +172,9 @@ class Project:
 		
 		Returns:
 		`Tracker` — The tracker if it exists under the project."""
-		if not self._trackers:
-			self._trackers = self.get_trackers()
+		with self._lock:
+			if not self._trackers:
+				self._trackers = self.get_trackers()
 		if isinstance(tracker, int):
 			trackers = {t.id: t for t in self._trackers}
 		elif isinstance(tracker, str):
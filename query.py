@@ -0,0 +1,330 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable, Iterable
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+if TYPE_CHECKING:
+	from .tracker_item import TrackerItem
+
+class ItemIndex:
+	"""An in-memory query engine over a set of already loaded tracker items. Secondary
+	indexes are built once for status, assignee, type name, modified datetime, and any
+	requested custom fields so repeated filters, sorts, and groupings never go back to
+	codeBeamer."""
+
+	def __init__(self, items: Iterable[TrackerItem], custom_fields: Iterable[str] | None = None):
+		self._items: list[TrackerItem] = []
+		self._custom_field_names: list[str] = list(custom_fields or [])
+		self._by_id: dict[int, int] = {}
+		self._by_status: dict[Any, set[int]] = {}
+		self._by_assignee: dict[Any, set[int]] = {}
+		self._by_type: dict[Any, set[int]] = {}
+		self._by_field: dict[str, dict[Any, set[int]]] = {f: {} for f in self._custom_field_names}
+		# Position -> the (index, keys) it was indexed under, so removing only touches those sets
+		self._indexed: dict[int, list[tuple[dict[Any, set[int]], list[Any]]]] = {}
+		# Sorted (modified_at, position) pairs for range queries. Removed positions are dropped 
+		# the next time the pairs are sorted
+		self._modified_keys: list[datetime] = []
+		self._modified_positions: list[int] = []
+		self._modified_dirty: bool = False
+		for item in items:
+			self.add(item)
+
+	@property
+	def items(self) -> list[TrackerItem]:
+		"""All the items in the index in the order they were added."""
+		return self._live_items()
+
+	@property
+	def custom_fields(self) -> list[str]:
+		"""The names of the custom fields that are indexed."""
+		return list(self._custom_field_names)
+
+	def add(self, item: TrackerItem):
+		"""Adds an item to the index. Adding an item that is already indexed replaces it.
+
+		Params:
+		item — The item to index. — `TrackerItem`"""
+		if item.id in self._by_id:
+			self.remove(item)
+		position = len(self._items)
+		self._items.append(item)
+		self._by_id[item.id] = position
+		status = item.status
+		indexed = self._indexed[position] = [
+			(self._by_status, self._keys(status.value if status is not None else None)),
+			(self._by_assignee, self._keys(item.assigned_to, with_ids=True)),
+			(self._by_type, self._keys(item.type_name)),
+		]
+		for name in self._custom_field_names:
+			indexed.append((self._by_field[name], self._keys(self._custom_field_value(item, name))))
+		for index, keys in indexed:
+			self._index(index, keys, position)
+		if item.modified_at is not None:
+			self._modified_keys.append(item.modified_at)
+			self._modified_positions.append(position)
+			self._modified_dirty = True
+
+	def remove(self, item: TrackerItem | int):
+		"""Removes an item from the index.
+
+		Params:
+		item — The item or ID of the item to remove. — `TrackerItem` | int"""
+		item_id = item if isinstance(item, int) else item.id
+		position = self._by_id.pop(item_id, None)
+		if position is None:
+			return
+		for index, keys in self._indexed.pop(position):
+			for key in keys:
+				positions = index.get(key)
+				if positions is not None:
+					positions.discard(position)
+					if not positions:
+						del index[key]
+		# Positions stay stable so the slot is left empty instead of shifting the list
+		self._items[position] = None
+		self._modified_dirty = True
+
+	def get(self, id: int) -> TrackerItem | None:
+		"""Fetches an indexed item by ID.
+
+		Params:
+		id — The ID of the item. — int
+
+		Returns:
+		`TrackerItem` — The item if it is in the index."""
+		position = self._by_id.get(id)
+		return self._items[position] if position is not None else None
+
+	def filter(
+		self,
+		status: Any = None,
+		assignee: Any = None,
+		type_name: Any = None,
+		modified_after: datetime | None = None,
+		modified_before: datetime | None = None,
+		fields: dict[str, Any] | None = None,
+		where: Callable[[TrackerItem], bool] | None = None,
+		order_by: str | None = None,
+		reverse: bool = False,
+	) -> list[TrackerItem]:
+		"""Filters the indexed items. Every criterion accepts a single value or a list/set/tuple
+		of values, in which case an item matches if it has any of them. Criteria are combined
+		with AND.
+
+		Params:
+		status — The status name(s) to match. — Any(None)
+		assignee — The assigned user name(s) or ID(s) to match. — Any(None)
+		type_name — The item type name(s) to match. — Any(None)
+		modified_after — Only items modified at or after this datetime. — datetime(None)
+		modified_before — Only items modified at or before this datetime. — datetime(None)
+		fields — Custom field name to value(s) to match. The fields must be indexed. — dict[str, Any](None)
+		where — An extra predicate applied after the indexed criteria. — Callable(None)
+		order_by — An attribute or custom field name to sort the result by. — str(None)
+		reverse — Whether to sort in descending order. — bool(False)
+
+		Raises:
+		KeyError — A custom field that isn't indexed was used in `fields`.
+
+		Returns:
+		list[`TrackerItem`] — The matching items."""
+		candidates: list[set[int]] = []
+		if status is not None:
+			candidates.append(self._lookup(self._by_status, status))
+		if assignee is not None:
+			candidates.append(self._lookup(self._by_assignee, assignee))
+		if type_name is not None:
+			candidates.append(self._lookup(self._by_type, type_name))
+		if modified_after is not None or modified_before is not None:
+			candidates.append(self._modified_range(modified_after, modified_before))
+		for name, value in (fields or {}).items():
+			if name not in self._by_field:
+				raise KeyError(f'custom field {name!r} is not indexed')
+			candidates.append(self._lookup(self._by_field[name], value))
+		if candidates:
+			# Intersect starting with the smallest set to keep the work minimal
+			candidates.sort(key=len)
+			positions = set(candidates[0])
+			for other in candidates[1:]:
+				positions &= other
+				if not positions:
+					break
+		else:
+			positions = set(self._by_id.values())
+		result = [self._items[p] for p in sorted(positions)]
+		if where is not None:
+			result = [item for item in result if where(item)]
+		if order_by is not None:
+			result = self.sort(result, order_by, reverse=reverse)
+		return result
+
+	def sort(self, items: Iterable[TrackerItem] | None = None, key: str = 'id', reverse: bool = False) -> list[TrackerItem]:
+		"""Sorts items by an attribute or custom field. Items without a value always sort last.
+
+		Params:
+		items — The items to sort. If None then all indexed items are sorted. — Iterable[`TrackerItem`](None)
+		key — An attribute (id, name, status, type_name, modified_at, ...) or custom field name. — str('id')
+		reverse — Whether to sort in descending order. — bool(False)
+
+		Returns:
+		list[`TrackerItem`] — The sorted items."""
+		if items is None:
+			items = self._live_items()
+		keyed = [(self._sort_key(self.value_of(item, key)), item) for item in items]
+		present = [ki for ki in keyed if ki[0] is not None]
+		missing = [item for k, item in keyed if k is None]
+		present.sort(key=lambda ki: ki[0], reverse=reverse)
+		return [item for _, item in present] + missing
+
+	def group_by(self, key: str, items: Iterable[TrackerItem] | None = None) -> dict[Any, list[TrackerItem]]:
+		"""Groups items by status, assignee, type_name, or an indexed custom field. Items with
+		multiple values (e.g. several assignees) appear in each of their groups.
+
+		Params:
+		key — What to group by. — str
+		items — The items to group. If None then all indexed items are grouped. — Iterable[`TrackerItem`](None)
+
+		Raises:
+		KeyError — The key isn't an indexed attribute or custom field.
+
+		Returns:
+		dict[Any, list[`TrackerItem`]] — The items for each value."""
+		key = 'assignee' if key == 'assigned_to' else key
+		index = self._index_for(key)
+		allowed = None if items is None else {self._by_id[i.id] for i in items if i.id in self._by_id}
+		groups: dict[Any, list[TrackerItem]] = {}
+		for value, positions in index.items():
+			if key == 'assignee' and not isinstance(value, str) and value is not None:
+				# Assignees are indexed by both ID and name, only group by name
+				continue
+			if allowed is not None:
+				positions = positions & allowed
+			if positions:
+				groups[value] = [self._items[p] for p in sorted(positions)]
+		return groups
+
+	def count_by(self, key: str) -> dict[Any, int]:
+		"""Counts the indexed items for each value of status, assignee, type_name, or an indexed
+		custom field without building any item lists.
+
+		Params:
+		key — What to count by. — str
+
+		Returns:
+		dict[Any, int] — The number of items for each value."""
+		key = 'assignee' if key == 'assigned_to' else key
+		index = self._index_for(key)
+		return {
+			value: len(positions) for value, positions in index.items()
+			if positions and not (key == 'assignee' and value is not None and not isinstance(value, str))
+		}
+
+	def value_of(self, item: TrackerItem, key: str) -> Any:
+		"""Gets the comparable value of an attribute or custom field on an item.
+
+		Params:
+		item — The item to get the value from. — `TrackerItem`
+		key — The attribute or custom field name. — str
+
+		Returns:
+		Any — The value, reduced to a name for choice and user references."""
+		if key in self._by_field:
+			value = self._custom_field_value(item, key)
+		elif key == 'status':
+			value = item.status.value if item.status is not None else None
+		elif key == 'assignee':
+			value = item.assigned_to
+		else:
+			value = getattr(item, key)
+		keys = self._keys(value)
+		if not keys or keys == [None]:
+			return None
+		return keys[0] if len(keys) == 1 else tuple(keys)
+
+	def _index_for(self, key: str) -> dict[Any, set[int]]:
+		if key == 'status':
+			return self._by_status
+		if key in ('assignee', 'assigned_to'):
+			return self._by_assignee
+		if key == 'type_name':
+			return self._by_type
+		if key in self._by_field:
+			return self._by_field[key]
+		raise KeyError(f'{key!r} is not indexed')
+
+	def _live_items(self) -> list[TrackerItem]:
+		return [self._items[p] for p in sorted(self._by_id.values())]
+
+	def _modified_range(self, start: datetime | None, end: datetime | None) -> set[int]:
+		if self._modified_dirty:
+			items = self._items
+			pairs = sorted(
+				((k, p) for k, p in zip(self._modified_keys, self._modified_positions) if items[p] is not None),
+				key=lambda kp: kp[0]
+			)
+			self._modified_keys = [k for k, _ in pairs]
+			self._modified_positions = [p for _, p in pairs]
+			self._modified_dirty = False
+		lo = bisect_left(self._modified_keys, start) if start is not None else 0
+		hi = bisect_right(self._modified_keys, end) if end is not None else len(self._modified_keys)
+		return set(self._modified_positions[lo:hi])
+
+	@staticmethod
+	def _index(index: dict[Any, set[int]], keys: list[Any], position: int):
+		for key in keys:
+			index.setdefault(key, set()).add(position)
+
+	@staticmethod
+	def _lookup(index: dict[Any, set[int]], value: Any) -> set[int]:
+		if isinstance(value, (list, tuple, set, frozenset)):
+			result: set[int] = set()
+			for v in value:
+				result |= index.get(v, set())
+			return result
+		return index.get(value, set())
+
+	@staticmethod
+	def _custom_field_value(item: TrackerItem, name: str) -> Any:
+		for field in item.custom_fields or []:
+			if field.name == name:
+				return field.value
+		return None
+
+	@staticmethod
+	def _keys(value: Any, with_ids: bool = False) -> list[Any]:
+		"""Reduces a value to the hashable keys it is indexed under."""
+		if value is None:
+			return [None]
+		if isinstance(value, (list, tuple, set)):
+			keys = [k for v in value for k in ItemIndex._keys(v, with_ids) if k is not None]
+			return keys or [None]
+		if hasattr(value, 'name') and hasattr(value, 'id'):
+			return [value.name, value.id] if with_ids else [value.name]
+		if isinstance(value, dict):
+			keys = [value.get('name')]
+			if with_ids and value.get('id') is not None:
+				keys.append(value.get('id'))
+			return keys
+		return [value]
+
+	@staticmethod
+	def _sort_key(value: Any) -> Any:
+		if value is None:
+			return None
+		if isinstance(value, tuple):
+			return tuple(str(v) for v in value)
+		return value
+
+	def __len__(self) -> int:
+		return len(self._by_id)
+
+	def __iter__(self):
+		return iter(self._live_items())
+
+	def __contains__(self, o: object) -> bool:
+		item_id = o if isinstance(o, int) else getattr(o, 'id', None)
+		return item_id in self._by_id
+
+	def __repr__(self) -> str:
+		return f'ItemIndex(items={len(self)}, custom_fields={self._custom_field_names})'
@@ -0,0 +1,118 @@
+from __future__ import annotations
+from typing import Any, Callable, Iterable
+
+def _ref_id(value: Any) -> int | None:
+	return value.get('id') if isinstance(value, dict) else None
+
+def _ref_name(value: Any) -> str | None:
+	return value.get('name') if isinstance(value, dict) else value
+
+def _ref_names(values: Any) -> str | None:
+	if not values:
+		return None
+	return ', '.join(str(_ref_name(v)) for v in values)
+
+def _key(key: str) -> Callable[[dict[str, Any]], Any]:
+	return lambda data: data.get(key)
+
+# Field name -> extractor for the system fields of a raw item payload
+SYSTEM_FIELDS: dict[str, Callable[[dict[str, Any]], Any]] = {
+	'id': _key('id'),
+	'name': _key('name'),
+	'description': _key('description'),
+	'description_format': _key('descriptionFormat'),
+	'version': _key('version'),
+	'ordinal': _key('ordinal'),
+	'story_points': _key('storyPoints'),
+	'type_name': _key('typeName'),
+	'status': lambda d: _ref_name(d.get('status')),
+	'status_id': lambda d: _ref_id(d.get('status')),
+	'priority': lambda d: _ref_name(d.get('priority')),
+	'priority_id': lambda d: _ref_id(d.get('priority')),
+	'tracker_id': lambda d: _ref_id(d.get('tracker')),
+	'parent_id': lambda d: _ref_id(d.get('parent')),
+	'created_at': _key('createdAt'),
+	'modified_at': _key('modifiedAt'),
+	'closed_at': _key('closedAt'),
+	'start_date': _key('startDate'),
+	'end_date': _key('endDate'),
+	'created_by': lambda d: _ref_name(d.get('createdBy')),
+	'modified_by': lambda d: _ref_name(d.get('modifiedBy')),
+	'assigned_to': lambda d: _ref_names(d.get('assignedTo')),
+	'owners': lambda d: _ref_names(d.get('owners')),
+	'categories': lambda d: _ref_names(d.get('categories')),
+	'subjects': lambda d: _ref_names(d.get('subjects')),
+	'teams': lambda d: _ref_names(d.get('teams')),
+}
+
+# The fields present in item references (GET /trackers/{trackerId}/items, GET /items/{itemId}/children)
+REFERENCE_FIELDS = ('id', 'name')
+
+def custom_field_value(field: dict[str, Any]) -> Any:
+	"""Reduces a raw custom field payload to a plain value. Choice fields become their
+	comma separated choice names."""
+	if 'values' in field:
+		return _ref_names(field.get('values'))
+	return field.get('value')
+
+class Projection:
+	"""Extracts a fixed set of fields straight from raw item payloads. System fields are named
+	by their snake_case `TrackerItem` attribute name (e.g. `modified_at`), anything else is
+	treated as the name of a custom field. Timestamps are left as the ISO strings codeBeamer
+	returns."""
+
+	def __init__(self, fields: Iterable[str] | None = None):
+		self._fields: tuple[str, ...] = tuple(fields or REFERENCE_FIELDS)
+		self._extractors: list[Callable[[dict[str, Any]], Any] | None] = [SYSTEM_FIELDS.get(f) for f in self._fields]
+		self._has_custom: bool = any(e is None for e in self._extractors)
+
+	@property
+	def fields(self) -> tuple[str, ...]:
+		"""The names of the projected fields in order."""
+		return self._fields
+
+	@property
+	def needs_full_items(self) -> bool:
+		"""Whether any field is only present in full item payloads rather than item references."""
+		return any(f not in REFERENCE_FIELDS for f in self._fields)
+
+	def as_tuple(self, item: dict[str, Any]) -> tuple[Any, ...]:
+		"""Projects a raw item payload to a tuple in field order.
+
+		Params:
+		item — The item JSON as returned by codeBeamer. — dict[str, Any]
+
+		Returns:
+		tuple — The values of the projected fields."""
+		if self._has_custom:
+			custom = {f.get('name'): f for f in item.get('customFields') or ()}
+			return tuple(
+				e(item) if e is not None else (custom_field_value(custom[f]) if f in custom else None)
+				for f, e in zip(self._fields, self._extractors)
+			)
+		return tuple(e(item) for e in self._extractors)
+
+	def as_dict(self, item: dict[str, Any]) -> dict[str, Any]:
+		"""Projects a raw item payload to a dict keyed by field name.
+
+		Params:
+		item — The item JSON as returned by codeBeamer. — dict[str, Any]
+
+		Returns:
+		dict[str, Any] — The values of the projected fields."""
+		return dict(zip(self._fields, self.as_tuple(item)))
+
+	def project(self, items: Iterable[dict[str, Any]], as_tuple: bool = False) -> list[dict[str, Any]] | list[tuple[Any, ...]]:
+		"""Projects many raw item payloads.
+
+		Params:
+		items — The item JSONs. — Iterable[dict[str, Any]]
+		as_tuple — Return tuples instead of dicts. — bool(False)
+
+		Returns:
+		list[dict[str, Any]] | list[tuple] — The projected records."""
+		convert = self.as_tuple if as_tuple else self.as_dict
+		return [convert(item) for item in items]
+
+	def __repr__(self) -> str:
+		return f'Projection(fields={self._fields})'
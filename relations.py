@@ -0,0 +1,422 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Hashable, Iterable, Iterator
+
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import perf_counter
+from weakref import WeakKeyDictionary
+
+from .bulk import BulkReport
+from .tracker_item import TrackerItem, item_reference
+from .utils import logger
+
+if TYPE_CHECKING:
+	from .rest_client import RestClient
+
+# The relation kinds in `items/{id}/relations`, a kind's position is its code in `RelationGraph.kinds`
+RELATION_KINDS = ('downstream', 'upstream', 'outgoing', 'incoming')
+_RELATION_KEYS = ('downstreamReferences', 'upstreamReferences', 'outgoingAssociations', 'incomingAssociations')
+
+class RelationGraph:
+	"""A compact, array backed graph of item relations in compressed sparse row (CSR) form.
+	Node `i` is the item `ids[i]` and its edges are the range `offsets[i]` to `offsets[i + 1]`
+	of the parallel edge columns: `targets` (node indexes), `kinds` (codes into
+	`RELATION_KINDS`), and `relation_ids` (the reference or association ID). Every column is an
+	`array`, so a 100k node graph costs a few MiB and no objects for the garbage collector to
+	chase. The reverse edges used by `RelationGraph.predecessors` are built the first time
+	they're needed.
+
+	Edges point from the item the relations were fetched for, so `A -> B (downstream)` means
+	B is downstream of A. Items that were only seen as a target have no edges of their own;
+	`RelationGraph.fetched` tells them apart. Items whose relations couldn't be fetched aren't
+	`fetched` either, and are in `RelationGraph.failed` with the error."""
+
+	def __init__(self, client: RestClient | None = None):
+		self._client: RestClient | None = client
+		self.ids: array = array('q')
+		self.offsets: array = array('q', [0])
+		self.targets: array = array('q')
+		self.kinds: array = array('b')
+		self.relation_ids: array = array('q')
+		self.fetched: array = array('b')
+		# item ID -> why its relations couldn't be fetched
+		self.failed: dict[int, BaseException] = {}
+		self._positions: dict[int, int] = {}
+		self._reverse: tuple[array, array, array] | None = None
+
+	@classmethod
+	def _build(
+		cls,
+		client: RestClient | None,
+		relations: Iterable[tuple[int, dict[str, Any]]],
+		failed: dict[int, BaseException] | None = None
+	) -> RelationGraph:
+		"""Builds the graph from `(item ID, relations JSON)` pairs. The edges are collected as
+		coordinate lists first and then counted into rows, since targets get node indexes
+		before their own relations are seen. Failed items become nodes without edges."""
+		graph = cls(client)
+		graph.failed = dict(failed or {})
+		for item_id in graph.failed:
+			graph._node(item_id)
+		sources, targets, kinds, relation_ids = array('q'), array('q'), array('b'), array('q')
+		fetched: set[int] = set()
+		for item_id, data in relations:
+			source = graph._node(item_id)
+			fetched.add(source)
+			for code, key in enumerate(_RELATION_KEYS):
+				for relation in data.get(key) or []:
+					revision = relation.get('itemRevision') or {}
+					target_id = revision.get('id')
+					if target_id is None:
+						continue
+					sources.append(source)
+					targets.append(graph._node(target_id))
+					kinds.append(code)
+					relation_ids.append(relation.get('id') or 0)
+		# Counting sort of the edges by source node
+		counts = array('q', bytes(8 * (len(graph.ids) + 1)))
+		for source in sources:
+			counts[source + 1] += 1
+		for i in range(len(graph.ids)):
+			counts[i + 1] += counts[i]
+		graph.offsets = array('q', counts)
+		size = len(sources)
+		graph.targets = array('q', bytes(8 * size))
+		graph.kinds = array('b', bytes(size))
+		graph.relation_ids = array('q', bytes(8 * size))
+		fill = array('q', counts[:-1])
+		for edge, source in enumerate(sources):
+			position = fill[source]
+			fill[source] += 1
+			graph.targets[position] = targets[edge]
+			graph.kinds[position] = kinds[edge]
+			graph.relation_ids[position] = relation_ids[edge]
+		graph.fetched = array('b', (1 if i in fetched else 0 for i in range(len(graph.ids))))
+		return graph
+
+	def _node(self, item_id: int) -> int:
+		index = self._positions.get(item_id)
+		if index is None:
+			index = self._positions[item_id] = len(self.ids)
+			self.ids.append(item_id)
+		return index
+
+	def raise_for_errors(self):
+		"""Raises the first error if the relations of any item couldn't be fetched.
+
+		Raises:
+		Exception — The error of the first failed item."""
+		for error in self.failed.values():
+			raise error
+
+	@property
+	def edge_count(self) -> int:
+		"""The number of edges."""
+		return len(self.targets)
+
+	def index_of(self, id: int) -> int:
+		"""The index of the node for an item ID.
+
+		Params:
+		id — The ID of the item. — int
+
+		Raises:
+		KeyError — The item isn't in the graph."""
+		return self._positions[id]
+
+	def _codes(self, kinds: Iterable[str] | None) -> set[int] | None:
+		if kinds is None:
+			return None
+		if isinstance(kinds, str):
+			kinds = [kinds]
+		return {RELATION_KINDS.index(k) for k in kinds}
+
+	def edges(self, index: int, kinds: Iterable[str] | None = None) -> Iterator[tuple[int, str, int]]:
+		"""Yields the edges of a node as `(target index, kind, relation ID)`.
+
+		Params:
+		index — The index of the node. — int
+		kinds — Only these kinds, see `RELATION_KINDS`. If None every kind. — Iterable[str](None)"""
+		codes = self._codes(kinds)
+		for edge in range(self.offsets[index], self.offsets[index + 1]):
+			if codes is None or self.kinds[edge] in codes:
+				yield self.targets[edge], RELATION_KINDS[self.kinds[edge]], self.relation_ids[edge]
+
+	def successors(self, index: int, kinds: Iterable[str] | None = None) -> list[int]:
+		"""The indexes of the nodes a node has edges to.
+
+		Params:
+		index — The index of the node. — int
+		kinds — Only these kinds, see `RELATION_KINDS`. If None every kind. — Iterable[str](None)"""
+		start, end = self.offsets[index], self.offsets[index + 1]
+		codes = self._codes(kinds)
+		if codes is None:
+			return self.targets[start:end].tolist()
+		return [self.targets[e] for e in range(start, end) if self.kinds[e] in codes]
+
+	def predecessors(self, index: int, kinds: Iterable[str] | None = None) -> list[int]:
+		"""The indexes of the nodes with edges to a node.
+
+		Params:
+		index — The index of the node. — int
+		kinds — Only these kinds, see `RELATION_KINDS`. If None every kind. — Iterable[str](None)"""
+		offsets, sources, edge_kinds = self._transpose()
+		start, end = offsets[index], offsets[index + 1]
+		codes = self._codes(kinds)
+		if codes is None:
+			return sources[start:end].tolist()
+		return [sources[e] for e in range(start, end) if edge_kinds[e] in codes]
+
+	def _transpose(self) -> tuple[array, array, array]:
+		if self._reverse is None:
+			counts = array('q', bytes(8 * (len(self.ids) + 1)))
+			for target in self.targets:
+				counts[target + 1] += 1
+			for i in range(len(self.ids)):
+				counts[i + 1] += counts[i]
+			sources = array('q', bytes(8 * len(self.targets)))
+			kinds = array('b', bytes(len(self.targets)))
+			fill = array('q', counts[:-1])
+			for source in range(len(self.ids)):
+				for edge in range(self.offsets[source], self.offsets[source + 1]):
+					target = self.targets[edge]
+					sources[fill[target]] = source
+					kinds[fill[target]] = self.kinds[edge]
+					fill[target] += 1
+			self._reverse = (counts, sources, kinds)
+		return self._reverse
+
+	def reachable(self, index: int, kinds: Iterable[str] | None = None, max_depth: int | None = None) -> list[int]:
+		"""The indexes of every node reachable from a node along edges of the given kinds,
+		breadth-first and without the node itself.
+
+		Params:
+		index — The index of the node to start from. — int
+		kinds — Only follow these kinds, see `RELATION_KINDS`. If None every kind. — Iterable[str](None)
+		max_depth — The most edges to follow. If None there is no limit. — int(None)
+
+		Returns:
+		list[int] — The indexes in the order they were reached."""
+		seen = bytearray(len(self.ids))
+		seen[index] = 1
+		found: list[int] = []
+		queue = deque([(index, 0)])
+		while queue:
+			node, depth = queue.popleft()
+			if max_depth is not None and depth >= max_depth:
+				continue
+			for target in self.successors(node, kinds):
+				if not seen[target]:
+					seen[target] = 1
+					found.append(target)
+					queue.append((target, depth + 1))
+		return found
+
+	def to_adjacency(self, kinds: Iterable[str] | None = None) -> dict[int, list[int]]:
+		"""The graph as a dict of item ID to the item IDs it has edges to, for fetched items.
+
+		Params:
+		kinds — Only these kinds, see `RELATION_KINDS`. If None every kind. — Iterable[str](None)"""
+		return {
+			self.ids[i]: [self.ids[t] for t in self.successors(i, kinds)]
+			for i in range(len(self.ids)) if self.fetched[i]
+		}
+
+	def item(self, index: int) -> TrackerItem:
+		"""Builds a `TrackerItem` for a node. The item is a lazy reference, so its data is only
+		fetched if it's used.
+
+		Params:
+		index — The index of the node. — int
+
+		Returns:
+		`TrackerItem` — The item for the node."""
+		return TrackerItem(id=self.ids[index], name='', type='TrackerItemReference', client=self._client)
+
+	def __len__(self) -> int:
+		return len(self.ids)
+
+	def __contains__(self, o: object) -> bool:
+		item_id = o if isinstance(o, int) else getattr(o, 'id', None)
+		return item_id in self._positions
+
+	def __repr__(self) -> str:
+		return f'RelationGraph(nodes={len(self)}, edges={self.edge_count}, failed={len(self.failed)})'
+
+def fetch_relations(
+	client: RestClient,
+	items: Iterable[int | TrackerItem],
+	depth: int = 1,
+	kinds: Iterable[str] | None = None,
+	workers: int = 8,
+) -> RelationGraph:
+	"""Fetches `items/{id}/relations` for many items concurrently into a `RelationGraph`. With
+	a depth over 1 the items found are fetched as well, level by level like `walk_tree`,
+	following only the given kinds. An item whose relations can't be fetched, e.g. one that
+	was deleted or isn't visible, is recorded in `RelationGraph.failed` instead of looking like
+	an item without relations, and the others carry on.
+
+	Params:
+	client — The client to fetch with. — `RestClient`
+	items — The items or their IDs to start from. — Iterable[int | `TrackerItem`]
+	depth — How many levels of relations to fetch. — int(1)
+	kinds — The kinds to follow past the first level, see `RELATION_KINDS`. If None every kind. — Iterable[str](None)
+	workers — The number of concurrent requests. — int(8)
+
+	Returns:
+	`RelationGraph` — The graph of the relations."""
+	codes = None if kinds is None else {RELATION_KINDS.index(k) for k in ([kinds] if isinstance(kinds, str) else kinds)}
+	level = list(dict.fromkeys(i.id if isinstance(i, TrackerItem) else int(i) for i in items))
+	seen = set(level)
+	fetched: list[tuple[int, dict[str, Any]]] = []
+	failed: dict[int, BaseException] = {}
+
+	def fetch(item_id: int) -> dict[str, Any] | Exception:
+		try:
+			data = client.request('GET', f'items/{item_id}/relations', raise_for_status=True)
+		except Exception as e:
+			logger.debug(f'Fetching the relations of item {item_id} failed: {e}')
+			return e
+		if not isinstance(data, dict):
+			data = {}
+		# Keep only what the graph needs so a big level doesn't hold whole payloads
+		return {key: [{'id': r.get('id'), 'itemRevision': {'id': (r.get('itemRevision') or {}).get('id')}} for r in data.get(key) or []] for key in _RELATION_KEYS}
+
+	with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+		for current in range(max(1, depth)):
+			next_level: list[int] = []
+			for item_id, data in zip(level, executor.map(fetch, level)):
+				if isinstance(data, Exception):
+					failed[item_id] = data
+					continue
+				fetched.append((item_id, data))
+				for code, key in enumerate(_RELATION_KEYS):
+					if codes is not None and code not in codes:
+						continue
+					for relation in data[key]:
+						target = relation['itemRevision']['id']
+						if target is not None and target not in seen:
+							seen.add(target)
+							next_level.append(target)
+			logger.debug(f'Relations level {current + 1}: {len(level)} items, {len(next_level)} new')
+			level = next_level
+			if not level:
+				break
+	if failed:
+		logger.warning(f'The relations of {len(failed)} items couldn\'t be fetched')
+	return RelationGraph._build(client, fetched, failed)
+
+_association_types: WeakKeyDictionary[RestClient, dict[str, dict[str, Any]]] = WeakKeyDictionary()
+_association_types_lock = Lock()
+
+def association_type(client: RestClient, type: str | int) -> dict[str, Any]:
+	"""Resolves an association type by name or ID. The types are fetched from
+	`associations/types` once per client.
+
+	Params:
+	client — The client to fetch with. — `RestClient`
+	type — The name (case-insensitive) or ID of the type, e.g. 'related'. — str | int
+
+	Raises:
+	ValueError — There is no such type.
+
+	Returns:
+	dict[str, Any] — The `AssociationTypeReference`."""
+	with _association_types_lock:
+		types = _association_types.get(client)
+		if types is None:
+			types = {}
+			for t in client.get('associations/types') or []:
+				types[str(t['id'])] = types[t['name'].lower()] = {'id': t['id'], 'name': t['name'], 'type': 'AssociationTypeReference'}
+			_association_types[client] = types
+	found = types.get(str(type).lower())
+	if found is None:
+		raise ValueError(f'unknown association type {type!r}, expected one of {sorted({t["name"] for t in types.values()})}')
+	return found
+
+def association_json(
+	client: RestClient,
+	source: int | TrackerItem,
+	target: int | TrackerItem,
+	type: str | int = 'related',
+	description: str = '',
+	propagate_suspects: bool = False
+) -> dict[str, Any]:
+	"""The body of a `POST associations` request.
+
+	Params:
+	client — The client to resolve the type with. — `RestClient`
+	source — The item the association goes from. — int | `TrackerItem`
+	target — The item the association goes to. — int | `TrackerItem`
+	type — The association type name or ID. — str | int('related')
+	description — The description of the association. — str('')
+	propagate_suspects — Mark the association as propagating suspects. — bool(False)"""
+	return {
+		'from': item_reference(source),
+		'to': item_reference(target),
+		'type': association_type(client, type),
+		'description': description,
+		'descriptionFormat': 'PlainText',
+		'propagatingSuspects': propagate_suspects,
+	}
+
+def _run_bulk(report: BulkReport, work: list[tuple[Hashable, Any]], send, workers: int) -> BulkReport:
+	def run(entry: tuple[Hashable, Any]):
+		key, payload = entry
+		try:
+			send(payload)
+			report._record([key])
+		except Exception as e:
+			report._record([key], e)
+
+	start = perf_counter()
+	with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+		list(executor.map(run, work))
+	report.elapsed = perf_counter() - start
+	return report
+
+def create_associations(
+	client: RestClient,
+	pairs: Iterable[tuple[int | TrackerItem, int | TrackerItem]],
+	type: str | int = 'related',
+	description: str = '',
+	propagate_suspects: bool = False,
+	workers: int = 8
+) -> BulkReport:
+	"""Creates associations between many pairs of items concurrently.
+
+	Params:
+	client — The client to send with. — `RestClient`
+	pairs — The `(from, to)` items or IDs. — Iterable[tuple]
+	type — The association type name or ID. — str | int('related')
+	description — The description of every association. — str('')
+	propagate_suspects — Mark the associations as propagating suspects. — bool(False)
+	workers — The number of concurrent requests. — int(8)
+
+	Raises:
+	ValueError — The association type doesn't exist.
+
+	Returns:
+	`BulkReport` — Keyed by `(from ID, to ID)`."""
+	work = []
+	for source, target in pairs:
+		data = association_json(client, source, target, type, description, propagate_suspects)
+		work.append(((data['from']['id'], data['to']['id']), data))
+	send = lambda data: client.request('POST', 'associations', json_=data, raise_for_status=True)
+	return _run_bulk(BulkReport('create associations'), work, send, workers)
+
+def remove_associations(client: RestClient, association_ids: Iterable[int], workers: int = 8) -> BulkReport:
+	"""Deletes many associations concurrently.
+
+	Params:
+	client — The client to send with. — `RestClient`
+	association_ids — The IDs of the associations, e.g. from `RelationGraph.relation_ids`. — Iterable[int]
+	workers — The number of concurrent requests. — int(8)
+
+	Returns:
+	`BulkReport` — Keyed by association ID."""
+	work = [(int(a), int(a)) for a in association_ids]
+	send = lambda association_id: client.request('DELETE', f'associations/{association_id}', raise_for_status=True)
+	return _run_bulk(BulkReport('remove associations'), work, send, workers)
@@ -1,11 +1,23 @@
 from __future__ import annotations
-from loguru import logger
-
-from typing import Any
-from requests import Session, Response
-from requests.exceptions import HTTPError
+from typing import TYPE_CHECKING, Any, Callable
 from urllib.parse import urlencode
-from time import sleep
+from time import perf_counter, sleep
+from threading import Event, Lock
+
+from .transport import Transport, TransportResponse, StreamingResponse, HTTPError, make_transport
+from .utils import logger
+
+if TYPE_CHECKING:
+	from requests import Session
+	from .writer import WriteBehindQueue
+
+class _InFlight:
+	"""A request that is currently being made, shared by every thread waiting on the same GET."""
+	def __init__(self):
+		self.done: Event = Event()
+		self.response: TransportResponse | None = None
+		self.result: dict[str, Any] | str | None = None
+		self.error: BaseException | None = None
 
 class RestClient:
 	default_headers = {'Content-Type': 'application/json'}
@@ -17,18 +29,51 @@ class RestClient:
 		password: str,
 		timeout: int = 60,
 		api_root: str = '',
-		session: Session = None
+		session: Session = None,
+		coalesce: bool = True,
+		pool_size: int = 32,
+		transport: Transport | str | None = None
 	):
 		self.url: str = url
 		self.timeout: int = timeout
 		self.api_root: str = api_root
-		if session is None:
-			self._session: Session = Session()
-		else:
-			self._session: Session = session
+		# Concurrent identical GETs share a single request and its parsed result
+		self.coalesce: bool = coalesce
+		self._in_flight: dict[tuple, _InFlight] = {}
+		self._in_flight_lock: Lock = Lock()
+		# Called with (method, path, status code, seconds) after every request that is sent
+		self._observers: list[Callable[[str, str, int, float], None]] = []
+		# Set by Codebeamer.enable_write_behind, item writes go through it instead of being sent directly
+		self.write_queue: WriteBehindQueue | None = None
+		if session is not None and transport not in (None, 'requests'):
+			raise ValueError('session can only be used with the requests transport')
+		kwargs = {} if isinstance(transport, Transport) else {'pool_size': pool_size}
+		self._transport: Transport = make_transport(transport, session=session, **kwargs)
 		if username and password:
 			self._session_auth = {'username': username, 'password': password}
-		self._session.auth = (username, password)
+		self._transport.auth = (username, password)
+
+	@property
+	def transport(self) -> Transport:
+		"""The transport requests are sent through."""
+		return self._transport
+
+	@property
+	def session(self) -> Session:
+		"""The requests session for the current thread.
+
+		Raises:
+		AttributeError — The client isn't using the requests transport."""
+		return self._transport.session
+
+	def add_observer(self, observer: Callable[[str, str, int, float], None]):
+		"""Registers a function called after every request sent with the method, path, status 
+		code, and elapsed seconds. Observers are called on the thread that made the request."""
+		self._observers = [*self._observers, observer]
+
+	def remove_observer(self, observer: Callable[[str, str, int, float], None]):
+		"""Unregisters an observer added with `add_observer`."""
+		self._observers = [o for o in self._observers if o != observer]
 
 	def resource_url(self, resource: str) -> str:
 		return '/'.join([self.api_root, resource])
@@ -47,7 +92,56 @@ class RestClient:
 		params: dict[str, Any] | None = None,
 		headers: dict[str, Any] | None = None,
 		files: dict[str, Any] | None = None,
+		raise_for_status: bool = False,
 	) -> dict[str, Any] | str:
+		path, url = self._build_url(path, params, flags)
+		headers = headers or self.default_headers
+		if self.coalesce and method == 'GET' and data is None and json_ is None and files is None:
+			return self._coalesced_request(method, path, url, headers, raise_for_status)
+		return self._send(method, path, url, headers, data, json_, files, raise_for_status)
+
+	def stream(
+		self,
+		path: str,
+		params: dict[str, Any] | None = None,
+		headers: dict[str, Any] | None = None,
+		chunk_size: int = 1 << 16,
+		raise_for_status: bool = True,
+	) -> StreamingResponse:
+		"""Sends a GET and returns as soon as the headers arrive, so a large body like an 
+		attachment can be read in chunks instead of being held in memory. Streamed requests are 
+		never coalesced. Close the response, or use it as a context manager, when done.
+
+		Params:
+		path — The resource path. — str
+		params — The query parameters. — dict[str, Any](None)
+		headers — The request headers, e.g. a Range. — dict[str, Any](None)
+		chunk_size — The most bytes in each chunk. — int(65536)
+		raise_for_status — Raise for error responses instead of returning them. — bool(True)
+
+		Raises:
+		HTTPError — The response is an error and `raise_for_status` is set.
+
+		Returns:
+		`StreamingResponse` — The response, with the body still to be read."""
+		path, url = self._build_url(path, params)
+		headers = headers or {}
+		response = self._transport_stream(path, url, headers, chunk_size)
+		if response.status_code == 429:
+			# Rate-limiting. Just wait and run the query again
+			response.close()
+			retry_after = int(response.headers.get('Retry-After', 1))
+			logger.debug(f'Sleeping for {retry_after}')
+			sleep(retry_after)
+			response = self._transport_stream(path, url, headers, chunk_size)
+		if raise_for_status and response.status_code >= 400:
+			# Error bodies are small, read it for the message before letting go of the connection
+			with response:
+				response.read()
+			response.raise_for_status()
+		return response
+
+	def _build_url(self, path: str, params: dict[str, Any] | None = None, flags: list[str] | None = None) -> tuple[str, str]:
 		path = self.resource_url(path)
 		url = self.url_joiner(self.url, path)
 		if params or flags:
@@ -56,47 +150,119 @@ class RestClient:
 			url += urlencode(params or {})
 		if flags:
 			url += ('&' if params else '') + '&'.join(flags or [])
-		headers = headers or self.default_headers
-		response = self._session.request(
-			method=method,
-			url=url,
-			headers=headers,
-			data=data,
-			json=json_,
-			timeout=self.timeout,
-			files=files,
-			verify=False
-		)
+		return path, url
+
+	def _transport_stream(self, path: str, url: str, headers: dict[str, Any], chunk_size: int) -> StreamingResponse:
+		start = perf_counter()
+		response = self._transport.stream('GET', url, headers=headers, timeout=self.timeout, chunk_size=chunk_size)
+		elapsed = perf_counter() - start
+		logger.trace(f'HTTP: GET {path} -> {response.status_code} {response.reason} (streamed)')
+		for observer in self._observers:
+			observer('GET', path, response.status_code, elapsed)
+		return response
+
+	def _coalesced_request(
+		self,
+		method: str,
+		path: str,
+		url: str,
+		headers: dict[str, Any],
+		raise_for_status: bool = False
+	) -> dict[str, Any] | str:
+		"""Makes the request, unless an identical one is already in flight on another thread, in 
+		which case this waits for it and returns its result. The result object is shared between 
+		the callers so it must be treated as read-only. Every caller raises for an error response 
+		according to its own `raise_for_status`, so callers with and without it share a request."""
+		key = (method, url, tuple(sorted(headers.items())))
+		with self._in_flight_lock:
+			call = self._in_flight.get(key)
+			leader = call is None
+			if leader:
+				call = self._in_flight[key] = _InFlight()
+		if not leader:
+			logger.trace(f'HTTP: {method} {path} coalesced with an in-flight request')
+			call.done.wait()
+			if call.error is not None:
+				raise call.error
+		else:
+			try:
+				call.response, call.result = self._exchange(method, path, url, headers)
+			except BaseException as e:
+				call.error = e
+				raise
+			finally:
+				with self._in_flight_lock:
+					del self._in_flight[key]
+				call.done.set()
+		if raise_for_status:
+			call.response.raise_for_status()
+		return call.result
+
+	def _transport_request(
+		self,
+		method: str,
+		path: str,
+		url: str,
+		headers: dict[str, Any],
+		data: dict[str, Any] | None,
+		json_: dict[str, Any] | None,
+		files: dict[str, Any] | None,
+	) -> TransportResponse:
+		start = perf_counter()
+		response = self._transport.request(method, url, headers=headers, data=data, json=json_, files=files, timeout=self.timeout)
+		elapsed = perf_counter() - start
 		logger.trace(f'HTTP: {method} {path} -> {response.status_code} {response.reason}')
-		logger.trace(f'HTTP: Response text -> {response.text}')
+		logger.opt(lazy=True).trace('HTTP: Response text -> {}', lambda: response.text)
+		for observer in self._observers:
+			observer(method, path, response.status_code, elapsed)
+		return response
+
+	def _send(
+		self,
+		method: str,
+		path: str,
+		url: str,
+		headers: dict[str, Any],
+		data: dict[str, Any] | None = None,
+		json_: dict[str, Any] | None = None,
+		files: dict[str, Any] | None = None,
+		raise_for_status: bool = False,
+	) -> dict[str, Any] | str:
+		response, response_content = self._exchange(method, path, url, headers, data, json_, files)
+		if raise_for_status:
+			response.raise_for_status()
+		return response_content
+
+	def _exchange(
+		self,
+		method: str,
+		path: str,
+		url: str,
+		headers: dict[str, Any],
+		data: dict[str, Any] | None = None,
+		json_: dict[str, Any] | None = None,
+		files: dict[str, Any] | None = None,
+	) -> tuple[TransportResponse, dict[str, Any] | str]:
+		"""Sends a request, retrying once if rate limited, and parses the body. Error responses 
+		are returned like any other, the caller decides whether to raise for them."""
+		response = self._transport_request(method, path, url, headers, data, json_, files)
 		if response.status_code == 429:
 			# Rate-limiting. Just wait and run the query again
-			logger.debug(f'Sleeping for {int(response.headers["Retry-After"])}')
-			sleep(int(response.headers['Retry-After']))
-			response = self._session.request(
-				method=method,
-				url=url,
-				headers=headers,
-				data=data,
-				json=json_,
-				timeout=self.timeout,
-				files=files,
-				verify=False
-			)
-			logger.trace(f'HTTP: {method} {path} -> {response.status_code} {response.reason}')
-			logger.trace(f'HTTP: Response text -> {response.text}')
+			retry_after = int(response.headers.get('Retry-After', 1))
+			logger.debug(f'Sleeping for {retry_after}')
+			sleep(retry_after)
+			if hasattr(data, 'seek'):
+				# A streamed body was read by the first attempt
+				data.seek(0)
+			response = self._transport_request(method, path, url, headers, data, json_, files)
 		try:
-			if response.text:
+			if response.content:
 				response_content = response.json()
 			else:
 				response_content = response.content
 		except ValueError:
 			response_content = response.content
-		try:
-			response.raise_for_status()
-		except HTTPError as err:
-			pass # For now
-		return response_content
+		return response, response_content
 	
 	def get(
 		self,
@@ -106,7 +272,7 @@ class RestClient:
 		params: dict[str, Any] | None = None,
 		headers: dict[str, Any] | None = None,
 		not_json_response: bool | None = None,
-	) -> str | Response:
+	) -> dict[str, Any] | str:
 		resp = self.request('GET', path=path, flags=flags, params=params, data=data, headers=headers)
 		if not_json_response:
 			return resp.content
@@ -124,7 +290,7 @@ class RestClient:
 		params: dict[str, Any] | None = None,
 		headers: dict[str, Any] | None = None,
 		files: dict[str, Any] | None = None,
-	) -> Response | None:
+	) -> dict[str, Any] | str | None:
 		try:
 			return self.request('POST', path=path, data=data, json_=json_, headers=headers, files=files, params=params)
 		except ValueError:
@@ -137,7 +303,7 @@ class RestClient:
 		headers: dict[str, Any] | None = None,
 		files: dict[str, Any] | None = None,
 		json_: dict[str, Any] | None = None
-	) -> Response:
+	) -> dict[str, Any] | str | None:
 		try:
 			return self.request('PUT', path=path, data=data, json_=json_, headers=headers, files=files)
 		except ValueError:
@@ -161,7 +327,7 @@ class RestClient:
 		params: dict[str, Any] | None = None,
 		files: dict[str, Any] | None = None,
 		json_: dict[str, Any] | None = None
-	) -> Response:
+	) -> dict[str, Any] | str | None:
 		try:
 			return self.request('PATCH', path=path, data=data, json_=json_, headers=headers, params=params, files=files)
 		except ValueError:
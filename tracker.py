@@ -1,17 +1,25 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Any, get_args
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Mapping, TextIO, get_args
 
 from datetime import datetime
-from loguru import logger
+from os import PathLike
+from threading import RLock
 
 from .rest_client import RestClient
 from .user import User
 from .tracker_item import TrackerItem
 from .fields import FieldDefinition, Field
-from .utils import loadable, clamp, pages, snake_to_camel, snake_to_title
+from .columnar import ItemTable, DEFAULT_COLUMNS
+from .records import Projection
+from .tree import ItemTree, walk_tree
+from .bulk import BulkReport, delete_items
+from .importer import ItemImporter, ImportReport
+from .exporter import ExportReport, export_items, hydrate_pages
+from .utils import loadable, locked, clamp, pages, iter_pages, snake_to_camel, snake_to_title, logger
 
 if TYPE_CHECKING:
 	from .projects import Project
+	from .writer import WriteResult
 
 class Tracker:
 	"""Represents a tracking in codeBeamer."""
@@ -43,6 +51,7 @@ class Tracker:
 		prop_defaults = {k: None for k in self.__class__.__annotations__}
 		self.__dict__.update(prop_defaults)
 		self._loaded = False
+		self._lock = RLock()
 
 		self._id: int = id
 		self._name: str = name
@@ -185,6 +194,7 @@ class Tracker:
 		"""Flag for whether this tracker is sharable in a working set."""
 		return self._shared_in_working_set
 
+	@locked
 	def _load(self, data: dict[str, Any] = None):
 		"""Loads the rest of the tracker's data. When a tracker is fetched using 
 		`Project.get_trackers` only the ID and Name of the tracker are retrieved. 
@@ -222,15 +232,32 @@ class Tracker:
 		self._shared_in_working_set = data.get('sharedInWorkingSet')
 		self._loaded = True
 
-	def get_tracker_items(self, page: int = 0, page_size: int = 25) -> list[TrackerItem]:
+	def get_tracker_items(
+		self,
+		page: int = 0,
+		page_size: int = 25,
+		raw: bool = False,
+		fields: list[str] | None = None,
+		as_tuple: bool = False
+	) -> list[TrackerItem] | list[dict[str, Any]] | list[tuple]:
 		"""Fetches all the items in this tracker.
 
 		Params:
 		page — The page number to fetch if you want a specific page of items. If 0 then all items are fetched. — int(0)
 		page_size — The number of results per page. Must be between 1 and 500. — int(25)
+		raw — Return lightweight records taken straight from the response instead of `TrackerItem`s. — bool(False)
+		fields — The fields to include in the raw records, see `Projection`. Implies `raw`. Defaults to id and name. — list[str](None)
+		as_tuple — Return the raw records as tuples in `fields` order instead of dicts. Implies `raw`. — bool(False)
 		
 		Returns:
-		list[`TrackerItem`] — A list of the items in this tracker."""
+		list[`TrackerItem`] | list[dict[str, Any]] | list[tuple] — A list of the items in this tracker."""
+		if raw or fields or as_tuple:
+			# Anything past id and name requires the full items rather than the references
+			projection = Projection(fields)
+			records = []
+			for item_data in self.iter_item_pages(full=projection.needs_full_items, page=page, page_size=page_size):
+				records.extend(projection.project(item_data, as_tuple=as_tuple))
+			return records
 		fetch_all = page == 0
 		if fetch_all:
 			page = 1
@@ -247,9 +274,146 @@ class Tracker:
 				items.extend([TrackerItem(**ti, client=self._client, tracker=self) for ti in item_data['itemRefs']])
 		return items
 	
-	def get_items(self, page: int = 0, page_size: int = 25) -> list[TrackerItem]:
+	def get_items(
+		self,
+		page: int = 0,
+		page_size: int = 25,
+		raw: bool = False,
+		fields: list[str] | None = None,
+		as_tuple: bool = False
+	) -> list[TrackerItem] | list[dict[str, Any]] | list[tuple]:
 		"""Alias for get_tracker_items."""
-		return self.get_tracker_items(page=page, page_size=page_size)
+		return self.get_tracker_items(page=page, page_size=page_size, raw=raw, fields=fields, as_tuple=as_tuple)
+
+	def iter_item_pages(
+		self,
+		full: bool = False,
+		page: int = 0,
+		page_size: int = 500,
+		query: str | None = None,
+		reverse: bool = False
+	) -> Iterator[list[dict[str, Any]]]:
+		"""Yields the raw item JSON of each page of items in this tracker without building any 
+		`TrackerItem` objects.
+
+		Params:
+		full — If True the full item payloads are fetched through `items/query` instead of the item references. — bool(False)
+		page — The page number to fetch if you want a specific page of items. If 0 then all items are fetched. — int(0)
+		page_size — The number of results per page. Must be between 1 and 500. — int(500)
+		query — A cbQL condition the items must also match. Implies `full`. — str(None)
+		reverse — Yield the last page first, see `iter_pages`. — bool(False)
+		
+		Returns:
+		Iterator[list[dict[str, Any]]] — The raw items of each page."""
+		if full or query:
+			query = f'tracker.id IN ({self.id})' + (f' AND ({query})' if query else '')
+			fetch = lambda p, s: self._client.post('items/query', json_={'page': p, 'pageSize': s, 'queryString': query})
+			return iter_pages(fetch, 'items', page=page, page_size=page_size, reverse=reverse)
+		fetch = lambda p, s: self._client.get(f'trackers/{self.id}/items', params={'page': p, 'pageSize': s})
+		return iter_pages(fetch, 'itemRefs', page=page, page_size=page_size, reverse=reverse)
+
+	def delete_items(
+		self,
+		query: str | None = None,
+		workers: int = 16,
+		page_size: int = 500,
+		missing_ok: bool = True,
+		progress: Callable[[BulkReport], None] | None = None,
+		progress_every: int = 500
+	) -> BulkReport:
+		"""Deletes the items of this tracker concurrently, streaming their IDs page by page 
+		without building any items. Without a query only the light item references are listed. 
+		Pages are read from the last to the first so deleting doesn't shift the pages left to 
+		read.
+
+		Params:
+		query — A cbQL condition the items to delete must match. If None every item is deleted. — str(None)
+		workers — The most deletes sent at once. — int(16)
+		page_size — The number of IDs listed per request. Must be between 1 and 500. — int(500)
+		missing_ok — Count items that are already gone (404) as deleted. — bool(True)
+		progress — Called with the report every `progress_every` items. — Callable[[`BulkReport`], None](None)
+		progress_every — How many items between progress calls. — int(500)
+
+		Returns:
+		`BulkReport` — The items deleted and the items that failed, with their errors."""
+		ids = (
+			item['id']
+			for item_page in self.iter_item_pages(page_size=page_size, query=query, reverse=True)
+			for item in item_page
+		)
+		return delete_items(
+			self._client, ids, workers=workers, missing_ok=missing_ok, progress=progress, progress_every=progress_every
+		)
+
+	def get_items_table(
+		self,
+		columns: list[str] | None = None,
+		custom_fields: list[str] | bool | None = None,
+		page_size: int = 500
+	) -> ItemTable:
+		"""Fetches all the items in this tracker into a columnar `ItemTable` straight from the 
+		raw pages. When only `id` and `name` are requested the lighter item references are used, 
+		otherwise the full items are queried.
+
+		Params:
+		columns — The system columns to include, e.g. `['id', 'status', 'modified_at']`. — list[str](None)
+		custom_fields — The names of custom fields to include as columns, or True for all of them. — list[str] | bool(None)
+		page_size — The number of results per page. Must be between 1 and 500. — int(500)
+		
+		Returns:
+		`ItemTable` — The items of this tracker as columns."""
+		table = ItemTable(columns=columns, custom_fields=custom_fields)
+		for records in self.iter_item_pages(full=table.needs_full_items, page_size=page_size):
+			table.extend(records)
+		return table
+
+	def export_items(
+		self,
+		destination: str | PathLike | TextIO,
+		columns: list[str] | None = None,
+		query: str | None = None,
+		format: str | None = None,
+		hydrate: bool = True,
+		chunk_size: int = 500,
+		workers: int = 4,
+		page_size: int = 500,
+		progress: Callable[[ExportReport], None] | None = None,
+		progress_every: int = 5000
+	) -> ExportReport:
+		"""Streams the items of this tracker to a JSON Lines or CSV file page by page, in 
+		constant memory, without building any `TrackerItem` objects. When only `id` and `name` 
+		are requested the item references are written as they are listed. Otherwise, with 
+		`hydrate`, the references are swapped for the full items in chunks fetched several at 
+		once, see `hydrate_pages`; without it the full items are paged through `items/query` one 
+		page at a time.
+
+		Params:
+		destination — The file path, or a file opened in text mode. — str | PathLike | TextIO
+		columns — The fields to write, see `Projection`. Custom fields are named by their field name. — list[str](None)
+		query — A cbQL condition the items must also match. The matching items are paged through `items/query`. — str(None)
+		format — 'jsonl' or 'csv'. If None it's picked by the destination's suffix. — str(None)
+		hydrate — Fetch the full items in concurrent chunks. — bool(True)
+		chunk_size — The most items per hydration query. — int(500)
+		workers — The number of concurrent hydration queries. — int(4)
+		page_size — The number of results per page. Must be between 1 and 500. — int(500)
+		progress — Called with the report every `progress_every` items. — Callable[[`ExportReport`], None](None)
+		progress_every — How many items between progress calls. — int(5000)
+
+		Raises:
+		ValueError — The format isn't known.
+		HTTPError — A chunk of full items couldn't be fetched.
+
+		Returns:
+		`ExportReport` — The number of items written and the rate."""
+		columns = columns or list(DEFAULT_COLUMNS)
+		full = Projection(columns).needs_full_items
+		if query or (full and not hydrate):
+			item_pages = self.iter_item_pages(full=True, page_size=page_size, query=query)
+		else:
+			item_pages = self.iter_item_pages(page_size=page_size)
+			if full:
+				item_pages = hydrate_pages(self._client, item_pages, chunk_size=chunk_size, workers=workers)
+		return export_items(item_pages, destination, columns=columns, format=format, progress=progress, progress_every=progress_every)
 	
 	def get_fields(self) -> list[FieldDefinition]:
 		"""Fetches the available field names for this tracker.
@@ -292,6 +456,21 @@ class Tracker:
 		"""Get the immediate descendents of the tracker."""
 		# TODO
 
+	def get_outline(self, max_depth: int | None = None, workers: int = 8) -> ItemTree:
+		"""Fetches the whole outline of the tracker into a compact `ItemTree`. The tracker is the 
+		root at index 0 and its top level items are at depth 1.
+
+		Params:
+		max_depth — How many levels to fetch. If None the whole outline is fetched. — int(None)
+		workers — The number of concurrent requests. — int(8)
+		
+		Raises:
+		HTTPError — The children of an item couldn't be fetched.
+		
+		Returns:
+		`ItemTree` — The outline of the tracker."""
+		return walk_tree(self._client, self, max_depth=max_depth, workers=workers)
+
 	def create_tracker_item(
 		self,
 		name: str,
@@ -303,6 +482,87 @@ class Tracker:
 		**kwargs,
 	) -> TrackerItem:
 		"""Creates a new tracker item in the current tracker."""
+		data, params = self._item_json(name, description, description_format, parent_id, reference_id, position, **kwargs)
+		try:
+			item = self._client.post(f'trackers/{self.id}/items', json_=data, params=params)
+			del item['tracker']
+			return TrackerItem(**item, client=self._client, tracker=self)
+		except Exception as e:
+			logger.exception(e)
+			raise e
+
+	def queue_tracker_item(
+		self,
+		name: str,
+		description: str = '--',
+		description_format: str = 'PlainText',
+		parent_id: int = None,
+		reference_id: int = None,
+		position: str = None,
+		**kwargs,
+	) -> WriteResult:
+		"""Queues creating a new tracker item in the current tracker on the client's write-behind 
+		queue, see `Codebeamer.enable_write_behind`. Takes the same arguments as 
+		`create_tracker_item`.
+
+		Raises:
+		RuntimeError — Write-behind isn't enabled.
+
+		Returns:
+		`WriteResult` — The result of the create, with `item_id` set once it's sent."""
+		queue = self._client.write_queue
+		if queue is None:
+			raise RuntimeError('write-behind is not enabled, see Codebeamer.enable_write_behind')
+		data, params = self._item_json(name, description, description_format, parent_id, reference_id, position, **kwargs)
+		return queue.create(self.id, data, params)
+
+	def import_items(
+		self,
+		rows: Iterable[Mapping[str, Any]] | str | PathLike,
+		columns: Mapping[str, str] | None = None,
+		key: str | None = None,
+		parent: str | None = None,
+		workers: int = 8,
+		checkpoint: str | PathLike | None = None,
+		dry_run: bool = False,
+		progress: Callable[[ImportReport], None] | None = None,
+		progress_every: int = 500
+	) -> ImportReport:
+		"""Imports items from rows, or from a CSV or JSON Lines file streamed row by row. The 
+		tracker's fields are resolved once, every row is validated locally, and items are 
+		created concurrently. With a checkpoint file an interrupted import can be run again 
+		and carries on without creating anything twice, see `ItemImporter`.
+		
+		Params:
+		rows — The rows, or the file to read them from. — Iterable[Mapping[str, Any]] | str | PathLike
+		columns — Column name -> field name. If None each column is named after its field, including columns only some rows have. — Mapping[str, str](None)
+		key — The column that identifies a row, e.g. an external ID. — str(None)
+		parent — The column holding the parent: the key of an earlier row, or `#` and the ID of an existing item, e.g. `#1234`. — str(None)
+		workers — The number of concurrent creates. — int(8)
+		checkpoint — The checkpoint file to resume from and log to. — str | PathLike(None)
+		dry_run — Only validate the rows. — bool(False)
+		progress — Called with the report every `progress_every` rows. — Callable[[`ImportReport`], None](None)
+		progress_every — How many rows between progress calls. — int(500)
+		
+		Raises:
+		ValueError — A column maps to a field this tracker doesn't have.
+		
+		Returns:
+		`ImportReport` — The items created, keyed by row key, and the rows that failed."""
+		importer = ItemImporter(self, columns=columns, key=key, parent=parent, workers=workers, checkpoint=checkpoint)
+		return importer.run(rows, dry_run=dry_run, progress=progress, progress_every=progress_every)
+
+	def _item_json(
+		self,
+		name: str,
+		description: str = '--',
+		description_format: str = 'PlainText',
+		parent_id: int = None,
+		reference_id: int = None,
+		position: str = None,
+		**kwargs,
+	) -> tuple[dict[str, Any], dict[str, Any]]:
+		"""Builds the JSON and query parameters to create an item."""
 		params = {}
 		if parent_id:
 			params['parentItemId'] = parent_id
@@ -385,15 +645,7 @@ class Tracker:
 					field_json['type'] = field_def.value_model
 					field_json['value'] = value
 				data['customFields'].append(field_json)
-		# return data
-		try:
-			item = self._client.post(f'trackers/{self.id}/items', json_=data, params=params)
-			print(item)
-			del item['tracker']
-			return TrackerItem(**item, client=self._client, tracker=self)
-		except Exception as e:
-			logger.exception(e)
-			raise e
+		return data, params
 
 	def __repr__(self) -> str:
 		return f'Tracker(id={self.id}, name={self.name})'
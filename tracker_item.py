@@ -1,18 +1,29 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, BinaryIO
 
-from loguru import logger
 from datetime import datetime
-from requests.exceptions import HTTPError
+from os import PathLike
+from pathlib import Path
+from threading import RLock
 
 from .rest_client import RestClient
+from .transport import HTTPError
 from .user import User
 from .fields import Field, FieldDefinition, ChoiceValue
-from .utils import loadable, clamp, pages
+from .records import Projection
+from .utils import loadable, locked, clamp, pages, iter_pages, intern_string, logger
+
+if TYPE_CHECKING:
+	from .history import HistoryTable
+	from .attachments import TransferReport
+	from .comments import Comment
 
 if TYPE_CHECKING:
 	from .tracker import Tracker
 
+# codeBeamer's built in Status field
+STATUS_FIELD_ID = 7
+
 class TrackerItem:
 	"""Represents a tracker item in codeBeamer."""
 	if TYPE_CHECKING:
@@ -64,6 +75,9 @@ class TrackerItem:
 		self._fields = list()
 		self._children = None
 		self._loaded = False
+		self._lock = RLock()
+		# Raw JSON of nested references, keyed by attribute, built into objects on first access
+		self._refs: dict[str, Any] = {}
 
 		self._id: int = id
 		self._name: str = name
@@ -72,12 +86,10 @@ class TrackerItem:
 		self._tracker = kwargs.get('tracker')
 		# Want to try and get this regardless of type since it can come from the TrackerItem class
 		parent = kwargs.get('parent')
-		if isinstance(parent, TrackerItem):
-			self._parent = parent
-		elif isinstance(parent, dict):
-			self._parent = TrackerItem(**parent, client=self._client)
+		if isinstance(parent, dict):
+			self._refs['_parent'] = parent
 		else:
-			self._parent = None
+			self._parent = parent if isinstance(parent, TrackerItem) else None
 		# type only appears in GET /trackers/{trackerId}/items
 		_type = kwargs.get('type')
 		if not isinstance(_type, str):
@@ -98,8 +110,10 @@ class TrackerItem:
 	def tracker(self) -> Tracker:
 		"""The tracker the item belongs to."""
 		from .tracker import Tracker
-		if self._tracker is not None and not isinstance(self._tracker, Tracker):
-			self._tracker = Tracker(**self._tracker, client=self._client)
+		if isinstance(self._tracker, dict):
+			with self._lock:
+				if isinstance(self._tracker, dict):
+					self._tracker = Tracker(**self._tracker, client=self._client)
 		return self._tracker
 
 	@property
@@ -124,7 +138,7 @@ class TrackerItem:
 	@loadable
 	def created_by(self) -> User | None:
 		"""The user who created the item."""
-		return self._created_by
+		return self._reference('_created_by')
 
 	@property
 	@loadable
@@ -136,13 +150,13 @@ class TrackerItem:
 	@loadable
 	def modified_by(self) -> User | None:
 		"""The user that last modified the item."""
-		return self._modified_by
+		return self._reference('_modified_by')
 
 	@property
 	@loadable
 	def parent(self) -> TrackerItem | None:
 		"""The parent item to this item."""
-		return self._parent
+		return self._reference('_parent')
 
 	@property
 	@loadable
@@ -166,25 +180,25 @@ class TrackerItem:
 	@loadable
 	def children(self) -> list[TrackerItem] | None:
 		"""A list of this item's children. Only has the first 25 until `TrackerItem.get_children` is called."""
-		return self._children
+		return self._reference('_children')
 
 	@property
 	@loadable
 	def custom_fields(self) -> list[Field] | None:
 		"""A list of all the custom fields on this item."""
-		return self._custom_fields
+		return self._reference('_custom_fields')
 
 	@property
 	@loadable
 	def priority(self) -> Field | None:
 		"""The item's priority."""
-		return self._priority
+		return self._reference('_priority')
 
 	@property
 	@loadable
 	def status(self) -> Field | None:
 		"""The status of the item."""
-		return self._status
+		return self._reference('_status')
 
 	@property
 	@loadable
@@ -237,7 +251,8 @@ class TrackerItem:
 	@property
 	@loadable
 	def comments(self) -> list[dict[str, Any]] | None:
-		"""A list of the comments on this item."""
+		"""A list of the comments on this item, as they came with the item JSON. Use 
+		`get_comments` to fetch every comment without loading the item."""
 		return self._comments
 
 	@property
@@ -323,6 +338,55 @@ class TrackerItem:
 		"""JSON representation of the item."""
 		# TODO
 
+	def _tracker_id(self) -> int | None:
+		"""The ID of the item's tracker without building the `Tracker`."""
+		tracker = self._tracker
+		return tracker.get('id') if isinstance(tracker, dict) else getattr(tracker, 'id', None)
+
+	def _reference(self, attr: str) -> Any:
+		"""Gets an attribute holding nested references, building the objects from the raw JSON 
+		kept by `_load` the first time it's used. Loading a page of items then only builds the 
+		items themselves rather than their users, parents, children, and fields as well."""
+		if attr in self._refs:
+			with self._lock:
+				if attr in self._refs:
+					setattr(self, attr, self._build_reference(attr, self._refs[attr]))
+					del self._refs[attr]
+		return getattr(self, attr)
+
+	def _build_reference(self, attr: str, data: Any) -> Any:
+		match attr:
+			case '_children':
+				return [TrackerItem(**ti, client=self._client, parent=self, tracker=self._tracker) for ti in data]
+			case '_custom_fields':
+				# Use the item's fields if they were already fetched since they know if they're editable
+				fields = {f.id: f for f in self._fields}
+				tracker_id = self._tracker_id()
+				return [
+					fields.get(cf.get('fieldId')) or Field(**cf, client=self._client, item_id=self.id, tracker_id=tracker_id, item=self)
+					for cf in data
+				]
+		if data is None:
+			return None
+		match attr:
+			case '_created_by' | '_modified_by':
+				return User(**data, client=self._client)
+			case '_parent':
+				return TrackerItem(**data, client=self._client, tracker=self._tracker)
+			case '_priority':
+				return ChoiceValue.from_json(data)
+			case '_status':
+				field = next((f for f in self._fields if f.name == 'Status'), None)
+				if field is None:
+					field = Field(
+						fieldId=STATUS_FIELD_ID, name='Status', type='ChoiceFieldValue', values=[],
+						client=self._client, item_id=self.id, tracker_id=self._tracker_id(), item=self
+					)
+				field._value = field._original = ChoiceValue.from_json(data)
+				return field
+		raise AttributeError(attr)
+
+	@locked
 	def _load(self, data: dict[str, Any] = None):
 		"""Loads the rest of the items's data. When an item is fetched using 
 		`Tracker.get_items` only the ID and Name of the item are retrieved. 
@@ -334,12 +398,11 @@ class TrackerItem:
 			return
 		if not data:
 			data: dict[str, Any] = self._client.get(f'items/{self.id}')
-		from .tracker import Tracker
-		if not isinstance(self._tracker, Tracker):
-			self._tracker = Tracker(**data.get('tracker'), client=self._client)
-		
-		# Cache field data first
-		self._fields = self.get_fields()
+		# Nested references are kept as raw JSON and only built into objects when they're used, 
+		# see `TrackerItem._reference`
+		if self._tracker is None:
+			self._tracker = data.get('tracker')
+		refs = self._refs
 		
 		# Rest of the system fields
 		self._accrued_millis = data.get('accruedMillis')
@@ -358,18 +421,18 @@ class TrackerItem:
 		self._start_date = datetime.strptime(start_date, '%Y-%m-%dT%H:%M:%S.%f') if start_date else None
 		self._story_points = data.get('storyPoints')
 		self._description = data.get('description')
-		self._description_format = data.get('descriptionFormat')
+		self._description_format = intern_string(data.get('descriptionFormat'))
 		self._created_at = datetime.strptime(data.get('createdAt'), '%Y-%m-%dT%H:%M:%S.%f')
-		self._created_by = User(**data.get('createdBy'), client=self._client)
+		refs['_created_by'] = data.get('createdBy')
 		self._modified_at = datetime.strptime(data.get('modifiedAt'), '%Y-%m-%dT%H:%M:%S.%f')
-		self._modified_by = User(**data.get('modifiedBy'), client=self._client)
+		refs['_modified_by'] = data.get('modifiedBy')
 
 		# Want to link parents together
 		parent = data.get('parent')
 		if isinstance(parent, TrackerItem):
 			self._parent = parent
 		elif isinstance(parent, dict):
-			self._parent = TrackerItem(**parent, client=self._client, tracker=self._tracker)
+			refs['_parent'] = parent
 		else:
 			self._parent = None
 		
@@ -377,39 +440,12 @@ class TrackerItem:
 		self._assigned_to = data.get('assignedTo')
 		closed_at = data.get('closedAt')
 		self._closed_at = datetime.strptime(closed_at, '%Y-%m-%dT%H:%M:%S.%f') if closed_at else None
-		self._children = [TrackerItem(**ti, client=self._client, parent=self, tracker=self._tracker) for ti in data.get('children', [])]
-		
-		# Fetch the field from the cached fields on load.
-		custom_fields: list[dict[str, Any]] = data.get('customFields')
-		self._custom_fields = []
-		for custom_field in custom_fields:
-			print(custom_field)
-			field = self.get_field(custom_field.get('fieldId'))
-			if field:
-				self._custom_fields.append(field)
-		
-		# These are all fields that exist in the _fields prop but no editable information is provided
-		# Fetch them from the _fields property to get that info
-		# ! From the get_tracker_item Priority and Status (and the others probably) return the following
-		# ! "priority":{"id":0,"name":"Unset","type":"ChoiceOptionReference"}
-		# ! Which this doesn't handle. These will need to get the field from the issue by
-		# ! name and instantiate the ChoiceValue from the given information and set the 
-		# ! ChoiceField._value to the parsed ChoiceValue
-		field_map = {f.name: f for f in self._fields}
-		
-		# This isn't a field? but instead a choice value?
-		priority = data.get('priority')
-		priority_val = ChoiceValue(**priority) if priority else None
-		self._priority = priority_val
-		# priority_field = field_map.get('Priority')
-		# self._priority = priority_field
-		# self._priority._value = priority_val
-
-		status = data.get('status')
-		status_val = ChoiceValue(**status) if status else None
-		status_field = field_map.get('Status')
-		self._status = status_field
-		self._status._value = status_val
+		refs['_children'] = data.get('children', [])
+		refs['_custom_fields'] = data.get('customFields') or []
+		# Priority and status come as choice references, e.g.
+		# "priority":{"id":0,"name":"Unset","type":"ChoiceOptionReference"}
+		refs['_priority'] = data.get('priority')
+		refs['_status'] = data.get('status')
 
 		# TODO: These need to match the priority and status method
 		# self._categories = [Field(**c, client=self._client, item_id=self.id) for c in data.get('categories')]
@@ -425,21 +461,33 @@ class TrackerItem:
 		
 		self._versions = data.get('versions')
 		self._ordinal = data.get('ordinal')
-		self._type_name = data.get('typeName')
+		self._type_name = intern_string(data.get('typeName'))
 		self._comments = data.get('comments')
 		self._tags = data.get('tags')
 		self._loaded = True
 
-	def get_children(self, page: int = 0, page_size: int = 25) -> list[TrackerItem]:
+	def get_children(
+		self,
+		page: int = 0,
+		page_size: int = 25,
+		raw: bool = False,
+		fields: list[str] | None = None,
+		as_tuple: bool = False
+	) -> list[TrackerItem] | list[dict[str, Any]] | list[tuple]:
 		"""Fetches all the child items of the current item. Updates the `TrackerItem.children` field 
-		as well.
+		as well, unless raw records are requested.
 
 		Params:
 		page — The page number to fetch if you want a specific page of items. If 0 then all items are fetched. — int(0)
 		page_size — The number of results per page. Must be between 1 and 500. — int(25)
+		raw — Return lightweight records taken straight from the response instead of `TrackerItem`s. — bool(False)
+		fields — The fields to include in the raw records, see `Projection`. Implies `raw`. Defaults to id and name. — list[str](None)
+		as_tuple — Return the raw records as tuples in `fields` order instead of dicts. Implies `raw`. — bool(False)
 		
 		Returns:
-		list[`TrackerItem`] — A list of the child items to this item."""
+		list[`TrackerItem`] | list[dict[str, Any]] | list[tuple] — A list of the child items to this item."""
+		if raw or fields or as_tuple:
+			return self._get_raw_children(Projection(fields), page=page, page_size=page_size, as_tuple=as_tuple)
 		# First check to see if all the children are loaded, return them if they are
 		children = self.children
 		if children is not None:
@@ -456,25 +504,65 @@ class TrackerItem:
 		items: list[TrackerItem] = []
 		item_data = self._client.get(f'items/{self.id}/children', params=params)
 		total_pages = pages(item_data['total'], page_size)
-		items.extend([TrackerItem(**ti, client=self._client, tracker=self) for ti in item_data['itemRefs']])
+		items.extend([TrackerItem(**ti, client=self._client, tracker=self._tracker, parent=self) for ti in item_data['itemRefs']])
 		if fetch_all:
 			while params['page'] < total_pages:
 				params['page'] += 1
 				item_data = self._client.get(f'items/{self.id}/children', params=params)
-				items.extend([TrackerItem(**ti, client=self._client, tracker=self.tracker, parent=self) for ti in item_data['itemRefs']])
-		if self._children is None:
-			self._children = list()
-		self._children.extend(items)
-		self._children = list(set(self._children))
+				items.extend([TrackerItem(**ti, client=self._client, tracker=self._tracker, parent=self) for ti in item_data['itemRefs']])
+		# Merge by ID so the children keep their order without rebuilding the list through a set
+		with self._lock:
+			children = {c.id: c for c in self._children or []}
+			children.update((i.id, i) for i in items)
+			self._children = list(children.values())
 		return items
 
-	def update_children(self, mode: str):
-		"""Insert, replace, or remove children from the item."""
+	def _get_raw_children(self, projection: Projection, page: int, page_size: int, as_tuple: bool) -> list[dict[str, Any]] | list[tuple]:
+		fetch = lambda p, s: self._client.get(f'items/{self.id}/children', params={'page': p, 'pageSize': s})
+		records = []
+		for refs in iter_pages(fetch, 'itemRefs', page=page, page_size=page_size):
+			if projection.needs_full_items and refs:
+				# The children endpoint only returns references, so the page is swapped for the 
+				# full items with a single query, keeping the children's order
+				ids = [ref['id'] for ref in refs]
+				query = {'page': 1, 'pageSize': len(ids), 'queryString': f'item.id IN ({",".join(map(str, ids))})'}
+				full = {i['id']: i for i in self._client.post('items/query', json_=query)['items']}
+				refs = [full.get(ref['id'], ref) for ref in refs]
+			records.extend(projection.project(refs, as_tuple=as_tuple))
+		return records
+
+	def update_children(self, children: list[int | TrackerItem], mode: str = 'INSERT'):
+		"""Inserts, replaces, or removes children of the item in one request. Replacing sets 
+		the order of the children as well.
+
+		Params:
+		children — The items or their IDs. — list[int | `TrackerItem`]
+		mode — 'INSERT' adds the items after the existing children, 'REPLACE' makes them the only children in the given order, and 'REMOVE' moves them out from under the item. — str('INSERT')
+
+		Raises:
+		ValueError — The mode isn't one of the above."""
 		# PATCH items/{self.id}/children
+		self._client.request('PATCH', f'items/{self.id}/children', json_=children_json(children, mode), raise_for_status=True)
+		self._forget_children()
+
+	def add_child(self, item: int | TrackerItem, index: int | None = None):
+		"""Add an item as a child to this item.
 
-	def add_child(self, item: int | TrackerItem):
-		"""Add an item as a child to this item."""
+		Params:
+		item — The item or its ID. — int | `TrackerItem`
+		index — The position among the existing children. If None it's added last. — int(None)"""
 		# POST items/{self.id}/children
+		data = {'itemReference': item_reference(item)}
+		if index is not None:
+			data['childIndex'] = index
+		self._client.request('POST', f'items/{self.id}/children', json_=data, raise_for_status=True)
+		self._forget_children()
+
+	def _forget_children(self):
+		# The cached children are out of date, `TrackerItem.get_children` fetches them again
+		with self._lock:
+			self._refs.pop('_children', None)
+			self._children = None
 
 	def get_fields(self) -> list[Field]:
 		"""Gets the field information for the item. This groups the fields into four 
@@ -482,14 +570,20 @@ class TrackerItem:
 		# GET items/{self.id}/fields
 		fields: list[Field] = []
 		field_data: dict[str, Any] = self._client.get(f'items/{self.id}/fields')
-		fields.extend([Field(**f, client=self._client, editable=True, item_id=self.id) for f in field_data['editableFields']])
-		fields.extend([Field(**f, client=self._client, editable=False, item_id=self.id) for f in field_data['readOnlyFields']])
+		# The tracker lets items share choice options, see `ChoiceField.get_choices`
+		tracker_id = self._tracker_id()
+		fields.extend([Field(**f, client=self._client, editable=True, item_id=self.id, tracker_id=tracker_id) for f in field_data['editableFields']])
+		fields.extend([Field(**f, client=self._client, editable=False, item_id=self.id, tracker_id=tracker_id) for f in field_data['readOnlyFields']])
 		return fields
 	
 	def get_field(self, field: str | int) -> Field:
 		"""Gets the field on the item."""
-		if not self._fields:
-			self._fields = self.get_fields()
+		with self._lock:
+			if not self._fields:
+				# `TrackerItem.update` compares against the version the values were read at
+				if not self._loaded:
+					self._load()
+				self._fields = self._adopt_built_fields(self.get_fields())
 		if isinstance(field, int):
 			field_dict = {f.id: f for f in self._fields}
 		elif isinstance(field, str):
@@ -498,14 +592,35 @@ class TrackerItem:
 			raise TypeError
 		return field_dict.get(field)
 	
+	def _adopt_built_fields(self, fields: list[Field]) -> list[Field]:
+		"""Swaps fetched fields for the custom fields and status already built from the item's 
+		payload, so each field has one object and a value staged on either is sent by 
+		`TrackerItem.update`."""
+		built: dict[int, Field] = {}
+		for attr in ('_custom_fields', '_status'):
+			if attr not in self._refs:
+				value = getattr(self, attr, None)
+				for field in value if isinstance(value, list) else [value]:
+					if isinstance(field, Field):
+						built[field.id] = field
+		adopted = []
+		for field in fields:
+			existing = built.get(field.id)
+			if existing is not None:
+				existing._editable = field._editable
+				field = existing
+			adopted.append(field)
+		return adopted
+
 	def update_field(self, field: str | int, value: Any):
 		"""Shortcut for calling `TrackerItem.get_field(field)` then `Field.value = value` with 
 		the added benefit of updating the item's cached fields so `TrackerItem.refresh` doesn't 
 		need to be called to see the updated value."""
 		field: Field = self.get_field(field)
 		field.value = value
-		self._fields.remove(field)
-		self._fields.append(field)
+		with self._lock:
+			# Swap in a new list so threads iterating the old one aren't affected
+			self._fields = [f for f in self._fields if f != field] + [field]
 
 	def get_field_definition(self, field: str | int) -> FieldDefinition:
 		"""Fetches a specific field from the tracker this item is in."""
@@ -516,22 +631,293 @@ class TrackerItem:
 		self._load()
 
 	def delete(self):
-		"""Deletes the current tracker item."""
-		self._client.delete(f'items/{self.id}')
+		"""Deletes the current tracker item. With write-behind enabled the delete is queued and 
+		any of the item's queued field updates are dropped.
 
-	def update(self):
-		"""Updates the current item. Best used when updating multiple fields at the same time."""
-		# TODO: This will bypass `Field.value` and access `Field._value` directly, doing it's own type checking
-		# self.json needs to be done first because you have to PUT the entire object
+		Raises:
+		HTTPError — codeBeamer refused the delete, e.g. the item doesn't exist."""
+		if self._client.write_queue is not None:
+			self._client.write_queue.delete(self.id)
+		else:
+			self._client.request('DELETE', f'items/{self.id}', raise_for_status=True)
 
-	def create_association(self, other: TrackerItem):
-		"""Creates an association with the other tracker item."""
-		# TODO
+	def set_field(self, field: str | int, value: Any):
+		"""Changes a field without sending it, so several fields can be sent together with 
+		`TrackerItem.update`.
+
+		Params:
+		field — The name or ID of the field. — str | int
+		value — The new value. — Any"""
+		self.get_field(field).stage(value)
+
+	@property
+	def changed_fields(self) -> list[Field]:
+		"""The fields changed since they were loaded or last saved."""
+		fields = {f.id: f for f in self._fields}
+		# Custom fields and the status built from the item's payload aren't in _fields until 
+		# they're fetched, see `TrackerItem._adopt_built_fields`
+		for attr in ('_custom_fields', '_status'):
+			if attr not in self._refs:
+				built = getattr(self, attr, None)
+				for field in built if isinstance(built, list) else [built]:
+					if isinstance(field, Field):
+						fields.setdefault(field.id, field)
+		return [f for f in fields.values() if f.dirty]
+
+	def update(self, check_version: bool = True) -> bool:
+		"""Sends every changed field of the item in one request. Fields that weren't changed, 
+		or were set back to the value they were loaded with, aren't sent. Before writing, the 
+		item's current version is fetched and compared with the version it was loaded at, so 
+		changes made by someone else since aren't overwritten. A write landing between the 
+		check and the update isn't detected since codeBeamer's field endpoint takes no version.
+
+		With write-behind enabled the changes are queued and the version isn't checked. Either 
+		way the fields stay in `changed_fields` until the write succeeds, so a rejected write is 
+		sent again by the next update.
+
+		Params:
+		check_version — Raise instead of writing if the item was changed by someone else since it was loaded. — bool(True)
+
+		Raises:
+		StaleItemError — The item was changed since it was loaded. Nothing was sent.
+		HTTPError — The write was rejected. Queued writes report it on their `WriteResult` instead.
+
+		Returns:
+		bool — Whether anything was sent."""
+		fields = self.changed_fields
+		if not fields:
+			logger.trace(f'Item {self.id} is unchanged, not updating')
+			return False
+		field_values = [f.json for f in fields]
+		if self._client.write_queue is not None:
+			result = self._client.write_queue.update_fields(self.id, field_values)
+			for field in fields:
+				field._saved_on_success(result)
+			return True
+		if check_version:
+			known_version = self.version
+			current = self._client.request('GET', f'items/{self.id}', raise_for_status=True).get('version')
+			if known_version is not None and current is not None and current != known_version:
+				raise StaleItemError(self, known_version, current)
+		try:
+			data = self._client.request(
+				'PUT', f'items/{self.id}/fields', json_={'fieldValues': field_values}, params={'quietMode': 'true'}, raise_for_status=True
+			)
+		except HTTPError as e:
+			if e.response is not None and e.response.status_code == 409:
+				raise StaleItemError(self, self._version, None) from e
+			raise
+		for field in fields:
+			field._original = field._value
+		if isinstance(data, dict) and data.get('version') is not None:
+			self._version = data['version']
+			if data.get('modifiedAt'):
+				self._modified_at = datetime.strptime(data['modifiedAt'], '%Y-%m-%dT%H:%M:%S.%f')
+		return True
+
+	def get_relations(self) -> dict[str, Any]:
+		"""Fetches the item's upstream and downstream references and its incoming and outgoing 
+		associations. To fetch the relations of many items at once use 
+		`Codebeamer.get_relation_graph`.
+
+		Raises:
+		HTTPError — The relations couldn't be fetched.
+
+		Returns:
+		dict[str, Any] — The raw relations JSON."""
+		# GET items/{self.id}/relations
+		return self._client.request('GET', f'items/{self.id}/relations', raise_for_status=True)
+
+	def get_history(self, since: datetime | None = None) -> HistoryTable:
+		"""Fetches the item's change history. To fetch the history of many items at once use 
+		`Codebeamer.get_history`.
+
+		Params:
+		since — Drop versions modified before this. Naive datetimes are taken as UTC. — datetime(None)
+
+		Raises:
+		HTTPError — The history couldn't be fetched.
+
+		Returns:
+		`HistoryTable` — The field changes of the item, oldest first."""
+		# GET items/{self.id}/history
+		from .history import HistoryTable
+		table = HistoryTable()
+		data = self._client.request('GET', f'items/{self.id}/history', raise_for_status=True)
+		table.append_history(self.id, (data.get('versions') if isinstance(data, dict) else data) or [], since=since)
+		return table
+
+	def get_attachments(self) -> list[dict[str, Any]]:
+		"""Fetches the item's attachments.
+
+		Returns:
+		list[dict[str, Any]] — The attachment JSONs."""
+		# GET items/{self.id}/attachments
+		data = self._client.get(f'items/{self.id}/attachments')
+		return (data.get('attachments') if isinstance(data, dict) else data) or []
+
+	def download_attachment(
+		self,
+		attachment: int | dict[str, Any],
+		destination: str | PathLike,
+		resume: bool = True,
+		max_bytes_per_second: int | None = None
+	) -> Path:
+		"""Streams one of the item's attachments to disk in chunks. An interrupted download 
+		leaves a `.part` file that the next call continues with a Range request.
+
+		Params:
+		attachment — The attachment JSON or its ID. — int | dict[str, Any]
+		destination — The file to write, or a directory to write it into under its name. — str | PathLike
+		resume — Continue a partial download. — bool(True)
+		max_bytes_per_second — Caps the download rate. — int(None)
+
+		Raises:
+		HTTPError — The attachment couldn't be downloaded.
+
+		Returns:
+		Path — The downloaded file."""
+		# GET attachments/{attachmentId}/content
+		from .attachments import ByteRateLimiter, download_attachment
+		limiter = ByteRateLimiter(max_bytes_per_second) if max_bytes_per_second else None
+		return download_attachment(self._client, attachment, destination, resume=resume, limiter=limiter)
+
+	def download_attachments(
+		self,
+		directory: str | PathLike,
+		workers: int = 4,
+		resume: bool = True,
+		max_bytes_per_second: int | None = None
+	) -> TransferReport:
+		"""Streams every attachment of the item into a directory, concurrently.
+
+		Params:
+		directory — The directory to write them into under their names. — str | PathLike
+		workers — The most downloads at once. — int(4)
+		resume — Continue partial downloads. — bool(True)
+		max_bytes_per_second — Caps the combined rate of the downloads. — int(None)
+
+		Returns:
+		`TransferReport` — Keyed by attachment ID."""
+		from .attachments import download_attachments
+		Path(directory).mkdir(parents=True, exist_ok=True)
+		return download_attachments(
+			self._client,
+			((attachment, directory) for attachment in self.get_attachments()),
+			workers=workers,
+			resume=resume,
+			max_bytes_per_second=max_bytes_per_second
+		)
+
+	def upload_attachment(
+		self,
+		file: str | PathLike | BinaryIO,
+		name: str | None = None,
+		content_type: str | None = None,
+		max_bytes_per_second: int | None = None
+	) -> dict[str, Any]:
+		"""Uploads a file as an attachment, streaming it from disk rather than loading it into 
+		memory.
+
+		Params:
+		file — The path of the file, or a seekable file opened in binary mode. — str | PathLike | BinaryIO
+		name — The attachment name. If None the file's name. — str(None)
+		content_type — The MIME type. If None it's guessed from the name. — str(None)
+		max_bytes_per_second — Caps the upload rate. — int(None)
+
+		Raises:
+		HTTPError — The upload was rejected.
+
+		Returns:
+		dict[str, Any] — The attachment JSON."""
+		# POST items/{self.id}/attachments
+		from .attachments import ByteRateLimiter, upload_attachment
+		limiter = ByteRateLimiter(max_bytes_per_second) if max_bytes_per_second else None
+		return upload_attachment(self._client, self, file, name=name, content_type=content_type, limiter=limiter)
+
+	def get_comments(self, page_size: int = 100) -> list[Comment]:
+		"""Fetches every comment on the item, page by page. Unlike `comments` this doesn't need 
+		the full item to be loaded. To fetch the comments of many items use 
+		`Codebeamer.iter_comments`.
+
+		Params:
+		page_size — The number of comments per page. — int(100)
+
+		Returns:
+		list[`Comment`] — The comments, oldest first."""
+		# GET items/{self.id}/comments
+		from .comments import Comment, iter_item_comments
+		return [Comment.from_json(self.id, data) for data in iter_item_comments(self._client, self.id, page_size)]
+
+	def add_comment(self, text: str, format: str = 'PlainText', reply_to: int | Comment | None = None) -> Comment:
+		"""Comments on the item, or replies to one of its comments.
+
+		Params:
+		text — The comment. — str
+		format — 'PlainText', 'Html', or 'Wiki'. — str('PlainText')
+		reply_to — The comment, or its ID, to reply to. — int | `Comment`(None)
+
+		Raises:
+		ValueError — The format isn't known.
+		HTTPError — The comment was rejected.
+
+		Returns:
+		`Comment` — The new comment."""
+		# POST items/{self.id}/comments
+		from .comments import Comment, post_comment
+		reply_to = reply_to.id if isinstance(reply_to, Comment) else reply_to
+		return post_comment(self._client, self, text, format=format, reply_to=reply_to)
+
+	def create_association(
+		self,
+		other: int | TrackerItem,
+		type: str | int = 'related',
+		description: str = '',
+		propagate_suspects: bool = False
+	) -> dict[str, Any]:
+		"""Creates an association with the other tracker item.
+
+		Params:
+		other — The item or its ID. — int | `TrackerItem`
+		type — The association type name or ID, e.g. 'depends' or 'related'. — str | int('related')
+		description — The description of the association. — str('')
+		propagate_suspects — Mark the association as propagating suspects. — bool(False)
+
+		Raises:
+		ValueError — The association type doesn't exist.
+
+		Returns:
+		dict[str, Any] — The association JSON."""
+		# POST associations
 		# ? These aren't upstream/downstream references, but the "relates to" type things
+		from .relations import association_json
+		data = association_json(self._client, self, other, type, description, propagate_suspects)
+		return self._client.request('POST', 'associations', json_=data, raise_for_status=True)
 
-	def remove_association(self, other: TrackerItem):
-		"""Removes an association with the other tracker item."""
-		# TODO
+	def remove_association(self, other: int | TrackerItem) -> int:
+		"""Removes every association between this item and the other tracker item, in either 
+		direction.
+
+		Params:
+		other — The item or its ID. — int | `TrackerItem`
+
+		Raises:
+		HTTPError — The relations couldn't be fetched or an association couldn't be removed.
+
+		Returns:
+		int — The number of associations removed."""
+		# DELETE associations/{associationId}
+		other_id = other.id if isinstance(other, TrackerItem) else int(other)
+		relations = self.get_relations()
+		association_ids = {
+			association['id']
+			for key in ('outgoingAssociations', 'incomingAssociations')
+			for association in relations.get(key) or []
+			if (association.get('itemRevision') or {}).get('id') == other_id
+		}
+		for association_id in association_ids:
+			self._client.request('DELETE', f'associations/{association_id}', raise_for_status=True)
+		return len(association_ids)
 
 	def create_child_tracker_item(
 		self,
@@ -565,4 +951,50 @@ class TrackerItem:
 		return isinstance(o, TrackerItem) and self.id < o.id
 	
 	def __hash__(self) -> int:
-		return hash(self.id)
\ No newline at end of file
+		return hash(self.id)
+
+CHILDREN_MODES = ('INSERT', 'REPLACE', 'REMOVE')
+
+def item_reference(item: int | TrackerItem) -> dict[str, Any]:
+	"""The reference JSON of an item.
+
+	Params:
+	item — The item or its ID. — int | `TrackerItem`
+
+	Returns:
+	dict[str, Any] — The `TrackerItemReference`."""
+	return {'id': item.id if isinstance(item, TrackerItem) else int(item), 'type': 'TrackerItemReference'}
+
+def children_json(children: list[int | TrackerItem], mode: str = 'INSERT') -> dict[str, Any]:
+	"""The body of a `PATCH items/{id}/children` or `PATCH trackers/{id}/children` request.
+
+	Params:
+	children — The items or their IDs. — list[int | `TrackerItem`]
+	mode — 'INSERT', 'REPLACE', or 'REMOVE'. — str('INSERT')
+
+	Raises:
+	ValueError — The mode isn't one of the above.
+
+	Returns:
+	dict[str, Any] — The request body."""
+	mode = mode.upper()
+	if mode not in CHILDREN_MODES:
+		raise ValueError(f'mode must be one of {CHILDREN_MODES}, got {mode!r}')
+	return {'mode': mode, 'children': [item_reference(c) for c in children]}
+
+class StaleItemError(Exception):
+	"""Raised when an item was changed by someone else since it was loaded.
+
+	Params:
+	item — The item that was written. — `TrackerItem`
+	expected_version — The version the item was loaded at. — int
+	actual_version — The version codeBeamer reported before the write, if known. — int | None"""
+
+	def __init__(self, item: TrackerItem, expected_version: int | None, actual_version: int | None):
+		super().__init__(
+			f'item {item.id} was at version {expected_version} but is now at {actual_version}, '
+			'it was changed since it was loaded'
+		)
+		self.item: TrackerItem = item
+		self.expected_version: int | None = expected_version
+		self.actual_version: int | None = actual_version
@@ -0,0 +1,681 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Mapping
+
+import json as jsonlib
+from abc import ABC, abstractmethod
+from io import SEEK_CUR, SEEK_END, SEEK_SET
+from threading import Thread, local
+from urllib.parse import urlencode, urlsplit
+from uuid import uuid4
+
+if TYPE_CHECKING:
+	from requests import Session
+
+class Headers(dict):
+	"""Response headers with case-insensitive lookups."""
+
+	def __init__(self, headers: Any = None):
+		super().__init__()
+		for key, value in (headers or {}).items():
+			self[key] = value
+
+	def __setitem__(self, key: str, value: str):
+		super().__setitem__(key.lower(), value)
+
+	def __getitem__(self, key: str) -> str:
+		return super().__getitem__(key.lower())
+
+	def __contains__(self, key: object) -> bool:
+		return isinstance(key, str) and super().__contains__(key.lower())
+
+	def get(self, key: str, default: Any = None) -> Any:
+		return super().get(key.lower(), default)
+
+class HTTPError(Exception):
+	"""Raised by `TransportResponse.raise_for_status` for 4xx and 5xx responses."""
+
+	def __init__(self, message: str, response: TransportResponse | None = None):
+		super().__init__(message)
+		self.response: TransportResponse | None = response
+
+class TransportResponse:
+	"""The response every transport returns, independent of the HTTP library underneath."""
+
+	def __init__(self, status_code: int, reason: str, headers: Any, content: bytes, url: str = '', http_version: str = 'HTTP/1.1'):
+		self.status_code: int = status_code
+		self.reason: str = reason
+		self.headers: Headers = headers if isinstance(headers, Headers) else Headers(headers)
+		self.content: bytes = content
+		self.url: str = url
+		self.http_version: str = http_version
+		self._text: str | None = None
+
+	@property
+	def text(self) -> str:
+		"""The body decoded as UTF-8."""
+		if self._text is None:
+			self._text = self.content.decode('utf-8', errors='replace') if self.content else ''
+		return self._text
+
+	def json(self) -> Any:
+		"""The body parsed as JSON.
+
+		Raises:
+		ValueError — The body isn't JSON."""
+		return jsonlib.loads(self.content)
+
+	def raise_for_status(self):
+		"""Raises an `HTTPError` if the response is an error.
+
+		Raises:
+		HTTPError — The status code is 400 or above."""
+		if self.status_code >= 400:
+			kind = 'Client' if self.status_code < 500 else 'Server'
+			raise HTTPError(f'{self.status_code} {kind} Error: {self.reason} for url: {self.url}', response=self)
+
+	def __repr__(self) -> str:
+		return f'TransportResponse(status_code={self.status_code}, url={self.url})'
+
+class StreamingResponse(TransportResponse):
+	"""A response whose body is read in chunks as it arrives instead of all at once, e.g. to 
+	write a large attachment straight to disk. `content` stays empty unless `read` is called. 
+	Close it, or use it as a context manager, to release the connection.
+
+	Params:
+	chunks — The body in chunks. — Iterator[bytes]
+	close — Releases the connection. — Callable[[], None](None)"""
+
+	def __init__(
+		self,
+		status_code: int,
+		reason: str,
+		headers: Any,
+		chunks: Iterator[bytes],
+		close: Callable[[], None] | None = None,
+		url: str = '',
+		http_version: str = 'HTTP/1.1'
+	):
+		super().__init__(status_code, reason, headers, b'', url=url, http_version=http_version)
+		self._chunks: Iterator[bytes] = chunks
+		self._close: Callable[[], None] | None = close
+
+	def iter_bytes(self) -> Iterator[bytes]:
+		"""Yields the rest of the body in chunks."""
+		for chunk in self._chunks:
+			if chunk:
+				yield chunk
+
+	def read(self) -> bytes:
+		"""Reads the rest of the body into `content`, e.g. for the message of an error.
+
+		Returns:
+		bytes — The body."""
+		self.content += b''.join(self.iter_bytes())
+		self._text = None
+		return self.content
+
+	def close(self):
+		"""Releases the connection. Whatever wasn't read is dropped."""
+		if self._close is not None:
+			self._close()
+			self._close = None
+
+	def __enter__(self) -> StreamingResponse:
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+class MultipartStream:
+	"""A `multipart/form-data` body that reads its files as it's sent instead of loading them 
+	into memory, so large uploads cost a chunk of memory rather than the size of the file. 
+	It's file-like with a known length, which every transport can send with a Content-Length. 
+	Files must be opened in binary mode and be seekable.
+
+	Params:
+	files — `{'field': file | (filename, file[, content_type])}`, or the `(field, value)` pairs to repeat a field. Contents can be bytes too. — Mapping | Iterable[tuple]
+	data — Plain form fields sent before the files. — dict[str, Any](None)
+	chunk_size — The size of the chunks when iterated. — int(65536)
+	on_read — Called with the number of bytes each time some are read, e.g. to cap the rate. — Callable[[int], None](None)"""
+
+	def __init__(
+		self,
+		files: Mapping[str, Any] | Iterable[tuple[str, Any]],
+		data: dict[str, Any] | None = None,
+		chunk_size: int = 1 << 16,
+		on_read: Callable[[int], None] | None = None
+	):
+		boundary = uuid4().hex
+		self.content_type: str = f'multipart/form-data; boundary={boundary}'
+		self.chunk_size: int = chunk_size
+		self._on_read: Callable[[int], None] | None = on_read
+		# (bytes or file, offset in the file, length)
+		self._parts: list[tuple[Any, int, int]] = []
+		for name, value in (data or {}).items():
+			self._add(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n')
+		for name, value in (files.items() if isinstance(files, Mapping) else files):
+			if isinstance(value, tuple):
+				filename, content = value[0], value[1]
+				content_type = value[2] if len(value) > 2 else 'application/octet-stream'
+			else:
+				filename, content, content_type = getattr(value, 'name', name), value, 'application/octet-stream'
+			self._add(
+				f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+				f'Content-Type: {content_type}\r\n\r\n'
+			)
+			self._add(content)
+			self._add(b'\r\n')
+		self._add(f'--{boundary}--\r\n')
+		self._length: int = sum(length for _, _, length in self._parts)
+		self._position: int = 0
+
+	def _add(self, content: Any):
+		if isinstance(content, str):
+			content = content.encode()
+		if isinstance(content, (bytes, bytearray, memoryview)):
+			self._parts.append((bytes(content), 0, len(content)))
+			return
+		start = content.tell()
+		end = content.seek(0, SEEK_END)
+		content.seek(start)
+		self._parts.append((content, start, end - start))
+
+	def read(self, size: int | None = -1) -> bytes:
+		"""Reads up to `size` bytes of the body, all of the rest if negative or None."""
+		if size is None or size < 0:
+			size = self._length - self._position
+		chunks: list[bytes] = []
+		wanted = size
+		part_start = 0
+		for content, offset, length in self._parts:
+			if wanted <= 0:
+				break
+			part_end = part_start + length
+			if self._position < part_end:
+				within = self._position - part_start
+				count = min(length - within, wanted)
+				if isinstance(content, bytes):
+					chunk = content[within:within + count]
+				else:
+					content.seek(offset + within)
+					chunk = content.read(count)
+					if len(chunk) < count:
+						raise OSError(f'{getattr(content, "name", "a file")} is shorter than when the upload started')
+				chunks.append(chunk)
+				self._position += count
+				wanted -= count
+			part_start = part_end
+		data = b''.join(chunks)
+		if data and self._on_read is not None:
+			self._on_read(len(data))
+		return data
+
+	def tell(self) -> int:
+		return self._position
+
+	def seek(self, offset: int, whence: int = SEEK_SET) -> int:
+		"""Moves to a position in the body, so it can be sent again."""
+		base = {SEEK_SET: 0, SEEK_CUR: self._position, SEEK_END: self._length}[whence]
+		self._position = min(max(0, base + offset), self._length)
+		return self._position
+
+	def __iter__(self) -> Iterator[bytes]:
+		while chunk := self.read(self.chunk_size):
+			yield chunk
+
+	def __len__(self) -> int:
+		return self._length
+
+	def __repr__(self) -> str:
+		return f'MultipartStream(length={self._length})'
+
+def encode_body(
+	data: dict[str, Any] | bytes | str | None = None,
+	json: Any = None,
+	files: dict[str, Any] | None = None,
+) -> tuple[bytes | None, str | None]:
+	"""Encodes a request body the way `requests` does, for transports that need raw bytes.
+	`files` takes the same `{'field': file | (filename, file[, content_type])}` form.
+
+	Returns:
+	tuple[bytes | None, str | None] — The body and its content type."""
+	if files:
+		boundary = uuid4().hex
+		parts: list[bytes] = []
+		fields = list((data or {}).items()) if isinstance(data, dict) else []
+		for name, value in fields:
+			parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode())
+			parts.append(str(value).encode() + b'\r\n')
+		for name, value in files.items():
+			if isinstance(value, tuple):
+				filename, content = value[0], value[1]
+				content_type = value[2] if len(value) > 2 else 'application/octet-stream'
+			else:
+				filename, content, content_type = getattr(value, 'name', name), value, 'application/octet-stream'
+			if hasattr(content, 'read'):
+				content = content.read()
+			if isinstance(content, str):
+				content = content.encode()
+			parts.append(
+				f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+				f'Content-Type: {content_type}\r\n\r\n'.encode()
+			)
+			parts.append(content + b'\r\n')
+		parts.append(f'--{boundary}--\r\n'.encode())
+		return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+	if json is not None:
+		return jsonlib.dumps(json).encode(), 'application/json'
+	if isinstance(data, dict):
+		return urlencode(data).encode(), 'application/x-www-form-urlencoded'
+	if isinstance(data, str):
+		return data.encode(), None
+	return data, None
+
+class Transport(ABC):
+	"""Base class for the HTTP layer underneath `RestClient`. A transport takes a fully built
+	URL and returns a `TransportResponse`, so the client doesn't care which library (or no
+	library at all) is sending the request. Subclasses implement `request`.
+
+	Params:
+	verify — Whether to verify TLS certificates. — bool(False)"""
+	name: str = 'transport'
+
+	def __init__(self, verify: bool = False):
+		self.verify: bool = verify
+		self.auth: tuple[str, str] | None = None
+
+	@abstractmethod
+	def request(
+		self,
+		method: str,
+		url: str,
+		headers: dict[str, Any] | None = None,
+		data: Any = None,
+		json: Any = None,
+		files: dict[str, Any] | None = None,
+		timeout: float | None = None,
+	) -> TransportResponse:
+		"""Sends a request and reads the whole response."""
+
+	def stream(
+		self,
+		method: str,
+		url: str,
+		headers: dict[str, Any] | None = None,
+		timeout: float | None = None,
+		chunk_size: int = 1 << 16,
+	) -> StreamingResponse:
+		"""Sends a request and returns once the headers have arrived, leaving the body to be read
+		in chunks. Transports that can't stream read the whole body and hand it out in chunks.
+
+		Params:
+		chunk_size — The most bytes in each chunk. — int(65536)"""
+		response = self.request(method, url, headers=headers, timeout=timeout)
+		view = memoryview(response.content)
+		chunks = (view[i:i + chunk_size].tobytes() for i in range(0, len(view), chunk_size))
+		return StreamingResponse(
+			response.status_code, response.reason, response.headers, chunks, url=url, http_version=response.http_version
+		)
+
+	def close(self):
+		"""Releases any connections held by the transport."""
+
+	def _basic_auth_header(self) -> dict[str, str]:
+		if not self.auth:
+			return {}
+		from base64 import b64encode
+		token = b64encode(':'.join(self.auth).encode()).decode()
+		return {'Authorization': f'Basic {token}'}
+
+	def __repr__(self) -> str:
+		return f'{self.__class__.__name__}()'
+
+def _disable_insecure_warnings(verify: bool):
+	"""Silences urllib3's warning on every unverified HTTPS request. Done when the first 
+	unverified transport is made rather than on import, so urllib3 is only loaded when needed."""
+	if not verify:
+		from urllib3 import disable_warnings
+		from urllib3.exceptions import InsecureRequestWarning
+		disable_warnings(InsecureRequestWarning)
+
+class RequestsTransport(Transport):
+	"""Sends requests through a `requests.Session`. Sessions aren't thread-safe, so each
+	thread gets its own copy of the configured session that shares its adapters (and so its
+	connection pools) and cookies.
+
+	Params:
+	session — The session to copy from. If None one is created. — `Session`(None)
+	pool_size — The connection pool size when creating the session. — int(32)
+	verify — Whether to verify TLS certificates. — bool(False)"""
+	name = 'requests'
+
+	def __init__(self, session: Session | None = None, pool_size: int = 32, verify: bool = False):
+		super().__init__(verify=verify)
+		from requests import Session
+		from requests.adapters import HTTPAdapter
+		_disable_insecure_warnings(verify)
+		if session is None:
+			session = Session()
+			# Big enough for worker threads to keep their connections instead of discarding them
+			adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+			session.mount('http://', adapter)
+			session.mount('https://', adapter)
+		self._session: Session = session
+		self._local = local()
+
+	@property
+	def session(self) -> Session:
+		"""The session for the current thread."""
+		session: Session | None = getattr(self._local, 'session', None)
+		if session is None:
+			from requests import Session
+			template = self._session
+			template.auth = self.auth or template.auth
+			session = Session()
+			session.auth = template.auth
+			session.headers = template.headers.copy()
+			session.proxies = template.proxies.copy()
+			session.cert = template.cert
+			session.cookies = template.cookies
+			session.adapters = template.adapters.copy()
+			self._local.session = session
+		return session
+
+	def request(self, method, url, headers=None, data=None, json=None, files=None, timeout=None) -> TransportResponse:
+		response = self.session.request(
+			method=method,
+			url=url,
+			headers=headers,
+			data=data,
+			json=json,
+			timeout=timeout,
+			files=files,
+			verify=self.verify
+		)
+		return TransportResponse(response.status_code, response.reason, response.headers, response.content, url=url)
+
+	def stream(self, method, url, headers=None, timeout=None, chunk_size=1 << 16) -> StreamingResponse:
+		response = self.session.request(
+			method=method, url=url, headers=headers, timeout=timeout, verify=self.verify, stream=True
+		)
+		return StreamingResponse(
+			response.status_code, response.reason, response.headers, response.iter_content(chunk_size),
+			close=response.close, url=url
+		)
+
+	def close(self):
+		self._session.close()
+
+class Urllib3Transport(Transport):
+	"""Sends requests through a pooled `urllib3.PoolManager`, skipping the per-request
+	overhead of `requests`.
+
+	Params:
+	pool_size — The number of connections kept per host. — int(32)
+	retries — urllib3 retry configuration. Retries are off by default. — Any(False)
+	verify — Whether to verify TLS certificates. — bool(False)"""
+	name = 'urllib3'
+
+	def __init__(self, pool_size: int = 32, retries: Any = False, verify: bool = False):
+		super().__init__(verify=verify)
+		import urllib3
+		_disable_insecure_warnings(verify)
+		self._pool = urllib3.PoolManager(
+			num_pools=pool_size,
+			maxsize=pool_size,
+			block=False,
+			retries=retries,
+			cert_reqs='CERT_REQUIRED' if verify else 'CERT_NONE',
+		)
+
+	def request(self, method, url, headers=None, data=None, json=None, files=None, timeout=None) -> TransportResponse:
+		body, content_type = encode_body(data=data, json=json, files=files)
+		headers = {**(headers or {}), **self._basic_auth_header()}
+		if content_type and (files or 'Content-Type' not in headers):
+			headers['Content-Type'] = content_type
+		response = self._pool.request(method, url, body=body, headers=headers, timeout=timeout, redirect=True)
+		return TransportResponse(response.status, response.reason, response.headers, response.data, url=url)
+
+	def stream(self, method, url, headers=None, timeout=None, chunk_size=1 << 16) -> StreamingResponse:
+		headers = {**(headers or {}), **self._basic_auth_header()}
+		response = self._pool.request(method, url, headers=headers, timeout=timeout, redirect=True, preload_content=False)
+
+		def close():
+			response.close()
+			response.release_conn()
+
+		return StreamingResponse(
+			response.status, response.reason, response.headers, response.stream(chunk_size), close=close, url=url
+		)
+
+	def close(self):
+		self._pool.clear()
+
+def _httpx_kwargs(transport: Transport, headers: Any, data: Any, json: Any, files: Any, timeout: Any) -> dict[str, Any]:
+	kwargs: dict[str, Any] = {'headers': headers, 'json': json, 'files': files, 'timeout': timeout, 'auth': transport.auth}
+	if isinstance(data, dict):
+		kwargs['data'] = data
+	elif data is not None:
+		kwargs['content'] = data
+	return kwargs
+
+class HttpxTransport(Transport):
+	"""Sends requests through an `httpx.Client`, which can speak HTTP/2. Requires httpx
+	(and h2 for HTTP/2).
+
+	Params:
+	http2 — Whether to negotiate HTTP/2. — bool(False)
+	pool_size — The maximum number of connections. — int(32)
+	verify — Whether to verify TLS certificates. — bool(False)"""
+	name = 'httpx'
+
+	def __init__(self, http2: bool = False, pool_size: int = 32, verify: bool = False, **client_kwargs):
+		super().__init__(verify=verify)
+		try:
+			import httpx
+		except ImportError as e:
+			raise ImportError('httpx is required for this transport, install it with `pip install httpx[http2]`') from e
+		limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+		self._client = httpx.Client(http2=http2, verify=verify, limits=limits, **client_kwargs)
+
+	def request(self, method, url, headers=None, data=None, json=None, files=None, timeout=None) -> TransportResponse:
+		response = self._client.request(method, url, **_httpx_kwargs(self, headers, data, json, files, timeout))
+		return TransportResponse(
+			response.status_code, response.reason_phrase, response.headers, response.content,
+			url=url, http_version=response.http_version
+		)
+
+	def stream(self, method, url, headers=None, timeout=None, chunk_size=1 << 16) -> StreamingResponse:
+		request = self._client.build_request(method, url, headers=headers, timeout=timeout)
+		response = self._client.send(request, stream=True, auth=self.auth)
+		return StreamingResponse(
+			response.status_code, response.reason_phrase, response.headers, response.iter_bytes(chunk_size),
+			close=response.close, url=url, http_version=response.http_version
+		)
+
+	def close(self):
+		self._client.close()
+
+class Http2Transport(Transport):
+	"""Speaks HTTP/2 through httpx, so concurrent requests from many threads are multiplexed as
+	streams over a single connection per host instead of each holding its own TCP/TLS
+	connection. httpcore's blocking HTTP/2 connection isn't safe to share between threads, so
+	requests are handed to an `httpx.AsyncClient` on a private event loop thread and the calling
+	thread waits for the result. Streamed downloads and file uploads move a chunk at a time
+	between the calling thread and the loop. Servers that don't support HTTP/2 fall back to
+	HTTP/1.1 and the pool. Requires `pip install httpx[http2]`.
+
+	Bodies read from a file-like object, e.g. a `MultipartStream` of attachments or a comment,
+	are not multiplexed: each is sent over an HTTP/2 connection carrying only that body, reused
+	by later ones. When several streams on one connection wait for flow control at once,
+	httpcore can miss the window update meant for one of them and stall it until the read
+	timeout. At most `max_uploads` of these connections are open, further uploads wait for one,
+	and connections idle for `upload_idle_timeout` seconds are closed.
+
+	Params:
+	prior_knowledge — Speak HTTP/2 straight away on `http://` URLs (h2c) without negotiating. Only for servers known to support it. — bool(False)
+	pool_size — The maximum number of connections when falling back to HTTP/1.1. — int(32)
+	verify — Whether to verify TLS certificates. — bool(False)
+	max_uploads — The most file bodies sent at once, e.g. the workers of an attachment upload. — int(8)"""
+	name = 'http2'
+	upload_idle_timeout: float = 30.0
+
+	def __init__(self, prior_knowledge: bool = False, pool_size: int = 32, verify: bool = False, max_uploads: int = 8, **client_kwargs):
+		super().__init__(verify=verify)
+		try:
+			import httpx
+			import h2
+		except ImportError as e:
+			raise ImportError('httpx and h2 are required for HTTP/2, install them with `pip install httpx[http2]`') from e
+		import asyncio
+		self._loop = asyncio.new_event_loop()
+		self._thread = Thread(target=self._loop.run_forever, name='pybeamer-http2', daemon=True)
+		self._thread.start()
+		limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+		self._client_kwargs: dict[str, Any] = {'http2': True, 'http1': not prior_knowledge, 'verify': verify, 'limits': limits, **client_kwargs}
+		# Idle clients for file bodies and when they went idle, each sending one body at a time. 
+		# Only touched on the loop
+		self._upload_clients: list[tuple[Any, float]] = []
+
+		async def create_client():
+			self._upload_slots = asyncio.Semaphore(max(1, max_uploads))
+			return self._new_client()
+
+		self._client = self._run(create_client())
+
+	def _new_client(self) -> Any:
+		import httpx
+		return httpx.AsyncClient(**self._client_kwargs)
+
+	def _run(self, coroutine: Any) -> Any:
+		from asyncio import run_coroutine_threadsafe
+		return run_coroutine_threadsafe(coroutine, self._loop).result()
+
+	def request(self, method, url, headers=None, data=None, json=None, files=None, timeout=None) -> TransportResponse:
+		if hasattr(data, 'read'):
+			# The async client can't send a blocking file, so it's read a chunk at a time as the
+			# body is sent
+			kwargs = _httpx_kwargs(self, headers, self._read_async(data), json, files, timeout)
+			response = self._run(self._upload(method, url, kwargs))
+		else:
+			kwargs = _httpx_kwargs(self, headers, data, json, files, timeout)
+			response = self._run(self._client.request(method, url, **kwargs))
+		return TransportResponse(
+			response.status_code, response.reason_phrase, response.headers, response.content,
+			url=url, http_version=response.http_version
+		)
+
+	def stream(self, method, url, headers=None, timeout=None, chunk_size=1 << 16) -> StreamingResponse:
+		request = self._client.build_request(method, url, headers=headers, timeout=timeout)
+		response = self._run(self._client.send(request, stream=True, auth=self.auth))
+		body = response.aiter_bytes(chunk_size)
+
+		async def next_chunk() -> bytes | None:
+			try:
+				return await body.__anext__()
+			except StopAsyncIteration:
+				return None
+
+		def chunks() -> Iterator[bytes]:
+			# Chunks are pulled over to the calling thread one at a time, so the event loop
+			# never reads further ahead than the connection's flow control window
+			while (chunk := self._run(next_chunk())) is not None:
+				yield chunk
+
+		async def close():
+			await body.aclose()
+			await response.aclose()
+
+		return StreamingResponse(
+			response.status_code, response.reason_phrase, response.headers, chunks(),
+			close=lambda: self._run(close()), url=url, http_version=response.http_version
+		)
+
+	async def _upload(self, method: str, url: str, kwargs: dict[str, Any]) -> Any:
+		async with self._upload_slots:
+			# The most recently used client, so the others go idle and get closed
+			client = self._upload_clients.pop()[0] if self._upload_clients else self._new_client()
+			try:
+				return await client.request(method, url, **kwargs)
+			finally:
+				self._upload_clients.append((client, self._loop.time()))
+				self._loop.call_later(self.upload_idle_timeout, lambda: self._loop.create_task(self._close_idle_uploads()))
+
+	async def _close_idle_uploads(self):
+		cutoff = self._loop.time() - self.upload_idle_timeout
+		idle = [client for client, since in self._upload_clients if since <= cutoff]
+		self._upload_clients = [(client, since) for client, since in self._upload_clients if since > cutoff]
+		for client in idle:
+			await client.aclose()
+
+	async def _read_async(self, file: Any):
+		# Files are read on the loop's default executor, since a read may block, e.g. on disk or
+		# on the rate limit of a MultipartStream, and would stall every other stream meanwhile
+		size = getattr(file, 'chunk_size', 1 << 16)
+		while chunk := await self._loop.run_in_executor(None, file.read, size):
+			yield chunk
+
+	def close(self):
+		if self._loop.is_closed():
+			return
+
+		async def close_clients():
+			await self._client.aclose()
+			# On the loop, since the upload clients are only touched there
+			clients, self._upload_clients = self._upload_clients, []
+			for client, _ in clients:
+				await client.aclose()
+
+		self._run(close_clients())
+		self._loop.call_soon_threadsafe(self._loop.stop)
+		self._thread.join()
+		self._loop.close()
+
+class InProcessTransport(Transport):
+	"""Dispatches requests straight to a Python handler without touching the network, e.g.
+	`benchmarks.MockCodebeamer.handle`. Useful for tests and for measuring the client's own
+	overhead.
+
+	Params:
+	handler — Called with the method, the path with its query string, the encoded body, and the request headers. Returns the status code, headers, and body. — Callable"""
+	name = 'inprocess'
+
+	def __init__(self, handler: Callable[[str, str, bytes | None, dict[str, str]], tuple[int, dict[str, str], bytes]]):
+		super().__init__()
+		self.handler = handler
+
+	def request(self, method, url, headers=None, data=None, json=None, files=None, timeout=None) -> TransportResponse:
+		if hasattr(data, 'read'):
+			data = data.read()
+		body, _ = encode_body(data=data, json=json, files=files)
+		parts = urlsplit(url)
+		path = parts.path + (f'?{parts.query}' if parts.query else '')
+		status, response_headers, content = self.handler(method, path, body, dict(headers or {}))
+		return TransportResponse(status, '', response_headers, content or b'', url=url)
+
+TRANSPORTS: dict[str, type[Transport]] = {
+	'requests': RequestsTransport,
+	'urllib3': Urllib3Transport,
+	'httpx': HttpxTransport,
+	'http2': Http2Transport,
+}
+
+def make_transport(transport: Transport | str | None = None, session: Session | None = None, **kwargs) -> Transport:
+	"""Builds a transport from a name, or returns the given transport.
+
+	Params:
+	transport — A transport, the name of one ('requests', 'urllib3', 'httpx', 'http2'), or None for requests. — `Transport` | str(None)
+	session — The session for the requests transport. — `Session`(None)
+
+	Raises:
+	ValueError — The name isn't a known transport.
+
+	Returns:
+	`Transport` — The transport to use."""
+	if isinstance(transport, Transport):
+		return transport
+	if transport is None or transport == 'requests':
+		return RequestsTransport(session=session, **kwargs)
+	if transport not in TRANSPORTS:
+		raise ValueError(f'unknown transport {transport!r}, expected one of {list(TRANSPORTS)}')
+	return TRANSPORTS[transport](**kwargs)
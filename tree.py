@@ -0,0 +1,235 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Iterator
+
+from array import array
+
+from .utils import iter_pages, logger
+
+if TYPE_CHECKING:
+	from .rest_client import RestClient
+	from .tracker import Tracker
+	from .tracker_item import TrackerItem
+
+# Stored in the id column for a tracker root, so the tracker's ID can't be mistaken for an item's
+TRACKER_ROOT = -1
+
+class ItemTree:
+	"""A compact, array backed representation of an item hierarchy such as a tracker outline. 
+	Nodes are stored breadth-first in parallel `array('q')` columns (id, parent index, ordinal, 
+	and depth) so there are no parent/child object references for the garbage collector to 
+	chase. Since siblings are always stored next to each other, the children of a node are the 
+	contiguous range `first_child[i]` to `first_child[i] + child_count[i]`. Index 0 is the root 
+	and `TrackerItem`s are only built when asked for with `ItemTree.item`. When the root is a 
+	tracker its ID is kept in `root_id` and the id column holds `TRACKER_ROOT` instead, since 
+	tracker and item IDs can overlap."""
+
+	def __init__(self, client: RestClient | None = None, tracker: Tracker | None = None):
+		self._client: RestClient | None = client
+		self._tracker: Tracker | None = tracker
+		self.ids: array = array('q')
+		self.parents: array = array('q')
+		self.ordinals: array = array('q')
+		self.depths: array = array('q')
+		self.first_child: array = array('q')
+		self.child_count: array = array('q')
+		self.names: list[str] = []
+		self.root_id: int | None = None
+		self._positions: dict[int, int] | None = None
+
+	def _append(self, id: int, name: str, parent: int, depth: int) -> int:
+		"""Appends a node. All the children of a parent must be appended one after the other."""
+		index = len(self.ids)
+		self.ids.append(id)
+		self.parents.append(parent)
+		self.depths.append(depth)
+		self.names.append(name)
+		self.first_child.append(-1)
+		self.child_count.append(0)
+		if parent >= 0:
+			if self.child_count[parent] == 0:
+				self.first_child[parent] = index
+			self.ordinals.append(self.child_count[parent])
+			self.child_count[parent] += 1
+		else:
+			self.ordinals.append(0)
+		self._positions = None
+		return index
+
+	@property
+	def tracker_root(self) -> bool:
+		"""Whether the root is a tracker rather than an item."""
+		return bool(self.ids) and self.ids[0] == TRACKER_ROOT
+
+	@property
+	def max_depth(self) -> int:
+		"""The depth of the deepest node in the tree. The root has depth 0."""
+		return self.depths[-1] if self.depths else 0
+
+	def index_of(self, id: int) -> int:
+		"""The index of the node for an item ID.
+
+		Params:
+		id — The ID of the item. — int
+
+		Raises:
+		KeyError — The item isn't in the tree."""
+		if self._positions is None:
+			self._positions = {item_id: i for i, item_id in enumerate(self.ids) if item_id != TRACKER_ROOT}
+		return self._positions[id]
+
+	def parent(self, index: int) -> int:
+		"""The index of the parent of a node, or -1 for the root.
+
+		Params:
+		index — The index of the node. — int"""
+		return self.parents[index]
+
+	def children(self, index: int) -> range:
+		"""The indexes of the children of a node.
+
+		Params:
+		index — The index of the node. — int"""
+		start = self.first_child[index]
+		if start < 0:
+			return range(0)
+		return range(start, start + self.child_count[index])
+
+	def ancestors(self, index: int) -> Iterator[int]:
+		"""Yields the indexes of the ancestors of a node, nearest first.
+
+		Params:
+		index — The index of the node. — int"""
+		index = self.parents[index]
+		while index >= 0:
+			yield index
+			index = self.parents[index]
+
+	def descendants(self, index: int) -> Iterator[int]:
+		"""Yields the indexes of every node below a node, breadth-first.
+
+		Params:
+		index — The index of the node. — int"""
+		level = [index]
+		while level:
+			next_level = []
+			for i in level:
+				children = self.children(i)
+				yield from children
+				next_level.extend(children)
+			level = next_level
+
+	def outline(self) -> Iterator[int]:
+		"""Yields the indexes of every node in outline (depth-first, document) order."""
+		if not self.ids:
+			return
+		stack = [0]
+		while stack:
+			index = stack.pop()
+			yield index
+			# Reversed so the first child is popped first
+			stack.extend(reversed(self.children(index)))
+
+	def item(self, index: int) -> TrackerItem:
+		"""Builds a `TrackerItem` for a node. The item is a lazy reference, so the rest of its 
+		data is only fetched if it's used.
+
+		Params:
+		index — The index of the node. — int
+
+		Raises:
+		ValueError — The node is a tracker root.
+
+		Returns:
+		`TrackerItem` — The item for the node."""
+		from .tracker_item import TrackerItem
+		if self.ids[index] == TRACKER_ROOT:
+			raise ValueError('the root of the tree is a tracker, not an item')
+		return TrackerItem(
+			id=self.ids[index],
+			name=self.names[index],
+			type='TrackerItemReference',
+			client=self._client,
+			tracker=self._tracker
+		)
+
+	def items(self, indexes: Iterator[int] | None = None) -> list[TrackerItem]:
+		"""Builds `TrackerItem`s for many nodes.
+
+		Params:
+		indexes — The indexes of the nodes. If None then every item node is built, leaving out a tracker root. — Iterator[int](None)
+
+		Returns:
+		list[`TrackerItem`] — The items for the nodes."""
+		if indexes is None:
+			indexes = range(1 if self.tracker_root else 0, len(self))
+		return [self.item(i) for i in indexes]
+
+	def __len__(self) -> int:
+		return len(self.ids)
+
+	def __contains__(self, o: object) -> bool:
+		item_id = o if isinstance(o, int) else getattr(o, 'id', None)
+		try:
+			self.index_of(item_id)
+			return True
+		except KeyError:
+			return False
+
+	def __repr__(self) -> str:
+		return f'ItemTree(nodes={len(self)}, depth={self.max_depth})'
+
+def walk_tree(
+	client: RestClient,
+	root: Tracker | TrackerItem,
+	max_depth: int | None = None,
+	workers: int = 8,
+	page_size: int = 500,
+) -> ItemTree:
+	"""Walks the hierarchy below an item or tracker breadth-first. The children of every node
+	on a level are fetched concurrently, and each node's children are paged straight from
+	`items/{id}/children` (or `trackers/{id}/children` for a tracker root) without any count
+	request up front.
+
+	Params:
+	client — The client to fetch with. — `RestClient`
+	root — The tracker or item to start from. — `Tracker` | `TrackerItem`
+	max_depth — How many levels below the root to fetch. If None the whole tree is fetched. — int(None)
+	workers — The number of concurrent requests. — int(8)
+	page_size — The number of children per request. Must be between 1 and 500. — int(500)
+
+	Raises:
+	HTTPError — The children of a node couldn't be fetched, e.g. it doesn't exist or can't be read.
+
+	Returns:
+	`ItemTree` — The tree with the root at index 0."""
+	from concurrent.futures import ThreadPoolExecutor
+	from .tracker import Tracker
+	tracker = root if isinstance(root, Tracker) else root._tracker
+	tree = ItemTree(client, tracker=tracker if isinstance(tracker, Tracker) else None)
+	tree._append(TRACKER_ROOT if isinstance(root, Tracker) else root.id, root.name, -1, 0)
+	tree.root_id = root.id
+	root_path = f'trackers/{root.id}/children' if isinstance(root, Tracker) else f'items/{root.id}/children'
+
+	def fetch_children(path: str) -> list[dict[str, Any]]:
+		fetch = lambda p, s: client.request('GET', path, params={'page': p, 'pageSize': s}, raise_for_status=True)
+		return [ref for refs in iter_pages(fetch, 'itemRefs', page_size=page_size) for ref in refs]
+
+	level: list[int] = [0]
+	depth = 0
+	with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+		while level and (max_depth is None or depth < max_depth):
+			paths = [root_path if i == 0 else f'items/{tree.ids[i]}/children' for i in level]
+			next_level: list[int] = []
+			# map keeps the results in level order so siblings stay contiguous
+			try:
+				for parent, refs in zip(level, executor.map(fetch_children, paths)):
+					for ref in refs:
+						next_level.append(tree._append(ref['id'], ref.get('name'), parent, depth + 1))
+			except BaseException:
+				# Don't wait on the rest of the level's fetches
+				executor.shutdown(wait=False, cancel_futures=True)
+				raise
+			logger.debug(f'Tree level {depth + 1}: {len(next_level)} items')
+			level = next_level
+			depth += 1
+	return tree
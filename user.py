@@ -1,11 +1,11 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING, Any
 
-from loguru import logger
 from datetime import datetime
+from threading import RLock
 
 from .rest_client import RestClient
-from .utils import loadable
+from .utils import loadable, locked, logger
 
 class User:
 	"""Represents a user in codeBeamer."""
@@ -35,6 +35,7 @@ class User:
 		self._name: str = name
 		self._email: str | None = kwargs.get('email') # Not present for system users
 		self._client: RestClient = kwargs.get('client')
+		self._lock = RLock()
 		# type only appears in GET /users
 		if kwargs.get('type'):
 			# if type is present then no other information is present
@@ -193,6 +194,7 @@ class User:
 		"""The status of the user account."""
 		return self._status
 
+	@locked
 	def _load(self):
 		"""Loads the rest of the user's data. When a user is fetched using 
 		`Codebeamer.get_users` only the ID, Name, and Email of the user are retrieved. 
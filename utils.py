@@ -1,7 +1,32 @@
-from loguru import logger
 from math import ceil
+from datetime import datetime, timezone
+from sys import intern
+from functools import wraps
+from typing import Any, Callable, Iterator
 from string import ascii_uppercase, ascii_lowercase
 
+_PACKAGE = __name__.rpartition('.')[0] or __name__
+
+class _LazyLogger:
+	"""Stands in for loguru's logger so importing the package doesn't import loguru. The first 
+	time anything is logged loguru is imported and the package's logs are disabled, unless 
+	they were already turned on with `logger.enable('pybeamer')`. Attributes are cached on the 
+	proxy after the first lookup."""
+
+	def __getattr__(self, name: str) -> Any:
+		from loguru import logger
+		if not self.__dict__:
+			# loguru has no public way to ask whether a name was enabled, so peek at the 
+			# activation list and fall back to disabling
+			activation = getattr(getattr(logger, '_core', None), 'activation_list', ())
+			if not any(prefix == f'{_PACKAGE}.' for prefix, _ in activation):
+				logger.disable(_PACKAGE)
+		value = getattr(logger, name)
+		setattr(self, name, value)
+		return value
+
+logger = _LazyLogger()
+
 def loadable(func):
 	"""Decorator for calling load on property getter functions. Class must have a 
 	_loaded bool variable and a _load() function with no arguments. This is really just an 
@@ -20,12 +45,69 @@ def loadable(func):
 	
 	return _loadable
 
+def locked(func):
+	"""Decorator for running a method while holding the object's `_lock`, which must be an 
+	`RLock`. Used on `_load` methods and cache updates so objects shared between threads are 
+	only loaded once and never seen half updated."""
+
+	@wraps(func)
+	def _locked(self, *args, **kwargs):
+		with self._lock:
+			return func(self, *args, **kwargs)
+
+	return _locked
+
 def clamp(value: int, minimum: int, maximum: int) -> int:
 	return max(minimum, min(maximum, value))
 
 def pages(amount: int, size: int) -> int:
 	return ceil(amount / size)
 
+def iter_pages(
+	fetch: Callable[[int, int], dict[str, Any]],
+	key: str,
+	page: int = 0,
+	page_size: int = 25,
+	reverse: bool = False
+) -> Iterator[list[dict[str, Any]]]:
+	"""Yields the raw records of each page of a paginated endpoint without building any 
+	objects from them. `fetch` is called with the page number and page size and must return 
+	the decoded response. If page is 0 then all the pages are fetched.
+
+	With `reverse` the last page is yielded first and the first page last. Removing the 
+	records of a page then doesn't shift the pages still to come, which lets callers delete 
+	or move records while they page through them."""
+	fetch_all = page == 0
+	if fetch_all:
+		page = 1
+	page_size = clamp(page_size, 1, 500) # Clamp page_size between 1 and 500
+	data = fetch(page, page_size)
+	if not fetch_all:
+		yield data[key]
+		return
+	total_pages = pages(data['total'], page_size)
+	if not reverse:
+		yield data[key]
+		while page < total_pages:
+			page += 1
+			yield fetch(page, page_size)[key]
+		return
+	for last in range(total_pages, 1, -1):
+		yield fetch(last, page_size)[key]
+	yield data[key]
+
+def naive_utc(value: datetime) -> datetime:
+	"""A datetime as naive UTC, the way codeBeamer's timestamps are parsed. Aware values are 
+	converted to UTC and naive ones are taken to be UTC already, so either can be compared."""
+	if value.tzinfo is not None:
+		value = value.astimezone(timezone.utc).replace(tzinfo=None)
+	return value
+
+def intern_string(value: Any) -> Any:
+	"""Interns strings, leaving anything else alone. Used on vocabulary that repeats across many 
+	payloads (type names, choice names, field names) so every item shares one copy."""
+	return intern(value) if type(value) is str else value
+
 def snake_to_camel(value: str) -> str:
 	"""Converts snake_case to camelCase."""
 	translation_dict = {f'_{l}': u for u, l in zip(ascii_uppercase, ascii_lowercase)}
@@ -0,0 +1,333 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+
+from collections import OrderedDict
+from itertools import count
+from threading import Condition, Event, Lock, Thread
+from time import monotonic
+
+from .utils import logger
+
+if TYPE_CHECKING:
+	from .rest_client import RestClient
+
+class WriteResult:
+	"""The outcome of a queued write. `ok` is None until the write has been sent.
+
+	Params:
+	operation — 'update', 'delete', or 'create'. — str
+	item_id — The item written to. For creates it's set from the response. — int(None)"""
+
+	def __init__(self, operation: str, item_id: int | None = None):
+		self.operation: str = operation
+		self.item_id: int | None = item_id
+		self.ok: bool | None = None
+		self.error: BaseException | None = None
+		self.response: Any = None
+		self._done: Event = Event()
+		self._callbacks: list[Callable[[WriteResult], None]] = []
+		self._lock: Lock = Lock()
+
+	@property
+	def done(self) -> bool:
+		"""Whether the write has been sent."""
+		return self._done.is_set()
+
+	def wait(self, timeout: float | None = None) -> WriteResult:
+		"""Waits for the write to be sent.
+
+		Params:
+		timeout — The most seconds to wait. If None waits forever. — float(None)
+
+		Returns:
+		`WriteResult` — This result."""
+		self._done.wait(timeout)
+		return self
+
+	def add_done_callback(self, callback: Callable[[WriteResult], None]):
+		"""Calls a function with this result once the write has been sent, on the thread that 
+		sent it, or straight away if it already has been.
+
+		Params:
+		callback — Called with this result. — Callable[[`WriteResult`], None]"""
+		with self._lock:
+			if not self._done.is_set():
+				self._callbacks.append(callback)
+				return
+		callback(self)
+
+	def _finish(self, response: Any = None, error: BaseException | None = None):
+		self.response = response
+		self.error = error
+		self.ok = error is None
+		if self.operation == 'create' and isinstance(response, dict):
+			self.item_id = response.get('id')
+		with self._lock:
+			self._done.set()
+			callbacks, self._callbacks = self._callbacks, []
+		for callback in callbacks:
+			try:
+				callback(self)
+			except Exception as e:
+				logger.warning(f'A callback of {self!r} failed: {e}')
+
+	def __repr__(self) -> str:
+		return f'WriteResult(operation={self.operation}, item_id={self.item_id}, ok={self.ok})'
+
+class WriteReport:
+	"""The results of the writes completed between two flushes."""
+
+	def __init__(self, results: list[WriteResult]):
+		self.results: list[WriteResult] = results
+
+	@property
+	def succeeded(self) -> list[WriteResult]:
+		"""The writes that were accepted."""
+		return [r for r in self.results if r.ok]
+
+	@property
+	def failed(self) -> list[WriteResult]:
+		"""The writes that raised, with the error on `WriteResult.error`."""
+		return [r for r in self.results if r.ok is False]
+
+	def raise_for_errors(self):
+		"""Raises the first error if any write failed.
+
+		Raises:
+		Exception — The error of the first failed write."""
+		for result in self.results:
+			if result.error is not None:
+				raise result.error
+
+	def __iter__(self) -> Iterator[WriteResult]:
+		return iter(self.results)
+
+	def __len__(self) -> int:
+		return len(self.results)
+
+	def __repr__(self) -> str:
+		return f'WriteReport(succeeded={len(self.succeeded)}, failed={len(self.failed)})'
+
+class _Write:
+	"""A write waiting in the queue."""
+
+	def __init__(self, operation: str, item_id: int | None, path: str, params: dict[str, Any] | None = None, json: Any = None):
+		self.operation: str = operation
+		self.item_id: int | None = item_id
+		self.path: str = path
+		self.params: dict[str, Any] | None = params
+		self.json: Any = json
+		# fieldId -> field value JSON, so a later value for the same field replaces the earlier one
+		self.field_values: dict[Any, dict[str, Any]] = {}
+		self.result: WriteResult = WriteResult(operation, item_id)
+
+	@property
+	def method(self) -> str:
+		return {'update': 'PUT', 'delete': 'DELETE', 'create': 'POST'}[self.operation]
+
+	@property
+	def body(self) -> Any:
+		if self.operation == 'update':
+			return {'fieldValues': list(self.field_values.values())}
+		return self.json
+
+class WriteBehindQueue:
+	"""Queues item writes and sends them from background threads so the caller doesn't wait on
+	each request. Writes are coalesced per item while they wait: field updates to the same item
+	become a single `PUT items/{id}/fields` with the latest value of each field, and deleting an
+	item drops its waiting updates. Writes to one item are never sent concurrently, so they
+	land in the order they were queued. Each worker takes up to `batch_size` writes at a time,
+	and queueing blocks while `max_pending` writes are waiting.
+
+	Use it through `Codebeamer.enable_write_behind`, after which `Field.value = x`,
+	`TrackerItem.delete`, and `Tracker.queue_tracker_item` go through the queue. `flush` waits
+	for everything queued so far and reports the results.
+
+	Params:
+	client — The client to send with. — `RestClient`
+	workers — The number of background threads. — int(4)
+	batch_size — The most writes a worker takes at once. — int(50)
+	max_pending — The most writes waiting before queueing blocks. — int(10000)"""
+
+	def __init__(self, client: RestClient, workers: int = 4, batch_size: int = 50, max_pending: int = 10000):
+		self._client: RestClient = client
+		self.batch_size: int = max(1, batch_size)
+		self.max_pending: int = max(1, max_pending)
+		self._pending: OrderedDict[tuple, _Write] = OrderedDict()
+		# Items with a write being sent, their other writes wait until it's done
+		self._active_items: set[int] = set()
+		self._sending: int = 0
+		self._results: list[WriteResult] = []
+		self._condition: Condition = Condition()
+		self._closed: bool = False
+		self._creates = count()
+		self._threads: list[Thread] = [
+			Thread(target=self._work, name=f'pybeamer-writer-{i}', daemon=True) for i in range(max(1, workers))
+		]
+		for thread in self._threads:
+			thread.start()
+
+	@property
+	def pending(self) -> int:
+		"""The number of writes waiting or being sent."""
+		with self._condition:
+			return len(self._pending) + self._sending
+
+	def update_fields(self, item_id: int, field_values: list[dict[str, Any]]) -> WriteResult:
+		"""Queues new field values for an item, merged with any update already waiting for it.
+
+		Params:
+		item_id — The item to update. — int
+		field_values — The field value JSONs as sent to `PUT items/{id}/fields`. — list[dict[str, Any]]
+
+		Returns:
+		`WriteResult` — The result of the (merged) update."""
+		with self._condition:
+			self._wait_for_room()
+			delete = self._pending.get(('delete', item_id))
+			if delete is not None:
+				# The item is going away, there's no point updating it first
+				return delete.result
+			write = self._pending.get(('update', item_id))
+			if write is None:
+				write = _Write('update', item_id, f'items/{item_id}/fields', params={'quietMode': 'true'})
+				self._pending[('update', item_id)] = write
+			for value in field_values:
+				write.field_values[value.get('fieldId', value.get('name'))] = value
+			self._condition.notify()
+			return write.result
+
+	def delete(self, item_id: int) -> WriteResult:
+		"""Queues deleting an item. Updates still waiting for it are dropped.
+
+		Params:
+		item_id — The item to delete. — int
+
+		Returns:
+		`WriteResult` — The result of the delete."""
+		with self._condition:
+			self._wait_for_room()
+			write = self._pending.get(('delete', item_id))
+			if write is not None:
+				return write.result
+			update = self._pending.pop(('update', item_id), None)
+			write = self._pending[('delete', item_id)] = _Write('delete', item_id, f'items/{item_id}')
+			if update is not None:
+				update.result._finish(error=RuntimeError(f'item {item_id} was deleted before the update was sent'))
+				self._results.append(update.result)
+			self._condition.notify()
+			return write.result
+
+	def create(self, tracker_id: int, data: dict[str, Any], params: dict[str, Any] | None = None) -> WriteResult:
+		"""Queues creating an item. Creates are never coalesced.
+
+		Params:
+		tracker_id — The tracker to create the item in. — int
+		data — The item JSON. — dict[str, Any]
+		params — The query parameters, e.g. parentItemId. — dict[str, Any](None)
+
+		Returns:
+		`WriteResult` — The result of the create, with `item_id` set once it's sent."""
+		with self._condition:
+			self._wait_for_room()
+			write = _Write('create', None, f'trackers/{tracker_id}/items', params=params or None, json=data)
+			self._pending[('create', next(self._creates))] = write
+			self._condition.notify()
+			return write.result
+
+	def flush(self, timeout: float | None = None) -> WriteReport:
+		"""Waits until every write queued so far has been sent.
+
+		Params:
+		timeout — The most seconds to wait. If None waits forever. — float(None)
+
+		Raises:
+		TimeoutError — Writes were still waiting when the timeout ran out.
+
+		Returns:
+		`WriteReport` — The results of the writes completed since the last flush."""
+		deadline = None if timeout is None else monotonic() + timeout
+		with self._condition:
+			while self._pending or self._sending:
+				remaining = None if deadline is None else deadline - monotonic()
+				if remaining is not None and remaining <= 0:
+					raise TimeoutError(f'{len(self._pending) + self._sending} writes still pending')
+				self._condition.wait(remaining)
+			results, self._results = self._results, []
+		report = WriteReport(results)
+		if report.failed:
+			logger.warning(f'{len(report.failed)} of {len(report)} queued writes failed')
+		return report
+
+	def close(self, timeout: float | None = None) -> WriteReport:
+		"""Flushes the queue and stops the workers. Nothing more can be queued afterwards.
+
+		Params:
+		timeout — The most seconds to wait for the flush. If None waits forever. — float(None)
+
+		Returns:
+		`WriteReport` — The results of the writes completed since the last flush."""
+		report = self.flush(timeout)
+		with self._condition:
+			self._closed = True
+			self._condition.notify_all()
+		for thread in self._threads:
+			thread.join()
+		if getattr(self._client, 'write_queue', None) is self:
+			self._client.write_queue = None
+		return report
+
+	def _wait_for_room(self):
+		if self._closed:
+			raise RuntimeError('the write queue is closed')
+		while len(self._pending) >= self.max_pending:
+			self._condition.wait()
+
+	def _take(self) -> list[_Write]:
+		batch: list[_Write] = []
+		for key in list(self._pending):
+			write = self._pending[key]
+			if write.item_id is not None and write.item_id in self._active_items:
+				continue
+			del self._pending[key]
+			if write.item_id is not None:
+				self._active_items.add(write.item_id)
+			batch.append(write)
+			if len(batch) >= self.batch_size:
+				break
+		self._sending += len(batch)
+		return batch
+
+	def _work(self):
+		while True:
+			with self._condition:
+				batch = self._take()
+				while not batch:
+					if self._closed:
+						return
+					self._condition.wait()
+					batch = self._take()
+			for write in batch:
+				try:
+					response = self._client.request(
+						write.method, write.path, json_=write.body, params=write.params, raise_for_status=True
+					)
+					write.result._finish(response=response)
+				except Exception as e:
+					logger.debug(f'Queued {write.operation} of item {write.item_id} failed: {e}')
+					write.result._finish(error=e)
+				with self._condition:
+					if write.item_id is not None:
+						self._active_items.discard(write.item_id)
+					self._sending -= 1
+					self._results.append(write.result)
+					self._condition.notify_all()
+
+	def __enter__(self) -> WriteBehindQueue:
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def __repr__(self) -> str:
+		return f'WriteBehindQueue(pending={self.pending}, workers={len(self._threads)})'